@@ -1,94 +1,55 @@
-import os
 import math
 import json
-import requests
-from dotenv import load_dotenv
-
-##############################################################################
-# Load environment variables for the API
-##############################################################################
-load_dotenv()
-
-API_BASE_URL = os.getenv("API_BASE_URL")
-API_KEY = os.getenv("API_KEY")
-USER_ID = os.getenv("USER_ID")
-
-HEADERS = {
-    "x-api-key": API_KEY,
-    "userid": USER_ID,
-    "User-Agent": "PostmanRuntime/7.43.3",
-    "Accept": "*/*",
-    "Accept-Encoding": "gzip, deflate, br",
-    "Connection": "keep-alive"
-}
+import time
+
+import parallel
+import search
+import tablebase
+import game_state
+import http_client
+import mcts
+import opening_book
+import turn_wait
+from api_client import get_game_details, make_move
+from bitboard import BitBoard
+from search_stats import finish_stats, start_stats, write_stats_line
+from transposition import TranspositionTable
 
 ##############################################################################
 # Constants & Symbols
 ##############################################################################
 EMPTY = "-"
+# Transposition table size per game (entries, two per bucket)
+TT_MAX_ENTRIES = 1 << 20
+# Only consider empty cells within this many cells of a stone (None = all)
+SEARCH_RADIUS = 2
+# Leaf evaluator: "pattern" (line windows) or "count" (stone count)
+SEARCH_EVALUATOR = "pattern"
+# Search algorithm: "pvs" (principal variation search) or "minimax"
+SEARCH_ALGORITHM = search.DEFAULT_ALGORITHM
+# Engine: "alphabeta" (search.py) or "mcts" (Monte Carlo tree search, mcts.py)
+ENGINES = ("alphabeta", "mcts")
+SEARCH_ENGINE = "alphabeta"
+# MCTS selection rule ("uct" / "puct") and NumPy-batched playouts
+MCTS_POLICY = mcts.DEFAULT_POLICY
+MCTS_BATCH_PLAYOUTS = False
+# Order moves with the NumPy batch evaluator (falls back if NumPy is missing)
+SEARCH_BATCH_EVAL = False
+# Worker processes for the parallel root search (0 = plain serial search)
+SEARCH_WORKERS = 0
+# Opening book shared by all bot processes (used if the file exists; build
+# it with 'python opening_book.py build <size> <target>')
+OPENING_BOOK_FILE = opening_book.DEFAULT_BOOK_FILE
+# JSON-lines file for per-move search stats (None = stats off)
+SEARCH_STATS_FILE = None
+# Seconds held back from 'secondspermove' on top of the measured network time
+SAFETY_MARGIN = 1.0
+# Never plan to think for less than this, even on a very tight clock
+MIN_THINK_SECONDS = 0.2
 # Set these depending on which symbol your team is using in the game
 MY_SYMBOL = "X"
 OPPONENT_SYMBOL = "O"
 
-##############################################################################
-# API Calls
-##############################################################################
-
-def get_game_details(game_id):
-    """
-    Calls the 'gameDetails' API to get boardsize, target, and turn info.
-    """
-    params = {
-        "type": "gameDetails",
-        "gameId": game_id
-    }
-    response = requests.get(API_BASE_URL, headers=HEADERS, params=params)
-    try:
-        return response.json()
-    except ValueError:
-        print("ERROR: Could not parse JSON for game details.")
-        print("Raw response:", response.text)
-        return None
-
-def get_board_map(game_id):
-    """
-    Calls the 'boardMap' API to get a dictionary of moves like:
-    {
-       "output": "{\"0,0\":\"X\",\"2,2\":\"O\"}",
-       "target": 3,
-       "code": "OK"
-    }
-    """
-    params = {
-        "type": "boardMap",
-        "gameId": game_id
-    }
-    response = requests.get(API_BASE_URL, headers=HEADERS, params=params)
-    try:
-        return response.json()
-    except ValueError:
-        print("ERROR: Could not parse JSON for boardMap.")
-        print("Raw response:", response.text)
-        return None
-
-def make_move(game_id, team_id, move):
-    """
-    Posts a move back to the server. 'move' = 'row,col' (0-indexed).
-    """
-    data = {
-        "type": "move",
-        "gameId": game_id,
-        "teamId": team_id,
-        "move": move
-    }
-    response = requests.post(API_BASE_URL, headers=HEADERS, data=data)
-    try:
-        return response.json()
-    except ValueError:
-        print("ERROR: Could not parse JSON for make_move.")
-        print("Raw response:", response.text)
-        return None
-
 ##############################################################################
 # Board / Minimax Helpers
 ##############################################################################
@@ -258,12 +219,29 @@ def evaluate_heuristic(board, target, my_symbol, opp_symbol):
     return score
 
 
-def minimax(board, depth, alpha, beta, is_maximizing, target, my_symbol, opp_symbol):
+def minimax(board, depth, alpha, beta, is_maximizing, target, my_symbol, opp_symbol,
+            last_move=None, empty_count=None):
     """
     Minimax with alpha-beta pruning plus threat checks.
+    'last_move' is the (row, col) just played and 'empty_count' the number of
+    empty cells left; with them the terminal check only looks at the four
+    lines through the last move and detects draws from the counter. Without
+    them we fall back to the full-board evaluate_terminal scan.
     """
     # Terminal check
-    result = evaluate_terminal(board, target, my_symbol, opp_symbol)
+    if last_move is None or empty_count is None:
+        result = evaluate_terminal(board, target, my_symbol, opp_symbol)
+        empty_count = len(get_available_moves(board))
+    else:
+        # The side that just moved is the one not to move now
+        last_symbol = opp_symbol if is_maximizing else my_symbol
+        if is_win(board, last_move[0], last_move[1], target, last_symbol):
+            result = -1 if is_maximizing else +1
+        elif empty_count == 0:
+            result = 0
+        else:
+            result = None
+
     if result is not None or depth == 0:
         # +1 if we are winning, -1 if losing, 0 if draw, or
         # fallback to the heuristic if not fully decided
@@ -282,12 +260,10 @@ def minimax(board, depth, alpha, beta, is_maximizing, target, my_symbol, opp_sym
         best_eval = -math.inf
         for (r, c) in moves:
             board[r][c] = my_symbol
-            # If placing my_symbol here is an immediate win
-            if is_win(board, r, c, target, my_symbol):
-                val = 999999
-            else:
-                val = minimax(board, depth - 1, alpha, beta, False,
-                              target, my_symbol, opp_symbol)
+            # An immediate win is picked up by the child's last-move check
+            val = minimax(board, depth - 1, alpha, beta, False,
+                          target, my_symbol, opp_symbol,
+                          (r, c), empty_count - 1)
             board[r][c] = EMPTY
 
             best_eval = max(best_eval, val)
@@ -299,11 +275,9 @@ def minimax(board, depth, alpha, beta, is_maximizing, target, my_symbol, opp_sym
         best_eval = math.inf
         for (r, c) in moves:
             board[r][c] = opp_symbol
-            if is_win(board, r, c, target, opp_symbol):
-                val = -999999
-            else:
-                val = minimax(board, depth - 1, alpha, beta, True,
-                              target, my_symbol, opp_symbol)
+            val = minimax(board, depth - 1, alpha, beta, True,
+                          target, my_symbol, opp_symbol,
+                          (r, c), empty_count - 1)
             board[r][c] = EMPTY
 
             best_eval = min(best_eval, val)
@@ -313,101 +287,237 @@ def minimax(board, depth, alpha, beta, is_maximizing, target, my_symbol, opp_sym
         return best_eval
 
 
-def choose_best_move(board, target, my_symbol=MY_SYMBOL, opp_symbol=OPPONENT_SYMBOL):
+def choose_best_move(board, target, my_symbol=MY_SYMBOL, opp_symbol=OPPONENT_SYMBOL,
+                     searcher=None, deadline=None, depth=search.DEFAULT_DEPTH,
+                     threats=True, workers=0, batch_eval=False, use_tablebase=True,
+                     engine="alphabeta"):
     """
     Return (row, col) for the best move using minimax + alpha-beta,
     factoring in immediate wins first.
+    With a 'deadline' (time.monotonic() timestamp) the search deepens
+    iteratively until time runs out; otherwise it searches to 'depth'.
+    With 'threats' a threat-space (VCF) solver runs first and plays a forced
+    win or a must-block move without a full-width search.
+    With 'workers' > 0 the root moves are searched in that many processes
+    (parallel.py); at a fixed depth the move is the same as the serial one.
+    'batch_eval' orders moves with the NumPy batch evaluator (np_eval.py)
+    when no 'searcher' is passed in.
+    With 'use_tablebase', boards whose (size, target) has been solved
+    (tablebase.py) are answered by table lookup without any search.
+    With engine="mcts" the move comes from Monte Carlo tree search instead
+    (mcts.py; 'searcher' is then an mcts.MCTS, and 'depth' and 'workers'
+    don't apply).
+    'board' may be a list-of-lists or a BitBoard; both give the same move.
+    The search itself always runs on bitboards (search.py) so that it can use
+    the Zobrist-hashed transposition table; the list-based minimax above is
+    kept as the reference implementation.
     """
-    moves = get_available_moves(board)
-    best_value = -math.inf
-    best_move = None
+    if not isinstance(board, BitBoard):
+        board = BitBoard.from_rows(board)
+    if use_tablebase:
+        found = tablebase.lookup(board.size, target, board.bits_for(my_symbol),
+                                 board.bits_for(opp_symbol))
+        if found is not None:
+            if searcher is not None:
+                # Perfect play: nothing left to search or ponder here
+                searcher.last_value = None
+                searcher.last_depth = None
+                searcher.last_forced = True
+            return divmod(found[0], board.size)
+    if engine == "mcts":
+        return mcts.choose_best_move(board, target, my_symbol, opp_symbol, searcher,
+                                     deadline=deadline, threats=threats)
+    if searcher is None and batch_eval:
+        searcher = search.Searcher(board.size, target, batch_eval=True)
+    if workers:
+        return parallel.choose_best_move_parallel(board, target, my_symbol, opp_symbol,
+                                                  searcher, deadline=deadline, depth=depth,
+                                                  threats=threats, workers=workers)
+    return search.choose_best_move(board, target, my_symbol, opp_symbol, searcher,
+                                   deadline=deadline, depth=depth, threats=threats)
 
-    # 1) If any move yields an immediate win, choose it
-    for (r, c) in moves:
-        board[r][c] = my_symbol
-        if is_win(board, r, c, target, my_symbol):
-            board[r][c] = EMPTY
-            return (r, c)
-        board[r][c] = EMPTY
 
-    # 2) Otherwise, do a search
-    depth = 3  # adjust as needed
-    alpha, beta = -math.inf, math.inf
+##############################################################################
+# Main AI: Grab the board state, pick the best move, and post it
+##############################################################################
+
+# Per-game search state, so the transposition table survives between moves
+# when ai_make_move is called repeatedly from the same process
+_searcher_cache = {}
+# Per-game MCTS trees (engine "mcts"), reused across our moves
+_mcts_cache = {}
 
-    for (r, c) in moves:
-        board[r][c] = my_symbol
-        move_val = minimax(board, depth, alpha, beta, False,
-                           target, my_symbol, opp_symbol)
-        board[r][c] = EMPTY
 
-        if move_val > best_value:
-            best_value = move_val
-            best_move = (r, c)
+def get_searcher(game_id, board_size, target):
+    searcher = _searcher_cache.get(game_id)
+    if searcher is None or searcher.size != board_size or searcher.target != target:
+        searcher = search.Searcher(board_size, target,
+                                   TranspositionTable(max_entries=TT_MAX_ENTRIES),
+                                   radius=SEARCH_RADIUS, evaluator=SEARCH_EVALUATOR,
+                                   batch_eval=SEARCH_BATCH_EVAL, algorithm=SEARCH_ALGORITHM)
+        if OPENING_BOOK_FILE:
+            searcher.book = opening_book.get_book(OPENING_BOOK_FILE)
+        _searcher_cache[game_id] = searcher
+    return searcher
 
-        alpha = max(alpha, best_value)
-        if beta <= alpha:
-            break
 
-    return best_move
+def get_mcts_tree(game_id, board_size, target):
+    tree = _mcts_cache.get(game_id)
+    if tree is None or tree.size != board_size or tree.target != target:
+        tree = mcts.MCTS(board_size, target, policy=MCTS_POLICY, radius=SEARCH_RADIUS,
+                         batch=MCTS_BATCH_PLAYOUTS)
+        _mcts_cache[game_id] = tree
+    return tree
 
 
-##############################################################################
-# Main AI: Grab the board state, pick the best move, and post it
-##############################################################################
+def forget_game(game_id):
+    _searcher_cache.pop(game_id, None)
+    _mcts_cache.pop(game_id, None)
+
+
+# Smoothed round-trip time of one API request, in seconds
+_network_latency = None
+
+
+def record_network_latency(seconds):
+    global _network_latency
+    if _network_latency is None:
+        _network_latency = seconds
+    else:
+        _network_latency = 0.7 * _network_latency + 0.3 * seconds
+
+
+def compute_deadline(turn_start, seconds_per_move):
+    """
+    time.monotonic() deadline for the search: the move clock counted from
+    'turn_start', minus the time we expect posting the move to take and a
+    safety margin. Returns None (fixed-depth search) if there is no clock.
+    """
+    if not seconds_per_move or seconds_per_move <= 0:
+        return None
+    post_overhead = _network_latency or 0.0
+    budget = seconds_per_move - post_overhead - SAFETY_MARGIN
+    return max(turn_start + budget, time.monotonic() + MIN_THINK_SECONDS)
 
-def ai_make_move(game_id, my_team_id):
+
+def ai_make_move(game_id, my_team_id, workers=SEARCH_WORKERS, stats_file=SEARCH_STATS_FILE,
+                 wait=False, policy=None, metrics=None, engine=SEARCH_ENGINE):
     """
     1. Get game details => fetch boardSize, target, check whose turn
-    2. Get board map => build the board
-    3. Use minimax/alpha-beta to pick best move
+       (with 'wait', poll until it is our turn, see turn_wait.py)
+    2. Sync the board (only new moves, see game_state.py)
+    3. Use minimax/alpha-beta (or MCTS, with engine="mcts") to pick best move
     4. Post move back to the server
+    With 'stats_file' set, one JSON line of search stats is appended to it
+    after the move. Details that still show the move count at which we last
+    played are stale and never lead to a second move. Returns False once the
+    game is over or no legal move is left, True otherwise.
     """
-    # 1) get details
-    details = get_game_details(game_id)
-    if not details or details.get("code") != "OK":
-        print("⚠️ Could not fetch game details.")
-        return
+    known = game_state.cached_state(game_id)
+    played_at = known.played_at if known is not None else None
 
-    # parse the 'game' field
-    game_raw = details.get("game", "{}")
-    try:
-        game_data = json.loads(game_raw)
-    except json.JSONDecodeError:
-        print("❌ Could not parse 'game' JSON from details.")
-        return
-
-    board_size = int(game_data.get("boardsize", 3))
-    target_val = int(game_data.get("target", 3))
+    # 1) get details
+    if wait:
+        game_data, turn_start = turn_wait.wait_for_turn(game_id, my_team_id, policy, metrics,
+                                                        played_at_count=played_at)
+        if game_data is None:
+            print(f"Game {game_id} is over.")
+            return False
+    else:
+        turn_start = time.monotonic()
+        details = get_game_details(game_id)
+        record_network_latency(time.monotonic() - turn_start)
+        game_data = turn_wait.parse_details(details)
+        if game_data is None:
+            print("⚠️ Could not fetch game details.")
+            return True
+
+    state = game_state.get_state(game_id, game_data)
+    board_size = state.board_size
+    target_val = state.target
     turn_team = str(game_data.get("turnteamid"))
+    seconds_per_move = float(game_data.get("secondspermove") or 0)
+
+    if game_data.get("status") == "C":
+        print(f"Game {game_id} is over.")
+        return False
 
     # If it's not my turn, do nothing
     if turn_team != str(my_team_id):
         print(f"Not my turn yet. Turn belongs to: {turn_team}")
-        return
-
-    # 2) get board map
-    board_map_json = get_board_map(game_id)
-    if not board_map_json or board_map_json.get("code") != "OK":
-        print("⚠️ Could not fetch board map.")
-        return
-
-    board_map_str = board_map_json.get("output", "{}")
-
-    # 3) build the board
-    board = build_board_from_map(board_size, board_map_str)
-
-    # 4) pick best move
-    (best_r, best_c) = choose_best_move(board, target_val, MY_SYMBOL, OPPONENT_SYMBOL)
-    if best_r is None or best_c is None:
+        return True
+    if played_at is not None and game_state.parse_move_count(game_data) == played_at:
+        print("Not my turn yet (the details don't show our last move yet).")
+        return True
+
+    # 2) bring the cached board up to date (new moves only, or a full
+    #    boardMap fetch for a new game or when the moves don't line up)
+    board = game_state.sync_board(game_id, game_data)
+    if board is None:
+        return True
+
+    # 3) pick best move
+    if engine == "mcts":
+        searcher = get_mcts_tree(game_id, board_size, target_val)
+    else:
+        searcher = get_searcher(game_id, board_size, target_val)
+    deadline = compute_deadline(turn_start, seconds_per_move)
+    if stats_file:
+        start_stats(searcher)
+    best = choose_best_move(board, target_val, MY_SYMBOL, OPPONENT_SYMBOL,
+                            searcher, deadline=deadline, workers=workers, engine=engine)
+    search_stats = finish_stats(searcher)
+    if best is None:
         print("No valid moves left or no best move found.")
-        return
+        return False
+    (best_r, best_c) = best
 
     print(f"AI chosen move for game {game_id}: row={best_r}, col={best_c}")
 
-    # 5) make the move
+    # 4) make the move
     move_str = f"{best_r},{best_c}"
+    request_start = time.monotonic()
     response = make_move(game_id, my_team_id, move_str)
+    record_network_latency(time.monotonic() - request_start)
     print("Move response:", response)
+    if response and response.get("code") == "OK":
+        state.played_at = game_state.parse_move_count(game_data)
+        state.apply_own_move(best_r, best_c, MY_SYMBOL, response.get("moveId"))
+
+    if search_stats is not None:
+        write_stats_line(stats_file, {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "game_id": game_id,
+            "board_size": board_size,
+            "target": target_val,
+            "stones": (board.x_bits | board.o_bits).bit_count(),
+            "move": [best_r, best_c],
+            "turn_seconds": round(time.monotonic() - turn_start, 6),
+            "budget_seconds": seconds_per_move,
+            "network_latency": _network_latency,
+            "workers": workers,
+            "engine": engine,
+            "search": search_stats,
+        })
+    return True
+
+
+def play_game(game_id, my_team_id, workers=SEARCH_WORKERS, stats_file=SEARCH_STATS_FILE,
+              rate=turn_wait.MAX_REQUESTS_PER_SECOND, engine=SEARCH_ENGINE):
+    """
+    Play 'game_id' to the end: wait for each of our turns with an adaptive
+    poll schedule (at most 'rate' requests/sec overall) and move.
+    """
+    http_client.set_rate_limiter(turn_wait.TokenBucket(rate))
+    policy = turn_wait.PollPolicy()
+    metrics = turn_wait.PollMetrics()
+    try:
+        while ai_make_move(game_id, my_team_id, workers, stats_file,
+                           wait=True, policy=policy, metrics=metrics, engine=engine):
+            pass
+    finally:
+        http_client.set_rate_limiter(None)
+    print("Polling:", metrics.to_dict())
 
 
 ##############################################################################
@@ -417,14 +527,37 @@ def ai_make_move(game_id, my_team_id):
 if __name__ == "__main__":
     """
     Example usage:
-      python ai.py <game_id> <my_team_id>
-    This tries to make the best move if it's your turn.
+      python ai.py <game_id> <my_team_id> [--workers N] [--stats FILE]
+                   [--engine alphabeta|mcts] [--wait [--rate R]]
+    This tries to make the best move if it's your turn. With --wait it keeps
+    playing, waiting for each turn, until the game is over (at most R
+    requests/sec).
     """
     import sys
     if len(sys.argv) < 3:
-        print("Usage: python ai.py <game_id> <my_team_id>")
+        print("Usage: python ai.py <game_id> <my_team_id> [--workers N] [--stats FILE] "
+              "[--engine alphabeta|mcts] [--wait [--rate R]]")
         sys.exit(0)
 
     game_id = int(sys.argv[1])
     my_team_id = int(sys.argv[2])
-    ai_make_move(game_id, my_team_id)
+    workers = SEARCH_WORKERS
+    if "--workers" in sys.argv[3:]:
+        workers = int(sys.argv[sys.argv.index("--workers") + 1])
+    stats_file = SEARCH_STATS_FILE
+    if "--stats" in sys.argv[3:]:
+        stats_file = sys.argv[sys.argv.index("--stats") + 1]
+    engine = SEARCH_ENGINE
+    if "--engine" in sys.argv[3:]:
+        engine = sys.argv[sys.argv.index("--engine") + 1]
+        if engine not in ENGINES:
+            print(f"❌ Unknown engine '{engine}'. Choose from: {', '.join(ENGINES)}")
+            sys.exit(1)
+    if "--wait" in sys.argv[3:]:
+        rate = turn_wait.MAX_REQUESTS_PER_SECOND
+        if "--rate" in sys.argv[3:]:
+            rate = float(sys.argv[sys.argv.index("--rate") + 1])
+        play_game(game_id, my_team_id, workers=workers, stats_file=stats_file, rate=rate,
+                  engine=engine)
+    else:
+        ai_make_move(game_id, my_team_id, workers=workers, stats_file=stats_file, engine=engine)
@@ -1,37 +1,18 @@
-import os
-import requests
-from dotenv import load_dotenv
-
-load_dotenv()
-API_BASE_URL = os.getenv("API_BASE_URL")
-API_KEY = os.getenv("API_KEY")
-USER_ID = os.getenv("USER_ID")
-HEADERS = {
-    "x-api-key": API_KEY,
-    "userid": USER_ID,
-    #
-    "User-Agent": "PostmanRuntime/7.43.3",
-    "Accept": "*/*",
-    "Accept-Encoding": "gzip, deflate, br",
-    "Connection": "keep-alive"
-}
+from http_client import api_get, api_post, parse_json
 
+##########################################################
+# All calls share the pooled session in http_client.py
 ##########################################################
 
-def get_my_games():
+def get_my_games(timeout=None):
     params = {
         "type": "myGames"
     }
-    response = requests.get(API_BASE_URL, headers=HEADERS, params=params)
-    try:
-        return response.json()
-    except ValueError:
-        print("ERROR: Could not parse JSON")
-        print("Raw response:", response.text)
-        return None
+    response = api_get(params, timeout)
+    return parse_json(response, "ERROR: Could not parse JSON")
 
 
-def get_board_string(game_id):
+def get_board_string(game_id, timeout=None):
     """
     Fetches the board as a string for a given game ID.
     Returns JSON with fields: output, target, code.
@@ -40,52 +21,54 @@ def get_board_string(game_id):
         "type": "boardString",
         "gameId": game_id
     }
-    response = requests.get(API_BASE_URL, headers=HEADERS, params=params)
-    try:
-        return response.json()
-    except ValueError:
-        print("ERROR: Could not parse board string JSON")
-        print("Raw response:", response.text)
-        return None
+    response = api_get(params, timeout)
+    return parse_json(response, "ERROR: Could not parse board string JSON")
 
-def get_moves(game_id, count=100):
+def get_moves(game_id, count=100, timeout=None):
     params = {
         "type": "moves",
         "gameId": game_id,
         "count": count
     }
-    response = requests.get(API_BASE_URL, headers=HEADERS, params=params)
-    try:
-        return response.json()
-    except ValueError:
-        print("ERROR: Could not parse JSON for get_moves.")
-        print("Raw response:", response.text)
-        return None
+    response = api_get(params, timeout)
+    return parse_json(response, "ERROR: Could not parse JSON for get_moves.")
 
-def get_game_details(game_id):
+def get_game_details(game_id, timeout=None):
+    """
+    Calls the 'gameDetails' API to get boardsize, target, and turn info.
+    """
     params = {
         "type": "gameDetails",
         "gameId": game_id
     }
-    response = requests.get(API_BASE_URL, headers=HEADERS, params=params)
-    try:
-        return response.json()
-    except ValueError:
-        print("ERROR: Could not parse JSON for game details.")
-        print("Raw response:", response.text)
-        return None
+    response = api_get(params, timeout)
+    return parse_json(response, "ERROR: Could not parse JSON for game details.")
 
-#### Testing ####
+def get_board_map(game_id, timeout=None):
+    """
+    Calls the 'boardMap' API to get a dictionary of moves like:
+    {
+       "output": "{\"0,0\":\"X\",\"2,2\":\"O\"}",
+       "target": 3,
+       "code": "OK"
+    }
+    """
+    params = {
+        "type": "boardMap",
+        "gameId": game_id
+    }
+    response = api_get(params, timeout)
+    return parse_json(response, "ERROR: Could not parse JSON for boardMap.")
 
-# def get_board_map(game_id):
-#     params = {
-#         "type": "boardMap",
-#         "gameId": game_id
-#     }
-#     response = requests.get(API_BASE_URL, headers=HEADERS, params=params)
-#     try:
-#         return response.json()
-#     except ValueError:
-#         print("ERROR: Could not parse JSON for boardMap.")
-#         print("Raw response:", response.text)
-#         return None
+def make_move(game_id, team_id, move, timeout=None):
+    """
+    Posts a move back to the server. 'move' = 'row,col' (0-indexed).
+    """
+    data = {
+        "type": "move",
+        "gameId": game_id,
+        "teamId": team_id,
+        "move": move
+    }
+    response = api_post(data, timeout)
+    return parse_json(response, "ERROR: Could not parse JSON for make_move.")
@@ -0,0 +1,318 @@
+import json
+import math
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import ai
+import mcts
+import search
+from bitboard import BitBoard, full_mask, get_line_masks, is_win, iter_bits
+from ordering import near_mask
+from transposition import TranspositionTable
+
+##############################################################################
+# Self-play arena
+#
+# Plays engine configuration A against configuration B on a process pool,
+# one game per task. Games come in pairs: both games of a pair start from
+# the same random opening (a few random moves near the centre), with A
+# playing X (moving first) in one and O in the other, so neither the
+# opening nor the first move favours a side. Every finished game is
+# appended to a JSON-lines file as it comes in, followed by a summary line
+# with A's win/draw/loss rates (95% Wilson intervals) and, per
+# configuration, the average time and nodes per move.
+#
+# A configuration is a comma-separated list of key=value settings, e.g.
+#   "depth=3"                      alpha-beta (PVS) at fixed depth 3
+#   "algorithm=minimax,depth=3"    the same with plain minimax
+#   "seconds=0.5,evaluator=count"  0.5s per move, stone-count evaluation
+#   "engine=mcts,seconds=0.5"      Monte Carlo tree search
+# with keys from DEFAULT_CONFIG.
+##############################################################################
+
+DEFAULT_CONFIG = {
+    "engine": "alphabeta",       # "alphabeta" or "mcts"
+    "depth": search.DEFAULT_DEPTH,
+    "seconds": 0.0,              # time per move; 0 = fixed depth / iterations
+    "algorithm": search.DEFAULT_ALGORITHM,
+    "evaluator": ai.SEARCH_EVALUATOR,
+    "radius": ai.SEARCH_RADIUS,
+    "batch_eval": False,
+    "symmetry": search.SYMMETRY_PRUNING,
+    "threats": True,
+    "tablebase": False,
+    "policy": mcts.DEFAULT_POLICY,
+    "iterations": mcts.DEFAULT_ITERATIONS,
+    "playout_batch": False,
+}
+# Random moves played before the engines take over
+OPENING_PLIES = 2
+# Transposition table per engine per game
+ARENA_TT_ENTRIES = 1 << 18
+# 95% confidence
+Z_SCORE = 1.96
+
+ARENA_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "arena.jsonl")
+
+
+def parse_config(text):
+    """
+    DEFAULT_CONFIG updated from "key=value,key=value" (values cast to the
+    default's type; "none" for no radius).
+    """
+    config = dict(DEFAULT_CONFIG)
+    for item in filter(None, (part.strip() for part in (text or "").split(","))):
+        key, _, value = item.partition("=")
+        if key not in config:
+            raise ValueError(f"Unknown setting '{key}'. Choose from: {', '.join(config)}")
+        default = DEFAULT_CONFIG[key]
+        if value.lower() == "none":
+            config[key] = None
+        elif isinstance(default, bool):
+            config[key] = value.lower() in ("1", "true", "yes", "on")
+        elif isinstance(default, int):
+            config[key] = int(value)
+        elif isinstance(default, float):
+            config[key] = float(value)
+        else:
+            config[key] = value
+    return config
+
+
+def wilson_interval(successes, trials, z=Z_SCORE):
+    """
+    Wilson score interval (low, high) for a proportion.
+    """
+    if not trials:
+        return 0.0, 1.0
+    p = successes / trials
+    denominator = 1 + z * z / trials
+    centre = (p + z * z / (2 * trials)) / denominator
+    margin = z * math.sqrt(p * (1 - p) / trials + z * z / (4 * trials * trials)) / denominator
+    return max(0.0, centre - margin), min(1.0, centre + margin)
+
+
+##############################################################################
+# One game (worker side)
+##############################################################################
+
+def make_engine(config, size, target):
+    if config["engine"] == "mcts":
+        return mcts.MCTS(size, target, policy=config["policy"], radius=config["radius"],
+                         batch=config["playout_batch"])
+    searcher = search.Searcher(size, target, TranspositionTable(max_entries=ARENA_TT_ENTRIES),
+                               radius=config["radius"], evaluator=config["evaluator"],
+                               batch_eval=config["batch_eval"], algorithm=config["algorithm"])
+    searcher.symmetry = config["symmetry"]
+    return searcher
+
+
+def random_opening(size, target, plies, rng):
+    """
+    (x_bits, o_bits) after 'plies' random moves (X first) near the centre
+    or the stones already placed, none of them winning.
+    """
+    _, cell_masks = get_line_masks(size, target)
+    full = full_mask(size)
+    centre = 1 << ((size // 2) * size + size // 2)
+    bits = [0, 0]
+    for ply in range(plies):
+        stones = bits[0] | bits[1]
+        empty = full & ~stones
+        near = near_mask(size, stones, 1) if stones else centre | near_mask(size, centre, 1)
+        cells = [idx for idx in iter_bits(near & empty or empty)
+                 if not is_win(bits[ply % 2] | (1 << idx), idx, cell_masks)]
+        if not cells:
+            break
+        bits[ply % 2] |= 1 << rng.choice(cells)
+    return bits[0], bits[1]
+
+
+def play_game(game_no, size, target, config_a, config_b, a_is_x, opening):
+    """
+    Play one game from the 'opening' (x_bits, o_bits). Returns its record.
+    """
+    board = BitBoard(size, *opening)
+    engines = {"A": make_engine(config_a, size, target), "B": make_engine(config_b, size, target)}
+    configs = {"A": config_a, "B": config_b}
+    sides = {"X": "A" if a_is_x else "B", "O": "B" if a_is_x else "A"}
+    totals = {name: {"moves": 0, "seconds": 0.0, "nodes": 0} for name in engines}
+    _, cell_masks = get_line_masks(size, target)
+
+    stones = (board.x_bits | board.o_bits).bit_count()
+    symbol = "X" if stones % 2 == 0 else "O"
+    winner = None
+    moves = []
+    while True:
+        name = sides[symbol]
+        engine, config = engines[name], configs[name]
+        opponent = "O" if symbol == "X" else "X"
+        deadline = time.monotonic() + config["seconds"] if config["seconds"] else None
+        nodes_before = engine.nodes
+        started = time.perf_counter()
+        if config["engine"] == "mcts":
+            move = mcts.choose_best_move(board, target, symbol, opponent, engine, deadline,
+                                         iterations=config["iterations"],
+                                         threats=config["threats"])
+        else:
+            move = ai.choose_best_move(board, target, symbol, opponent, engine, deadline,
+                                       depth=config["depth"], threats=config["threats"],
+                                       use_tablebase=config["tablebase"])
+        elapsed = time.perf_counter() - started
+        if move is None:
+            break
+        totals[name]["moves"] += 1
+        totals[name]["seconds"] += elapsed
+        totals[name]["nodes"] += engine.nodes - nodes_before
+        board.place(move[0], move[1], symbol)
+        moves.append(list(move))
+        if is_win(board.bits_for(symbol), move[0] * size + move[1], cell_masks):
+            winner = name
+            break
+        symbol = opponent
+
+    return {
+        "type": "game",
+        "game": game_no,
+        "size": size,
+        "target": target,
+        "a_plays": "X" if a_is_x else "O",
+        "opening": {"X": [divmod(idx, size) for idx in iter_bits(opening[0])],
+                    "O": [divmod(idx, size) for idx in iter_bits(opening[1])]},
+        "result": "draw" if winner is None else ("win" if winner == "A" else "loss"),
+        "moves": moves,
+        "engines": totals,
+    }
+
+
+##############################################################################
+# Match (parent side)
+##############################################################################
+
+class MatchStats:
+    """
+    Running totals of a match, from A's point of view.
+    """
+
+    def __init__(self):
+        self.results = {"win": 0, "draw": 0, "loss": 0}
+        self.totals = {name: {"moves": 0, "seconds": 0.0, "nodes": 0} for name in ("A", "B")}
+
+    def add(self, record):
+        self.results[record["result"]] += 1
+        for name, totals in record["engines"].items():
+            for key, value in totals.items():
+                self.totals[name][key] += value
+
+    @property
+    def games(self):
+        return sum(self.results.values())
+
+    def summary(self):
+        games = self.games
+        score = (self.results["win"] + 0.5 * self.results["draw"]) / games if games else 0.0
+        rates = {}
+        for result, count in self.results.items():
+            low, high = wilson_interval(count, games)
+            rates[result] = {"count": count, "rate": count / games if games else 0.0,
+                             "ci95": [round(low, 4), round(high, 4)]}
+        engines = {}
+        for name, totals in self.totals.items():
+            moves = totals["moves"]
+            engines[name] = {
+                "moves": moves,
+                "seconds_per_move": totals["seconds"] / moves if moves else 0.0,
+                "nodes_per_move": totals["nodes"] / moves if moves else 0.0,
+            }
+        return {"games": games, "score": score, "results": rates, "engines": engines}
+
+
+def run_match(config_a, config_b, boards, games, workers=None, opening_plies=OPENING_PLIES,
+              output=ARENA_FILE, seed=0, verbose=True):
+    """
+    Play 'games' games (rounded up to whole pairs) of A against B, spread
+    over the (size, target) pairs in 'boards', on 'workers' processes.
+    Streams game records to 'output' (appending) and returns the summary.
+    """
+    rng = random.Random(seed)
+    tasks = []
+    for pair in range((games + 1) // 2):
+        size, target = boards[pair % len(boards)]
+        opening = random_opening(size, target, opening_plies, rng)
+        for a_is_x in (True, False):
+            tasks.append((len(tasks), size, target, config_a, config_b, a_is_x, opening))
+
+    stats = MatchStats()
+    started = time.perf_counter()
+    with open(output, "a") as out, ProcessPoolExecutor(max_workers=workers) as pool:
+        out.write(json.dumps({"type": "match", "a": config_a, "b": config_b,
+                              "boards": boards, "games": len(tasks), "seed": seed}) + "\n")
+        futures = [pool.submit(play_game, *task) for task in tasks]
+        for future in as_completed(futures):
+            record = future.result()
+            stats.add(record)
+            out.write(json.dumps(record) + "\n")
+            out.flush()
+            if verbose and (stats.games % 10 == 0 or stats.games == len(tasks)):
+                r = stats.results
+                print(f"{stats.games}/{len(tasks)} games: +{r['win']} ={r['draw']} -{r['loss']} "
+                      f"({time.perf_counter() - started:.0f}s)")
+        summary = stats.summary()
+        out.write(json.dumps({"type": "summary", **summary}) + "\n")
+    return summary
+
+
+def print_summary(summary):
+    print(f"\nA vs B over {summary['games']} games: score {summary['score']:.3f}")
+    for result in ("win", "draw", "loss"):
+        row = summary["results"][result]
+        low, high = row["ci95"]
+        print(f"  {result:<5} {row['count']:>6}  {100 * row['rate']:5.1f}%  "
+              f"(95% CI {100 * low:5.1f}% - {100 * high:5.1f}%)")
+    for name, row in summary["engines"].items():
+        print(f"  {name}: {row['seconds_per_move'] * 1000:8.1f} ms/move, "
+              f"{row['nodes_per_move']:10.0f} nodes/move")
+
+
+##############################################################################
+# CLI: python arena.py [options]
+##############################################################################
+
+if __name__ == "__main__":
+    """
+    Example usage:
+      python arena.py --a "depth=3" --b "algorithm=minimax,depth=3"
+                      [--boards 7x4,9x5] [--games N] [--workers N]
+                      [--opening PLIES] [--output FILE] [--seed S]
+    """
+    def option(name, default, cast=str):
+        if name in sys.argv:
+            return cast(sys.argv[sys.argv.index(name) + 1])
+        return default
+
+    if "-h" in sys.argv or "--help" in sys.argv:
+        print('Usage: python arena.py --a "key=value,..." --b "key=value,..." '
+              "[--boards 7x4,9x5] [--games N] [--workers N] [--opening PLIES] "
+              "[--output FILE] [--seed S]")
+        print(f"Settings: {', '.join(DEFAULT_CONFIG)}")
+        sys.exit(0)
+
+    try:
+        config_a = parse_config(option("--a", ""))
+        config_b = parse_config(option("--b", ""))
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    boards = [tuple(int(n) for n in spec.split("x")) for spec in option("--boards", "7x4").split(",")]
+    output = option("--output", ARENA_FILE)
+    summary = run_match(config_a, config_b, boards,
+                        games=option("--games", 100, int),
+                        workers=option("--workers", None, int),
+                        opening_plies=option("--opening", OPENING_PLIES, int),
+                        output=output,
+                        seed=option("--seed", 0, int))
+    print_summary(summary)
+    print(f"Results appended to {output}")
@@ -0,0 +1,317 @@
+import json
+import os
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+import search
+from bitboard import BitBoard, full_mask, get_line_masks, has_any_win
+from ordering import near_mask
+from threats import winning_cells
+from transposition import TranspositionTable
+
+##############################################################################
+# Search benchmark over a fixed position corpus
+#
+# bench_positions.json holds the corpus (board sizes 3x3 to 15x15, several
+# targets and game phases), bench_baseline.json the stored reference run.
+# For every position and depth the engine picks a move from a fresh Searcher
+# at that fixed depth, and the run records:
+#   seconds   - time to move (best of 'repeats' runs)
+#   nodes     - nodes searched (deterministic for a given engine)
+#   nps       - nodes per second
+#   ebf       - effective branching factor, nodes ** (1 / plies)
+#   peak_kb   - peak traced memory of one extra run under tracemalloc, not
+#               counting the transposition table (allocated before tracing)
+#   tt_kb     - size of that run's transposition table
+# Results go to JSON; comparing with the baseline flags any position whose
+# time or node count grew by more than the tolerance.
+##############################################################################
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+CORPUS_FILE = os.path.join(HERE, "bench_positions.json")
+BASELINE_FILE = os.path.join(HERE, "bench_baseline.json")
+RESULTS_FILE = os.path.join(HERE, "bench_results.json")
+
+# Relative slowdown / node increase that counts as a regression
+TIME_TOLERANCE = 0.25
+NODE_TOLERANCE = 0.10
+# Runs faster than this are too noisy to flag as slower
+MIN_TIMED_SECONDS = 0.01
+# Rows of the corpus: (size, target, stones on the board, depths)
+CORPUS_SPEC = [
+    (3, 3, 0, [1, 3, 8]),
+    (3, 3, 2, [1, 3, 6]),
+    (4, 3, 2, [1, 3, 5]),
+    (4, 4, 3, [1, 3, 5]),
+    (5, 4, 0, [1, 3]),
+    (5, 4, 4, [1, 3, 4]),
+    (6, 4, 6, [1, 3]),
+    (7, 5, 8, [1, 3]),
+    (9, 5, 10, [1, 2, 3, 4]),
+    (12, 5, 14, [1, 2, 3]),
+    (12, 6, 20, [1, 2, 3]),
+    (15, 5, 16, [1, 2, 3]),
+    (15, 5, 40, [1, 2, 3]),
+]
+
+
+##############################################################################
+# Corpus
+##############################################################################
+
+def make_position(size, target, stones, rng):
+    """
+    A position with 'stones' stones (O first, as on the server, then
+    alternating) built from random moves near the existing stones, with no
+    completed line and no one-move win for either side.
+    """
+    line_masks, _ = get_line_masks(size, target)
+    while True:
+        board = BitBoard(size)
+        occupied = 0
+        ok = True
+        for i in range(stones):
+            candidates = near_mask(size, occupied, 1) & full_mask(size) & ~occupied
+            cells = [idx for idx in range(size * size) if candidates >> idx & 1]
+            idx = rng.choice(cells)
+            board.place(*divmod(idx, size), "O" if i % 2 == 0 else "X")
+            occupied |= 1 << idx
+            if has_any_win(board.x_bits, line_masks) or has_any_win(board.o_bits, line_masks):
+                ok = False
+                break
+        # Skip positions with a one-move win: they never reach the search
+        x, o = board.x_bits, board.o_bits
+        if ok and not (winning_cells(x, o, line_masks, target)
+                       or winning_cells(o, x, line_masks, target)):
+            return board
+
+
+def make_corpus(seed=2025):
+    rng = random.Random(seed)
+    positions = []
+    for size, target, stones, depths in CORPUS_SPEC:
+        board = make_position(size, target, stones, rng)
+        positions.append({
+            "name": f"{size}x{size}-t{target}-s{stones}",
+            "size": size,
+            "target": target,
+            "to_move": "X" if stones % 2 else "O",
+            "rows": ["".join(row) for row in board.to_rows()],
+            "depths": depths,
+        })
+    return positions
+
+
+def load_json(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_json(path, data):
+    with open(path, "w") as f:
+        json.dump(data, f, indent=1)
+        f.write("\n")
+
+
+##############################################################################
+# Running
+##############################################################################
+
+def make_searcher(size, target, options, tt=None):
+    searcher = search.Searcher(size, target, tt,
+                               radius=options.get("radius", search.DEFAULT_RADIUS),
+                               evaluator=options.get("evaluator", search.DEFAULT_EVALUATOR),
+                               algorithm=options.get("algorithm", search.DEFAULT_ALGORITHM))
+    searcher.symmetry = options.get("symmetry", search.SYMMETRY_PRUNING)
+    return searcher
+
+
+def run_one(board, target, to_move, depth, options, tt=None):
+    """
+    One fixed-depth search from a fresh Searcher (on 'tt' if given, which
+    must be empty). Returns (move, value, nodes, seconds).
+    """
+    opp = "O" if to_move == "X" else "X"
+    searcher = make_searcher(board.size, target, options, tt)
+    start = time.perf_counter()
+    move = search.choose_best_move(board, target, to_move, opp, searcher, depth=depth,
+                                   threats=options.get("threats", False))
+    elapsed = time.perf_counter() - start
+    return move, searcher.last_value, searcher.nodes, elapsed
+
+
+def bench_position(position, depth, options, repeats=1, memory=True):
+    board = BitBoard.from_rows([list(row) for row in position["rows"]])
+    target = position["target"]
+    to_move = position.get("to_move", "X")
+
+    best = None
+    for _ in range(repeats):
+        move, value, nodes, elapsed = run_one(board, target, to_move, depth, options)
+        if best is None or elapsed < best:
+            best = elapsed
+
+    peak_kb = tt_kb = None
+    if memory:
+        # The table is allocated up front and would dwarf what the search
+        # itself allocates, so it is measured on its own
+        tracemalloc.start()
+        tt = TranspositionTable()
+        tt_kb = tracemalloc.get_traced_memory()[0] / 1024
+        tracemalloc.stop()
+        tracemalloc.start()
+        run_one(board, target, to_move, depth, options, tt)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        peak_kb = peak / 1024
+
+    plies = depth + 1
+    return {
+        "position": position["name"],
+        "depth": depth,
+        "move": list(move) if move is not None else None,
+        "value": value,
+        "seconds": best,
+        "nodes": nodes,
+        "nps": nodes / best if best else 0.0,
+        "ebf": nodes ** (1.0 / plies) if nodes else 0.0,
+        "peak_kb": peak_kb,
+        "tt_kb": tt_kb,
+    }
+
+
+def run_corpus(positions, options=None, repeats=1, memory=True, only=None, verbose=True):
+    options = options or {}
+    results = []
+    for position in positions:
+        if only and only not in position["name"]:
+            continue
+        for depth in position["depths"]:
+            row = bench_position(position, depth, options, repeats, memory)
+            results.append(row)
+            if verbose:
+                print_row(row)
+    return results
+
+
+def result_key(row):
+    return f"{row['position']}@{row['depth']}"
+
+
+def compare(results, baseline, time_tolerance=TIME_TOLERANCE, node_tolerance=NODE_TOLERANCE):
+    """
+    Compare a run with the baseline run. Returns a list of
+    (key, kind, old, new) for every regression or changed result.
+    """
+    reference = {result_key(row): row for row in baseline.get("results", [])}
+    findings = []
+    for row in results:
+        key = result_key(row)
+        old = reference.get(key)
+        if old is None:
+            continue
+        if (old["seconds"] >= MIN_TIMED_SECONDS
+                and row["seconds"] > old["seconds"] * (1 + time_tolerance)):
+            findings.append((key, "slower", old["seconds"], row["seconds"]))
+        if row["nodes"] > old["nodes"] * (1 + node_tolerance):
+            findings.append((key, "more nodes", old["nodes"], row["nodes"]))
+        if row["value"] != old["value"]:
+            findings.append((key, "score changed", old["value"], row["value"]))
+        if row["move"] != old["move"]:
+            findings.append((key, "move changed", old["move"], row["move"]))
+    return findings
+
+
+def print_row(row):
+    move = f"{row['move'][0]},{row['move'][1]}" if row["move"] else "-"
+    peak = f"{row['peak_kb']:9.0f}" if row["peak_kb"] is not None else f"{'-':>9}"
+    tt = f"{row['tt_kb']:8.0f}" if row.get("tt_kb") is not None else f"{'-':>8}"
+    print(f"{row['position']:<16} | {row['depth']:>5} | {move:<6} | {row['seconds']:>8.4f} | "
+          f"{row['nodes']:>9} | {row['nps']:>9.0f} | {row['ebf']:>5.2f} | {peak} | {tt}")
+
+
+def print_header():
+    print(f"{'Position':<16} | {'Depth':>5} | {'Move':<6} | {'Seconds':>8} | {'Nodes':>9} | "
+          f"{'Nodes/s':>9} | {'EBF':>5} | {'Peak KB':>9} | {'TT KB':>8}")
+    print("-" * 101)
+
+
+def run_info(options):
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "options": options,
+    }
+
+
+##############################################################################
+# CLI: python bench.py [options]
+##############################################################################
+
+def usage():
+    print("Usage: python bench.py [--only NAME] [--repeats N] [--no-memory]")
+    print("                       [--evaluator NAME] [--algorithm pvs|minimax]")
+    print("                       [--radius R|none] [--threats] [--no-symmetry]")
+    print("                       [--output FILE] [--baseline FILE] [--save-baseline]")
+    print("                       [--make-corpus]")
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    if "-h" in args or "--help" in args:
+        usage()
+        sys.exit(0)
+
+    def option(name, default, cast=str):
+        if name in args:
+            return cast(args[args.index(name) + 1])
+        return default
+
+    if "--make-corpus" in args:
+        save_json(CORPUS_FILE, make_corpus())
+        print(f"Wrote {CORPUS_FILE}")
+        sys.exit(0)
+
+    options = {"evaluator": option("--evaluator", search.DEFAULT_EVALUATOR),
+               "algorithm": option("--algorithm", search.DEFAULT_ALGORITHM),
+               "threats": "--threats" in args,
+               "symmetry": "--no-symmetry" not in args}
+    radius = option("--radius", search.DEFAULT_RADIUS)
+    options["radius"] = None if radius == "none" else int(radius)
+
+    print_header()
+    results = run_corpus(load_json(CORPUS_FILE), options,
+                         repeats=option("--repeats", 1, int),
+                         memory="--no-memory" not in args,
+                         only=option("--only", None))
+    total_seconds = sum(row["seconds"] for row in results)
+    total_nodes = sum(row["nodes"] for row in results)
+    print(f"\nTotal: {total_seconds:.3f}s, {total_nodes} nodes, "
+          f"{total_nodes / total_seconds if total_seconds else 0:.0f} nodes/s")
+
+    run = {"info": run_info(options), "results": results}
+    output = option("--output", RESULTS_FILE)
+    save_json(output, run)
+    print(f"Results written to {output}")
+
+    if "--save-baseline" in args:
+        save_json(option("--baseline", BASELINE_FILE), run)
+        print("Saved as the new baseline.")
+        sys.exit(0)
+
+    baseline_file = option("--baseline", BASELINE_FILE)
+    if not os.path.exists(baseline_file):
+        print("⚠️ No baseline to compare with (run with --save-baseline).")
+        sys.exit(0)
+    findings = compare(results, load_json(baseline_file))
+    regressions = [f for f in findings if f[1] in ("slower", "more nodes")]
+    for key, kind, old, new in findings:
+        marker = "❌" if kind in ("slower", "more nodes") else "⚠️"
+        print(f"{marker} {key}: {kind} ({old} -> {new})")
+    if not findings:
+        print("✅ No regressions against the baseline.")
+    sys.exit(1 if regressions else 0)
@@ -0,0 +1,169 @@
+import json
+
+##############################################################################
+# Bitboard representation
+#
+# Cell (row, col) of an N x N board maps to bit index row * N + col, so
+# iterating set bits from low to high visits cells in row-major order (the
+# same order as the list-of-lists helpers in ai.py).
+##############################################################################
+
+EMPTY = "-"
+X_SYMBOL = "X"
+O_SYMBOL = "O"
+
+
+class BitBoard:
+    """
+    N x N board stored as one Python int bitmask per side.
+    """
+    __slots__ = ("size", "x_bits", "o_bits")
+
+    def __init__(self, size, x_bits=0, o_bits=0):
+        self.size = size
+        self.x_bits = x_bits
+        self.o_bits = o_bits
+
+    @classmethod
+    def from_rows(cls, rows):
+        """
+        Build from a list-of-lists (or list of strings) of '-'/'X'/'O'.
+        """
+        size = len(rows)
+        board = cls(size)
+        for r, row in enumerate(rows):
+            for c, sym in enumerate(row):
+                if sym != EMPTY:
+                    board.place(r, c, sym)
+        return board
+
+    @classmethod
+    def from_map(cls, size, map_output):
+        """
+        Build from the stringified boardMap dictionary, e.g.
+        "{\"0,0\":\"X\",\"2,2\":\"O\"}".
+        """
+        board = cls(size)
+        try:
+            moves_dict = json.loads(map_output or "{}")
+        except json.JSONDecodeError:
+            print("❌ Failed to decode board map JSON.")
+            return board
+
+        for pos_str, symbol in moves_dict.items():
+            r, c = map(int, pos_str.split(","))
+            board.place(r, c, symbol)
+        return board
+
+    def to_rows(self):
+        return [[self.get(r, c) for c in range(self.size)]
+                for r in range(self.size)]
+
+    def copy(self):
+        return BitBoard(self.size, self.x_bits, self.o_bits)
+
+    def bits_for(self, symbol):
+        return self.x_bits if symbol == X_SYMBOL else self.o_bits
+
+    def get(self, row, col):
+        bit = 1 << (row * self.size + col)
+        if self.x_bits & bit:
+            return X_SYMBOL
+        if self.o_bits & bit:
+            return O_SYMBOL
+        return EMPTY
+
+    def place(self, row, col, symbol):
+        bit = 1 << (row * self.size + col)
+        if symbol == X_SYMBOL:
+            self.x_bits |= bit
+        else:
+            self.o_bits |= bit
+
+    def clear(self, row, col):
+        bit = ~(1 << (row * self.size + col))
+        self.x_bits &= bit
+        self.o_bits &= bit
+
+    def __eq__(self, other):
+        return (isinstance(other, BitBoard) and self.size == other.size
+                and self.x_bits == other.x_bits and self.o_bits == other.o_bits)
+
+    def __repr__(self):
+        return f"BitBoard(size={self.size}, x_bits={self.x_bits:#x}, o_bits={self.o_bits:#x})"
+
+
+##############################################################################
+# Bit helpers & precomputed line masks
+##############################################################################
+
+# (size, target) -> (line_masks, cell_masks)
+_line_mask_cache = {}
+
+
+def full_mask(size):
+    return (1 << (size * size)) - 1
+
+
+def iter_bits(mask):
+    """
+    Yield the index of every set bit, lowest first (row-major order).
+    """
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+def get_line_masks(size, target):
+    """
+    Return (line_masks, cell_masks) for a board size and target:
+      line_masks  - tuple of every length-'target' winning line as a bitmask
+      cell_masks  - per cell index, the tuple of line masks through that cell
+    Computed once per (size, target) and cached.
+    """
+    key = (size, target)
+    cached = _line_mask_cache.get(key)
+    if cached is not None:
+        return cached
+
+    lines = []
+    if 0 < target <= size:
+        # horizontal, vertical, diagonal, anti-diagonal
+        for dr, dc in ((0, 1), (1, 0), (1, 1), (1, -1)):
+            for r in range(size):
+                for c in range(size):
+                    end_r = r + dr * (target - 1)
+                    end_c = c + dc * (target - 1)
+                    if not (0 <= end_r < size and 0 <= end_c < size):
+                        continue
+                    mask = 0
+                    for k in range(target):
+                        mask |= 1 << ((r + dr * k) * size + (c + dc * k))
+                    lines.append(mask)
+
+    per_cell = [[] for _ in range(size * size)]
+    for mask in lines:
+        for idx in iter_bits(mask):
+            per_cell[idx].append(mask)
+
+    result = (tuple(lines), tuple(tuple(masks) for masks in per_cell))
+    _line_mask_cache[key] = result
+    return result
+
+
+def is_win(bits, idx, cell_masks):
+    """
+    True if 'bits' completes any winning line through cell 'idx'.
+    """
+    for mask in cell_masks[idx]:
+        if bits & mask == mask:
+            return True
+    return False
+
+
+def has_any_win(bits, line_masks):
+    for mask in line_masks:
+        if bits & mask == mask:
+            return True
+    return False
@@ -0,0 +1,399 @@
+import asyncio
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import aiohttp
+
+import ai
+import game_state
+import http_client
+import ponder
+import scheduler
+import turn_wait
+
+##############################################################################
+# Multi-game bot daemon
+#
+# One asyncio loop plays every open game of our team at once:
+#   - a refresher task reads myGames and starts a watcher per open game
+#   - each watcher polls its game's turn state over a shared aiohttp session
+#     and, when it is our turn, fetches the board and hands the search to a
+#     worker process, so a slow search or request never holds up other games
+#   - searches run in 'max_searches' single-process lanes; every game is
+#     pinned to one lane, so its searcher and transposition table stay warm
+#     in one process from move to move
+#   - each lane runs its searches through a scheduler.LaneScheduler:
+#     earliest move deadline first, in time slices, so games on turn at
+#     the same time all post before their move clocks run out
+#   - a semaphore caps requests in flight, and a token bucket caps the
+#     request rate; each game polls on its own adaptive schedule
+#     (turn_wait.PollPolicy) instead of a fixed interval
+#   - with pondering on, a watcher waiting for the opponent spends its poll
+#     interval searching the opponent's likely replies on its lane whenever
+#     the lane is free (ponder.py), in short slices handed out by the lane's
+#     scheduler; a search that comes in waits for one ponder slice at most
+##############################################################################
+
+# Concurrency limits (overridable from the command line)
+MAX_INFLIGHT_REQUESTS = 16
+MAX_SEARCHES = os.cpu_count() or 1
+# Shortest and longest wait between turn checks of one game, the overall
+# request-rate cap (requests/sec), and seconds between myGames refreshes
+POLL_SECONDS = turn_wait.MIN_POLL_SECONDS
+MAX_POLL_SECONDS = turn_wait.MAX_POLL_SECONDS
+MAX_REQUESTS_PER_SECOND = 20.0
+GAMES_REFRESH_SECONDS = 30.0
+# Search on the opponent's time between polls
+PONDER = False
+
+
+##############################################################################
+# Async API client
+##############################################################################
+
+class AsyncApiClient:
+    """
+    aiohttp version of api_client.py. Uses the same base URL, headers,
+    timeouts and GET retry settings as http_client.py; every request waits
+    for a slot in the 'max_inflight' semaphore, and first for a token from
+    'rate_limiter' (a turn_wait.TokenBucket) if given.
+    """
+
+    def __init__(self, max_inflight=MAX_INFLIGHT_REQUESTS, base_url=None, rate_limiter=None):
+        self.base_url = base_url or http_client.API_BASE_URL
+        self.limit = asyncio.Semaphore(max_inflight)
+        self.rate_limiter = rate_limiter
+        self.session = None
+        self.requests = 0
+        self.errors = 0
+
+    async def start(self):
+        timeout = aiohttp.ClientTimeout(sock_connect=http_client.CONNECT_TIMEOUT,
+                                        sock_read=http_client.READ_TIMEOUT)
+        connector = aiohttp.TCPConnector(limit=http_client.POOL_SIZE)
+        headers = {k: v for k, v in http_client.HEADERS.items() if v is not None}
+        self.session = aiohttp.ClientSession(headers=headers, timeout=timeout,
+                                             connector=connector)
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+        self.session = None
+
+    async def _json(self, response, error_message):
+        text = await response.text()
+        try:
+            return json.loads(text)
+        except ValueError:
+            print(error_message)
+            print("Raw response:", text)
+            return None
+
+    async def get(self, params, error_message):
+        """
+        GET with retries and exponential backoff (GETs are idempotent).
+        Returns the decoded JSON, or None.
+        """
+        params = {k: str(v) for k, v in params.items()}
+        for attempt in range(http_client.GET_RETRIES + 1):
+            if self.rate_limiter is not None:
+                await self.rate_limiter.acquire_async()
+            try:
+                async with self.limit:
+                    self.requests += 1
+                    async with self.session.get(self.base_url, params=params) as response:
+                        if response.status not in http_client.RETRY_STATUSES:
+                            return await self._json(response, error_message)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if attempt == http_client.GET_RETRIES:
+                    self.errors += 1
+                    print(f"ERROR: GET {params.get('type')} failed: {e}")
+                    return None
+            await asyncio.sleep(http_client.RETRY_BACKOFF * (2 ** attempt))
+        self.errors += 1
+        return None
+
+    async def post(self, data, error_message):
+        """
+        POST form 'data' once (a move must never be sent twice).
+        """
+        data = {k: str(v) for k, v in data.items()}
+        if self.rate_limiter is not None:
+            await self.rate_limiter.acquire_async()
+        try:
+            async with self.limit:
+                self.requests += 1
+                async with self.session.post(self.base_url, data=data) as response:
+                    return await self._json(response, error_message)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            self.errors += 1
+            print(f"ERROR: POST {data.get('type')} failed: {e}")
+            return None
+
+    async def get_my_games(self):
+        return await self.get({"type": "myGames"}, "ERROR: Could not parse JSON")
+
+    async def get_game_details(self, game_id):
+        return await self.get({"type": "gameDetails", "gameId": game_id},
+                              "ERROR: Could not parse JSON for game details.")
+
+    async def get_board_map(self, game_id):
+        return await self.get({"type": "boardMap", "gameId": game_id},
+                              "ERROR: Could not parse JSON for boardMap.")
+
+    async def get_moves(self, game_id, count=100):
+        return await self.get({"type": "moves", "gameId": game_id, "count": count},
+                              "ERROR: Could not parse JSON for get_moves.")
+
+    async def make_move(self, game_id, team_id, move):
+        return await self.post({"type": "move", "gameId": game_id, "teamId": team_id,
+                                "move": move},
+                               "ERROR: Could not parse JSON for make_move.")
+
+
+def parse_my_games(response):
+    """
+    {game_id: (team1, team2, status)} from a myGames response, whose entries
+    look like {"1234": "1401:1402:O"}.
+    """
+    games = {}
+    if not response or "myGames" not in response:
+        return games
+    for game in response["myGames"]:
+        for game_id, info in game.items():
+            parts = info.split(":")
+            status = parts[2] if len(parts) > 2 else "-"
+            games[int(game_id)] = (parts[0], parts[1] if len(parts) > 1 else "-", status)
+    return games
+
+
+##############################################################################
+# Daemon
+##############################################################################
+
+class BotDaemon:
+    """
+    Watches every open game of 'team_id' and plays a move whenever it is
+    our turn.
+    """
+
+    def __init__(self, team_id, max_requests=MAX_INFLIGHT_REQUESTS,
+                 max_searches=MAX_SEARCHES, poll_seconds=POLL_SECONDS,
+                 refresh_seconds=GAMES_REFRESH_SECONDS, base_url=None,
+                 pondering=PONDER, max_poll_seconds=MAX_POLL_SECONDS,
+                 max_rate=MAX_REQUESTS_PER_SECOND):
+        self.team_id = str(team_id)
+        self.client = AsyncApiClient(max_requests, base_url,
+                                     turn_wait.TokenBucket(max_rate) if max_rate else None)
+        self.max_searches = max_searches
+        self.poll_seconds = poll_seconds
+        self.max_poll_seconds = max_poll_seconds
+        self.poll_metrics = turn_wait.PollMetrics()
+        self.refresh_seconds = refresh_seconds
+        self.pondering = pondering
+        # One single-process executor per lane, and a lock saying who uses it
+        self.lanes = []
+        self.lane_locks = []
+        self.schedulers = []
+        self.scheduler_metrics = scheduler.SchedulerMetrics()
+        self.watchers = {}
+        self.moves_made = 0
+        self.ponder_hits = 0
+        self.ponder_slices = 0
+        self.running = False
+
+    def lane_for(self, game_id):
+        return game_id % len(self.lanes)
+
+    async def run(self, duration=None):
+        """
+        Play until stopped (or for 'duration' seconds).
+        """
+        self.lanes = [ProcessPoolExecutor(max_workers=1) for _ in range(self.max_searches)]
+        self.lane_locks = [asyncio.Lock() for _ in self.lanes]
+        self.schedulers = [scheduler.LaneScheduler(lane, lock, self.scheduler_metrics)
+                           for lane, lock in zip(self.lanes, self.lane_locks)]
+        await self.client.start()
+        self.running = True
+        stop_at = time.monotonic() + duration if duration else None
+        try:
+            while self.running:
+                await self.refresh_games()
+                wait = self.refresh_seconds
+                if stop_at is not None:
+                    wait = min(wait, stop_at - time.monotonic())
+                    if wait <= 0:
+                        break
+                await asyncio.sleep(wait)
+        finally:
+            await self.stop()
+
+    async def stop(self):
+        self.running = False
+        for task in self.watchers.values():
+            task.cancel()
+        await asyncio.gather(*self.watchers.values(), return_exceptions=True)
+        self.watchers = {}
+        for lane_scheduler in self.schedulers:
+            lane_scheduler.close()
+        await self.client.close()
+        for lane in self.lanes:
+            lane.shutdown(wait=True, cancel_futures=True)
+        self.lanes = []
+        self.lane_locks = []
+        self.schedulers = []
+
+    async def refresh_games(self):
+        games = parse_my_games(await self.client.get_my_games())
+        for game_id, (_, _, status) in games.items():
+            if status == "C":
+                continue
+            task = self.watchers.get(game_id)
+            if task is None or task.done():
+                self.watchers[game_id] = asyncio.create_task(self.watch_game(game_id))
+
+    async def watch_game(self, game_id):
+        """
+        Poll one game until it is completed, moving whenever it's our turn.
+        """
+        policy = turn_wait.PollPolicy(self.poll_seconds, self.max_poll_seconds)
+        metrics = self.poll_metrics
+        played_at_count = None
+        wait_started = time.monotonic()
+        last_poll = None
+        saw_opponent = False
+        metrics.waits += 1
+        while self.running:
+            started = time.monotonic()
+            game = turn_wait.parse_details(await self.client.get_game_details(game_id))
+            ai.record_network_latency(time.monotonic() - started)
+            metrics.polls += 1
+            if game is not None:
+                if game.get("status") == "C":
+                    print(f"🏁 Game {game_id} finished (winner: {game.get('winnerteamid')})")
+                    # Free the game's searcher and ponder state on its lane
+                    self.lanes[self.lane_for(game_id)].submit(ponder.forget, game_id)
+                    game_state.forget(game_id)
+                    return
+                move_count = game.get("moves")
+                my_turn = str(game.get("turnteamid")) == self.team_id
+                if my_turn and (move_count is None or move_count != played_at_count):
+                    if saw_opponent:
+                        metrics.record_turn(started - last_poll)
+                        policy.record_opponent_time(started - wait_started)
+                        saw_opponent = False
+                    if await self.play_turn(game_id, game, started):
+                        played_at_count = move_count
+                        policy.new_wait()
+                        wait_started = time.monotonic()
+                        metrics.waits += 1
+                        continue
+                elif not my_turn:
+                    saw_opponent = True
+            last_poll = started
+            interval = policy.next_interval(time.monotonic() - wait_started)
+            if game is not None and not my_turn and self.pondering and played_at_count is not None:
+                if await self.ponder_for(game_id, interval):
+                    continue
+            await asyncio.sleep(interval)
+
+    async def ponder_for(self, game_id, seconds):
+        """
+        Ponder on the game's lane for up to 'seconds', in slices of at most
+        scheduler.PONDER_SLICE_SECONDS, for as long as the lane has no
+        search to run.
+        Returns True if it pondered (and then waited out the rest of
+        'seconds', so the poll interval is used up).
+        """
+        lane_scheduler = self.schedulers[self.lane_for(game_id)]
+        stop_at = time.monotonic() + seconds
+        pondered = False
+        while self.running:
+            left = stop_at - time.monotonic()
+            if left <= 0:
+                break
+            if await lane_scheduler.ponder(game_id, left) is None:
+                break
+            self.ponder_slices += 1
+            pondered = True
+        if pondered:
+            await asyncio.sleep(max(0.0, stop_at - time.monotonic()))
+        return pondered
+
+    async def play_turn(self, game_id, game, turn_start):
+        """
+        Sync the board, search on the game's lane, post the move.
+        Returns True if a move was posted.
+        """
+        state = game_state.get_state(game_id, game)
+        seconds_per_move = float(game.get("secondspermove") or 0)
+
+        board = await game_state.async_sync_board(self.client, game_id, game)
+        if board is None:
+            return False
+
+        # Deadline counted from when we first saw the turn; the lane's
+        # scheduler shares the time left with the lane's other games
+        job = scheduler.SearchJob(game_id, board, state.target, turn_start, seconds_per_move)
+        result = await self.schedulers[self.lane_for(game_id)].search(job)
+        if result is None:
+            print(f"No valid moves left in game {game_id}.")
+            return False
+
+        row, col, nodes, _, pondered = result
+        if pondered:
+            self.ponder_hits += 1
+        started = time.monotonic()
+        response = await self.client.make_move(game_id, self.team_id, f"{row},{col}")
+        ai.record_network_latency(time.monotonic() - started)
+        if not response or response.get("code") != "OK":
+            print(f"⚠️ Move {row},{col} rejected in game {game_id}: {response}")
+            return False
+        self.scheduler_metrics.record_post(job, time.monotonic())
+        state.apply_own_move(row, col, ai.MY_SYMBOL, response.get("moveId"))
+        self.moves_made += 1
+        print(f"Game {game_id}: played {row},{col} "
+              f"({'ponder hit' if pondered else f'{nodes} nodes'}, "
+              f"{time.monotonic() - turn_start:.2f}s after turn seen)")
+        return True
+
+
+##############################################################################
+# CLI usage
+##############################################################################
+
+if __name__ == "__main__":
+    """
+    Example usage:
+      python bot_daemon.py <my_team_id> [--requests N] [--searches N] [--poll S]
+                           [--max-poll S] [--rate R] [--ponder]
+    Plays every open game of the team until interrupted. --poll and
+    --max-poll bound the adaptive wait between turn checks of a game,
+    --rate caps requests/sec (0 = no cap).
+    """
+    import sys
+    if len(sys.argv) < 2:
+        print("Usage: python bot_daemon.py <my_team_id> [--requests N] [--searches N] [--poll S] "
+              "[--max-poll S] [--rate R] [--ponder]")
+        sys.exit(0)
+
+    def option(name, default, cast):
+        if name in sys.argv[2:]:
+            return cast(sys.argv[sys.argv.index(name) + 1])
+        return default
+
+    daemon = BotDaemon(int(sys.argv[1]),
+                       max_requests=option("--requests", MAX_INFLIGHT_REQUESTS, int),
+                       max_searches=option("--searches", MAX_SEARCHES, int),
+                       poll_seconds=option("--poll", POLL_SECONDS, float),
+                       max_poll_seconds=option("--max-poll", MAX_POLL_SECONDS, float),
+                       max_rate=option("--rate", MAX_REQUESTS_PER_SECOND, float),
+                       pondering="--ponder" in sys.argv[2:] or PONDER)
+    try:
+        asyncio.run(daemon.run())
+    except KeyboardInterrupt:
+        print("Stopped.")
+    print("Polling:", daemon.poll_metrics.to_dict())
+    print("Scheduling:", daemon.scheduler_metrics.to_dict())
@@ -0,0 +1,126 @@
+import json
+import os
+import socket
+import sys
+import time
+
+##############################################################################
+# Thin client for engine_server.py
+#
+# Sends one JSON-lines request over the engine server's Unix socket and
+# prints the reply. Only standard-library modules are imported, so a run
+# costs little more than interpreter startup; the search, the HTTP session
+# and the caches all live in the server.
+##############################################################################
+
+# Socket the engine server listens on (overridable from the environment)
+DEFAULT_SOCKET = os.getenv("ENGINE_SOCKET", "/tmp/ai-p2p-engine.sock")
+# Seconds to wait for a reply (a move may search for the whole move clock)
+REPLY_TIMEOUT = 600.0
+
+
+class EngineClient:
+    """
+    One connection to the engine server, for any number of requests.
+    """
+
+    def __init__(self, path=DEFAULT_SOCKET, timeout=REPLY_TIMEOUT):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(timeout)
+        self.sock.connect(path)
+        self.reader = self.sock.makefile("r", encoding="utf-8")
+
+    def request(self, message):
+        """
+        Send 'message' (a dict with a "cmd") and return the reply dict.
+        """
+        self.sock.sendall((json.dumps(message) + "\n").encode("utf-8"))
+        line = self.reader.readline()
+        if not line:
+            raise ConnectionError("engine server closed the connection")
+        return json.loads(line)
+
+    def close(self):
+        self.reader.close()
+        self.sock.close()
+
+
+def request(message, path=DEFAULT_SOCKET, timeout=REPLY_TIMEOUT):
+    """
+    One request on a fresh connection.
+    """
+    client = EngineClient(path, timeout)
+    try:
+        return client.request(message)
+    finally:
+        client.close()
+
+
+##############################################################################
+# CLI usage
+##############################################################################
+
+if __name__ == "__main__":
+    """
+    Example usage:
+      python engine_client.py <game_id> <my_team_id> [--engine alphabeta|mcts]
+                              [--workers N] [--stats FILE] [--socket PATH]
+      python engine_client.py ping|stats|shutdown [--socket PATH]
+      python engine_client.py forget <game_id> [--socket PATH]
+    The first form is the same as 'python ai.py <game_id> <my_team_id>', run
+    in the engine server.
+    """
+    def option(name, default, cast=str):
+        if name in sys.argv:
+            return cast(sys.argv[sys.argv.index(name) + 1])
+        return default
+
+    args = [a for i, a in enumerate(sys.argv[1:], 1)
+            if not a.startswith("--") and not sys.argv[i - 1].startswith("--")]
+    if not args:
+        print("Usage: python engine_client.py <game_id> <my_team_id> [--engine alphabeta|mcts] "
+              "[--workers N] [--stats FILE] [--socket PATH]")
+        print("       python engine_client.py ping|stats|shutdown|forget <game_id> "
+              "[--socket PATH]")
+        sys.exit(0)
+
+    if args[0] in ("ping", "stats", "shutdown"):
+        message = {"cmd": args[0]}
+    elif args[0] == "forget" and len(args) > 1:
+        message = {"cmd": "forget", "game_id": int(args[1])}
+    elif len(args) > 1:
+        message = {"cmd": "move", "game_id": int(args[0]), "team_id": int(args[1])}
+        for name, cast in (("engine", str), ("workers", int), ("stats", str)):
+            value = option(f"--{name}", None, cast)
+            if value is not None:
+                message[name] = value
+    else:
+        print("❌ Expected <game_id> <my_team_id>, or ping|stats|shutdown|forget.")
+        sys.exit(1)
+
+    path = option("--socket", DEFAULT_SOCKET)
+    started = time.perf_counter()
+    try:
+        reply = request(message, path)
+    except (FileNotFoundError, ConnectionRefusedError):
+        print(f"❌ No engine server at {path} (start one with 'python engine_server.py').")
+        sys.exit(1)
+    except (OSError, ValueError) as e:
+        print(f"❌ Engine server request failed: {e}")
+        sys.exit(1)
+    elapsed = time.perf_counter() - started
+
+    if not reply.get("ok"):
+        print(f"❌ {reply.get('error')}")
+        sys.exit(1)
+    if message["cmd"] == "move":
+        if reply.get("moved"):
+            print(f"✅ Game {message['game_id']}: move made "
+                  f"({reply['seconds']:.3f}s in the engine, {elapsed:.3f}s round trip)")
+        elif reply.get("over"):
+            print(f"Game {message['game_id']} is over.")
+        else:
+            print(f"Game {message['game_id']}: no move made (not our turn, or see the "
+                  "engine server's output).")
+    else:
+        print(json.dumps(reply))
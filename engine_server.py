@@ -0,0 +1,355 @@
+import contextlib
+import json
+import os
+import socketserver
+import subprocess
+import sys
+import threading
+import time
+
+import ai
+import game_state
+import http_client
+from engine_client import DEFAULT_SOCKET, EngineClient
+
+##############################################################################
+# Persistent engine server
+#
+# Every 'python ai.py <game_id> <team_id>' run starts an interpreter,
+# imports the engine, opens a new connection to the API server and starts
+# from empty caches: the board is fetched whole and the transposition
+# table is allocated and filled from scratch. The engine server does that
+# once and then serves moves for as long as it runs, so the pooled HTTP
+# session, the game_state boards and the per-game searchers stay warm from
+# move to move.
+#
+# Requests and replies are JSON lines, read from a Unix socket (one thread
+# per connection, any number of requests per connection) or, with --stdio,
+# from stdin with the replies on stdout:
+#   {"cmd": "move", "game_id": 12, "team_id": 2}    one ai_make_move() call
+#      [+ "engine", "workers", "stats"]             -> {"ok", "moved", "over", "seconds"}
+#   {"cmd": "forget", "game_id": 12}                drop the game's caches
+#   {"cmd": "ping"} / {"cmd": "stats"}              liveness / counters
+#   {"cmd": "shutdown"}
+# Moves for different games may run at the same time; moves for one game
+# are serialized, and so are parallel searches (workers > 0), which share
+# one process pool (see parallel.py). engine_client.py is the matching thin
+# client.
+##############################################################################
+
+# Moves used by measure_overhead() per method
+MEASURE_MOVES = 10
+
+
+class EngineServer:
+    """
+    Handles requests against this process's warm engine state.
+    """
+
+    def __init__(self, workers=ai.SEARCH_WORKERS, stats_file=ai.SEARCH_STATS_FILE,
+                 engine=ai.SEARCH_ENGINE):
+        self.workers = workers
+        self.stats_file = stats_file
+        self.engine = engine
+        self.started = time.monotonic()
+        self.requests = 0
+        self.moves = 0
+        self.move_seconds = 0.0
+        self.stopping = threading.Event()
+        self.lock = threading.Lock()
+        self.game_locks = {}
+
+    def game_lock(self, game_id):
+        with self.lock:
+            return self.game_locks.setdefault(game_id, threading.Lock())
+
+    def handle(self, request):
+        """
+        The reply dict for one request dict.
+        """
+        self.requests += 1
+        cmd = request.get("cmd")
+        try:
+            if cmd == "move":
+                return self.move(request)
+            if cmd == "forget":
+                self.forget(int(request["game_id"]))
+                return {"ok": True}
+            if cmd == "ping":
+                return {"ok": True, "uptime": round(time.monotonic() - self.started, 3)}
+            if cmd == "stats":
+                return {"ok": True, **self.stats()}
+            if cmd == "shutdown":
+                self.stopping.set()
+                return {"ok": True}
+        except (KeyError, TypeError, ValueError) as e:
+            return {"ok": False, "error": f"Bad '{cmd}' request: {e!r}"}
+        except Exception as e:
+            print(f"❌ '{cmd}' request failed: {e!r}")
+            return {"ok": False, "error": repr(e)}
+        return {"ok": False, "error": f"Unknown command '{cmd}'"}
+
+    def move(self, request):
+        game_id = int(request["game_id"])
+        team_id = int(request["team_id"])
+        engine = request.get("engine", self.engine)
+        if engine not in ai.ENGINES:
+            return {"ok": False, "error": f"Unknown engine '{engine}'"}
+        with self.game_lock(game_id):
+            state = game_state.cached_state(game_id)
+            moves_before = state.own_moves if state is not None else 0
+            started = time.perf_counter()
+            playing = ai.ai_make_move(game_id, team_id,
+                                      workers=int(request.get("workers", self.workers)),
+                                      stats_file=request.get("stats", self.stats_file),
+                                      engine=engine)
+            seconds = time.perf_counter() - started
+            state = game_state.cached_state(game_id)
+            moved = state is not None and state.own_moves > moves_before
+            if not playing:
+                self.forget(game_id)
+        self.moves += moved
+        self.move_seconds += seconds
+        return {"ok": True, "moved": moved, "over": not playing, "seconds": round(seconds, 6)}
+
+    def forget(self, game_id):
+        ai.forget_game(game_id)
+        game_state.forget(game_id)
+        with self.lock:
+            self.game_locks.pop(game_id, None)
+
+    def stats(self):
+        return {
+            "uptime": round(time.monotonic() - self.started, 3),
+            "requests": self.requests,
+            "moves": self.moves,
+            "move_seconds_mean": round(self.move_seconds / self.moves, 6) if self.moves else None,
+            "sync_counts": dict(game_state.sync_counts),
+        }
+
+    def serve_stdio(self, stdin=None, stdout=None):
+        """
+        Serve requests from stdin until EOF or shutdown. Engine output is
+        sent to stderr so that stdout carries nothing but replies.
+        """
+        stdin = stdin or sys.stdin
+        stdout = stdout or sys.stdout
+        with contextlib.redirect_stdout(sys.stderr):
+            for line in stdin:
+                if not line.strip():
+                    continue
+                try:
+                    reply = self.handle(json.loads(line))
+                except ValueError as e:
+                    reply = {"ok": False, "error": f"Bad JSON: {e}"}
+                stdout.write(json.dumps(reply) + "\n")
+                stdout.flush()
+                if self.stopping.is_set():
+                    break
+
+    def serve_socket(self, path=DEFAULT_SOCKET):
+        """
+        Serve requests on the Unix socket 'path' until shutdown.
+        """
+        if os.path.exists(path):
+            try:
+                EngineClient(path, timeout=1.0).close()
+            except OSError:
+                os.unlink(path)         # left over from a server that died
+            else:
+                print(f"❌ An engine server is already listening on {path}.")
+                return False
+
+        engine = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                for line in self.rfile:
+                    if not line.strip():
+                        continue
+                    try:
+                        reply = engine.handle(json.loads(line))
+                    except ValueError as e:
+                        reply = {"ok": False, "error": f"Bad JSON: {e}"}
+                    self.wfile.write((json.dumps(reply) + "\n").encode("utf-8"))
+                    if engine.stopping.is_set():
+                        threading.Thread(target=server.shutdown, daemon=True).start()
+                        return
+
+        server = socketserver.ThreadingUnixStreamServer(path, Handler)
+        server.daemon_threads = True
+        print(f"✅ Engine server listening on {path}")
+        try:
+            server.serve_forever()
+        finally:
+            server.server_close()
+            with contextlib.suppress(FileNotFoundError):
+                os.unlink(path)
+        return True
+
+
+##############################################################################
+# Overhead measurement: engine server vs one-shot CLI
+##############################################################################
+
+def _summary(samples):
+    ordered = sorted(samples)
+    return {"mean": round(sum(ordered) / len(ordered), 4),
+            "p50": round(ordered[len(ordered) // 2], 4),
+            "max": round(ordered[-1], 4)}
+
+
+def measure_overhead(moves=MEASURE_MOVES, size=7, target=4):
+    """
+    Time 'moves' moves each way against a local mock server (fixed-depth
+    search, no move clock):
+      cli     python ai.py <game_id> <team_id>, one process per move
+      client  python engine_client.py <game_id> <team_id> to a running server
+      socket  requests on one open connection to the server (no process
+              start at all)
+    plus the one-off startup costs: importing the engine, starting the
+    server until it answers a ping, and one client run. "engine" is the
+    time the server itself spent per move; the rest of a client move is
+    overhead.
+    """
+    import tempfile
+
+    import mock_server
+
+    my_team, opponent = 2, 1
+    mock = mock_server.MockServer(auto_teams=(opponent,), seed=1)
+    base_url = mock.start()
+    path = os.path.join(tempfile.mkdtemp(), "engine.sock")
+    here = os.path.dirname(os.path.abspath(__file__))
+    env = dict(os.environ, API_BASE_URL=base_url, ENGINE_SOCKET=path)
+    python = sys.executable
+    current = {}
+
+    def our_turn(method):
+        """
+        A game of 'method' where it is our turn (a new one when it ended).
+        """
+        game = current.get(method)
+        while True:
+            if game is None or game.status != "O":
+                game = mock.games[mock.create_game(opponent, my_team, size, target, 0)]
+                current[method] = game
+            if game.status == "O" and game.turn == str(my_team):
+                return game.game_id
+            time.sleep(0.001)
+
+    def run(*args):
+        subprocess.run([python, *args], cwd=here, env=env, check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    def timed(action):
+        started = time.perf_counter()
+        action()
+        return time.perf_counter() - started
+
+    results = {"startup": {}}
+    results["startup"]["import_ai"] = round(timed(lambda: run("-c", "import ai")), 4)
+    server = subprocess.Popen([python, "engine_server.py", "--socket", path], cwd=here, env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        started = time.perf_counter()
+        while True:
+            try:
+                EngineClient(path, timeout=1.0).close()
+                break
+            except OSError:
+                if server.poll() is not None:
+                    raise RuntimeError("engine server exited during startup")
+                time.sleep(0.005)
+        results["startup"]["server_ready"] = round(time.perf_counter() - started, 4)
+        results["startup"]["client_ping"] = round(
+            timed(lambda: run("engine_client.py", "ping")), 4)
+
+        walls = {"cli": [], "client": [], "socket": []}
+        engine_seconds = []
+        for _ in range(moves):
+            game_id = our_turn("cli")
+            walls["cli"].append(timed(lambda: run("ai.py", str(game_id), str(my_team))))
+            game_id = our_turn("client")
+            walls["client"].append(timed(lambda: run("engine_client.py", str(game_id),
+                                                     str(my_team))))
+        client = EngineClient(path)
+        try:
+            for _ in range(moves):
+                game_id = our_turn("socket")
+                started = time.perf_counter()
+                reply = client.request({"cmd": "move", "game_id": game_id, "team_id": my_team})
+                walls["socket"].append(time.perf_counter() - started)
+                engine_seconds.append(reply["seconds"])
+            client.request({"cmd": "shutdown"})
+        finally:
+            client.close()
+        server.wait(timeout=10)
+    finally:
+        if server.poll() is None:
+            server.kill()
+        mock.stop()
+
+    results["per_move"] = {method: _summary(samples) for method, samples in walls.items()}
+    results["per_move"]["engine"] = _summary(engine_seconds)
+    engine_mean = results["per_move"]["engine"]["mean"]
+    results["overhead"] = {method: round(results["per_move"][method]["mean"] - engine_mean, 4)
+                           for method in walls}
+    return results
+
+
+##############################################################################
+# CLI usage
+##############################################################################
+
+if __name__ == "__main__":
+    """
+    Example usage:
+      python engine_server.py [--socket PATH] [--workers N] [--stats FILE]
+                              [--engine alphabeta|mcts]
+      python engine_server.py --stdio [...]
+      python engine_server.py --measure [MOVES] [--size N] [--target K]
+    Runs until a shutdown request (or Ctrl-C). --measure times moves through
+    the server against the one-shot ai.py CLI on a local mock server.
+    """
+    def option(name, default, cast=str):
+        if name in sys.argv:
+            return cast(sys.argv[sys.argv.index(name) + 1])
+        return default
+
+    if "-h" in sys.argv or "--help" in sys.argv:
+        print("Usage: python engine_server.py [--socket PATH | --stdio] [--workers N] "
+              "[--stats FILE] [--engine alphabeta|mcts]")
+        print("       python engine_server.py --measure [MOVES] [--size N] [--target K]")
+        sys.exit(0)
+
+    if "--measure" in sys.argv:
+        index = sys.argv.index("--measure") + 1
+        moves = MEASURE_MOVES
+        if index < len(sys.argv) and not sys.argv[index].startswith("--"):
+            moves = int(sys.argv[index])
+        results = measure_overhead(moves, size=option("--size", 7, int),
+                                   target=option("--target", 4, int))
+        print("Startup (s):", results["startup"])
+        for method, row in results["per_move"].items():
+            print(f"  {method:<7} per move: mean {row['mean']:.4f}s, p50 {row['p50']:.4f}s, "
+                  f"max {row['max']:.4f}s")
+        print("Overhead per move beyond the engine's own time (s):", results["overhead"])
+        sys.exit(0)
+
+    engine = option("--engine", ai.SEARCH_ENGINE)
+    if engine not in ai.ENGINES:
+        print(f"❌ Unknown engine '{engine}'. Choose from: {', '.join(ai.ENGINES)}")
+        sys.exit(1)
+    server = EngineServer(workers=option("--workers", ai.SEARCH_WORKERS, int),
+                          stats_file=option("--stats", ai.SEARCH_STATS_FILE),
+                          engine=engine)
+    # Open the pooled HTTP session now rather than on the first move
+    http_client.get_session()
+    try:
+        if "--stdio" in sys.argv:
+            server.serve_stdio()
+        else:
+            server.serve_socket(option("--socket", DEFAULT_SOCKET))
+    except KeyboardInterrupt:
+        print("Stopped.")
@@ -0,0 +1,206 @@
+from api_client import get_board_map, get_moves
+from bitboard import EMPTY, O_SYMBOL, X_SYMBOL, BitBoard
+
+##############################################################################
+# Per-game state cache
+#
+# The static fields of a game (board size, target, team ids) are stored the
+# first time we see its details. The board itself is kept up to date from
+# the 'moves' endpoint: gameDetails already tells us how many moves have
+# been played, so we fetch only the ones we haven't applied yet (plus the
+# last one we have, as an overlap check) and place them by moveId order.
+# The full boardMap is only fetched for a new game, or when the moves don't
+# line up: a gap, an overlap that doesn't match, an occupied cell, or a move
+# count that disagrees with gameDetails.
+##############################################################################
+
+_game_states = {}
+
+# How often each kind of sync happened (all games)
+sync_counts = {"cached": 0, "delta": 0, "full": 0}
+
+
+class GameState:
+    """
+    Static info and the current board of one game.
+    """
+
+    def __init__(self, game_id, board_size, target, team1, team2):
+        self.game_id = game_id
+        self.board_size = board_size
+        self.target = target
+        self.team1 = team1
+        self.team2 = team2
+        self.board = None            # BitBoard, None until the first sync
+        self.move_count = 0          # moves applied to 'board'
+        self.last_move_id = None     # moveId of the newest applied move
+        # Move count from gameDetails when our last move was accepted: a
+        # details read still showing it (and our turn) is stale
+        self.played_at = None
+        self.own_moves = 0           # our moves the server accepted
+
+    def moves_to_fetch(self, expected_count):
+        """
+        How many moves to ask the moves endpoint for to catch up with
+        'expected_count': 0 if already in sync, None if only a full boardMap
+        fetch will do. Includes one already-applied move for the overlap
+        check when we know its id.
+        """
+        if self.board is None or expected_count is None or expected_count < self.move_count:
+            return None
+        missing = expected_count - self.move_count
+        if missing == 0:
+            return 0
+        return missing + (1 if self.last_move_id is not None else 0)
+
+    def apply_moves(self, moves, expected_count):
+        """
+        Apply a moves-endpoint list (any order). Returns False, leaving the
+        board untouched, if the moves don't continue the board exactly up to
+        'expected_count'.
+        """
+        try:
+            ordered = sorted(moves, key=lambda m: int(m["moveId"]))
+        except (KeyError, TypeError, ValueError):
+            return False
+        if self.last_move_id is not None:
+            if not ordered or int(ordered[0]["moveId"]) != self.last_move_id:
+                return False
+            ordered = ordered[1:]
+        if self.move_count + len(ordered) != expected_count:
+            return False
+
+        board = self.board.copy()
+        size = self.board_size
+        for move in ordered:
+            try:
+                r, c = map(int, move["move"].split(","))
+            except (KeyError, AttributeError, ValueError):
+                return False
+            symbol = move.get("symbol")
+            if not (0 <= r < size and 0 <= c < size) or board.get(r, c) != EMPTY \
+                    or symbol not in (X_SYMBOL, O_SYMBOL):
+                return False
+            board.place(r, c, symbol)
+
+        self.board = board
+        self.move_count = expected_count
+        if ordered:
+            self.last_move_id = int(ordered[-1]["moveId"])
+        return True
+
+    def load_board_map(self, map_output):
+        """
+        Replace the board with a full boardMap output. The newest moveId is
+        unknown afterwards, so the next delta skips the overlap check.
+        """
+        self.board = BitBoard.from_map(self.board_size, map_output)
+        self.move_count = (self.board.x_bits | self.board.o_bits).bit_count()
+        self.last_move_id = None
+
+    def apply_own_move(self, row, col, symbol, move_id=None):
+        """
+        Record the move we just posted, so the next sync only needs the
+        opponent's reply. 'move_id' is the id the move endpoint returned.
+        """
+        self.own_moves += 1
+        if self.board is None or self.board.get(row, col) != EMPTY:
+            self.board = None
+            return
+        board = self.board.copy()
+        board.place(row, col, symbol)
+        self.board = board
+        self.move_count += 1
+        try:
+            self.last_move_id = int(move_id) if move_id is not None else None
+        except (TypeError, ValueError):
+            self.last_move_id = None
+
+
+def parse_move_count(game):
+    try:
+        return int(game.get("moves"))
+    except (TypeError, ValueError):
+        return None
+
+
+def get_state(game_id, game):
+    """
+    The cached GameState for 'game_id', created from the parsed 'game'
+    field of its details on first use.
+    """
+    state = _game_states.get(game_id)
+    if state is None:
+        state = GameState(game_id,
+                          int(game.get("boardsize", 3)),
+                          int(game.get("target", 3)),
+                          str(game.get("team1id")),
+                          str(game.get("team2id")))
+        _game_states[game_id] = state
+    return state
+
+
+def cached_state(game_id):
+    """
+    The cached GameState for 'game_id', or None if we haven't seen it.
+    """
+    return _game_states.get(game_id)
+
+
+def forget(game_id):
+    _game_states.pop(game_id, None)
+
+
+def sync_board(game_id, game):
+    """
+    Bring the cached board of 'game_id' up to date with its details
+    ('game', already parsed) and return it as a BitBoard, or None if the
+    board couldn't be fetched.
+    """
+    state = get_state(game_id, game)
+    expected = parse_move_count(game)
+    fetch = state.moves_to_fetch(expected)
+
+    if fetch == 0:
+        sync_counts["cached"] += 1
+        return state.board
+    if fetch and _apply_delta(state, get_moves(game_id, fetch), expected):
+        return state.board
+    return _apply_full(state, get_board_map(game_id), expected)
+
+
+async def async_sync_board(client, game_id, game):
+    """
+    sync_board() for asyncio code; 'client' is a bot_daemon.AsyncApiClient.
+    """
+    state = get_state(game_id, game)
+    expected = parse_move_count(game)
+    fetch = state.moves_to_fetch(expected)
+
+    if fetch == 0:
+        sync_counts["cached"] += 1
+        return state.board
+    if fetch and _apply_delta(state, await client.get_moves(game_id, fetch), expected):
+        return state.board
+    return _apply_full(state, await client.get_board_map(game_id), expected)
+
+
+def _apply_delta(state, data, expected):
+    if data and data.get("code") == "OK" and state.apply_moves(data.get("moves", []), expected):
+        sync_counts["delta"] += 1
+        return True
+    return False
+
+
+def _apply_full(state, board_map, expected):
+    if not board_map or board_map.get("code") != "OK":
+        print("⚠️ Could not fetch board map.")
+        return None
+    state.load_board_map(board_map.get("output", "{}"))
+    sync_counts["full"] += 1
+    if expected is not None and state.move_count != expected:
+        # The board moved on between the two requests; it's still the
+        # current board, so use it and resync from here next time
+        print(f"⚠️ Game {state.game_id}: boardMap has {state.move_count} moves, "
+              f"details said {expected}.")
+    return state.board
@@ -0,0 +1,156 @@
+import os
+
+import requests
+from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+##############################################################################
+# Shared pooled HTTP client for the game API
+#
+# One requests.Session per process, so the TCP/TLS connection to the API
+# server is opened once and reused for every call. GETs (all idempotent
+# reads) are retried with exponential backoff on connection errors and 5xx
+# responses; POSTs (making a move) are never retried once they may have
+# reached the server. Every call has a timeout.
+##############################################################################
+
+load_dotenv()
+
+API_BASE_URL = os.getenv("API_BASE_URL")
+API_KEY = os.getenv("API_KEY")
+USER_ID = os.getenv("USER_ID")
+
+HEADERS = {
+    "x-api-key": API_KEY,
+    "userid": USER_ID,
+    "User-Agent": "PostmanRuntime/7.43.3",
+    "Accept": "*/*",
+    "Accept-Encoding": "gzip, deflate, br",
+    "Connection": "keep-alive"
+}
+
+# Pool / timeout / retry settings (overridable from the environment)
+POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "10"))
+CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "3.05"))
+READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "10"))
+GET_RETRIES = int(os.getenv("HTTP_GET_RETRIES", "3"))
+RETRY_BACKOFF = float(os.getenv("HTTP_RETRY_BACKOFF", "0.3"))
+RETRY_STATUSES = (500, 502, 503, 504)
+
+_session = None
+# Optional process-wide request-rate cap (a turn_wait.TokenBucket)
+_rate_limiter = None
+
+
+def _build_session(pool_size, retries, backoff):
+    retry = Retry(
+        total=retries,
+        connect=retries,
+        read=retries,
+        status=retries,
+        backoff_factor=backoff,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset({"GET"}),
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size,
+                          max_retries=retry)
+    session = requests.Session()
+    session.headers.update(HEADERS)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def get_session():
+    """
+    The process-wide pooled session, created on first use.
+    """
+    global _session
+    if _session is None:
+        _session = _build_session(POOL_SIZE, GET_RETRIES, RETRY_BACKOFF)
+    return _session
+
+
+def configure(pool_size=None, connect_timeout=None, read_timeout=None,
+              retries=None, backoff=None, base_url=None):
+    """
+    Change client settings; the session is rebuilt on the next request.
+    """
+    global POOL_SIZE, CONNECT_TIMEOUT, READ_TIMEOUT, GET_RETRIES
+    global RETRY_BACKOFF, API_BASE_URL
+    if pool_size is not None:
+        POOL_SIZE = pool_size
+    if connect_timeout is not None:
+        CONNECT_TIMEOUT = connect_timeout
+    if read_timeout is not None:
+        READ_TIMEOUT = read_timeout
+    if retries is not None:
+        GET_RETRIES = retries
+    if backoff is not None:
+        RETRY_BACKOFF = backoff
+    if base_url is not None:
+        API_BASE_URL = base_url
+    close()
+
+
+def set_rate_limiter(bucket):
+    """
+    Make every request take a token from 'bucket' first (None = no cap).
+    """
+    global _rate_limiter
+    _rate_limiter = bucket
+
+
+def close():
+    global _session
+    if _session is not None:
+        _session.close()
+    _session = None
+
+
+def _timeout(timeout):
+    return timeout if timeout is not None else (CONNECT_TIMEOUT, READ_TIMEOUT)
+
+
+def api_get(params, timeout=None):
+    """
+    GET the API with query 'params'. Returns the Response, or None if the
+    request failed after retries.
+    """
+    if _rate_limiter is not None:
+        _rate_limiter.acquire()
+    try:
+        return get_session().get(API_BASE_URL, params=params, timeout=_timeout(timeout))
+    except requests.RequestException as e:
+        print(f"ERROR: GET {params.get('type')} failed: {e}")
+        return None
+
+
+def api_post(data, timeout=None):
+    """
+    POST form 'data' to the API (not retried). Returns the Response or None.
+    """
+    if _rate_limiter is not None:
+        _rate_limiter.acquire()
+    try:
+        return get_session().post(API_BASE_URL, data=data, timeout=_timeout(timeout))
+    except requests.RequestException as e:
+        print(f"ERROR: POST {data.get('type')} failed: {e}")
+        return None
+
+
+def parse_json(response, error_message):
+    """
+    Decode a Response's JSON body, printing 'error_message' and the raw body
+    if it isn't JSON. Returns None on failure.
+    """
+    if response is None:
+        return None
+    try:
+        return response.json()
+    except ValueError:
+        print(error_message)
+        print("Raw response:", response.text)
+        return None
@@ -0,0 +1,511 @@
+import math
+import random
+import time
+
+from bitboard import full_mask, get_line_masks, is_win, iter_bits
+from np_eval import bits_to_array, np, numpy_available
+from ordering import DEFAULT_RADIUS, MoveOrderer, get_neighborhood_masks, near_mask
+from search import THREAT_TIME_SHARE
+from threats import ThreatSolver
+
+##############################################################################
+# Monte Carlo Tree Search engine
+#
+# An alternative to alpha-beta (search.py) for big boards with long targets,
+# where a static evaluation at a shallow depth says little. Every iteration
+# walks down the tree by UCT (or PUCT, with priors from the move orderer's
+# threat scores), adds one node, plays the game out from there and backs
+# the result up the path. Candidates are the empty cells near stones, as in
+# the alpha-beta search.
+#
+# Playouts are biased towards the fight: moves are drawn from the cells
+# next to a stone, a side that can complete a line through its last move
+# does, and a side facing such a win blocks it. With 'batch' (needs NumPy)
+# a leaf is scored by PLAYOUT_BATCH playouts at once instead: each game
+# fills the board in a random order (near cells first) and the side that
+# completes a window first wins.
+#
+# Nodes use __slots__ and hold no board; the position is rebuilt from the
+# moves on the way down. The tree is kept between our moves: if the new
+# position is our last root plus our move and one reply that are already in
+# the tree, that subtree becomes the new root.
+##############################################################################
+
+# Selection rule: "uct" or "puct"
+POLICIES = ("uct", "puct")
+DEFAULT_POLICY = "uct"
+UCT_EXPLORATION = 1.4
+PUCT_EXPLORATION = 2.0
+# Value of a child nobody has visited yet (PUCT)
+FIRST_PLAY_VALUE = 0.5
+# Iterations for a search without a deadline
+DEFAULT_ITERATIONS = 2000
+# Playouts only consider empty cells this close to a stone
+PLAYOUT_RADIUS = 1
+# Playouts per leaf with NumPy batching
+PLAYOUT_BATCH = 32
+# Stop adding nodes past this many (playouts still run from the leaves)
+MAX_NODES = 200000
+# How many iterations between deadline checks
+TIME_CHECK_INTERVAL = 16
+
+WIN = 1.0
+DRAW = 0.5
+LOSS = 0.0
+
+
+class Node:
+    """
+    One position in the tree, reached by 'move'. 'value' sums the playout
+    results from the point of view of the player who made 'move'.
+    """
+
+    __slots__ = ("move", "parent", "children", "untried", "visits", "value", "prior", "terminal")
+
+    def __init__(self, move, parent, prior=1.0, terminal=None):
+        self.move = move
+        self.parent = parent
+        self.children = []
+        self.untried = None          # moves not expanded yet, best last; None = not generated
+        self.visits = 0
+        self.value = 0.0
+        self.prior = prior
+        self.terminal = terminal     # result for the player who moved here, if the game ended
+
+
+class MCTS:
+    """
+    Monte Carlo tree search state for one (board size, target). Keep one
+    per game so the tree is reused from move to move.
+    """
+
+    def __init__(self, size, target, policy=DEFAULT_POLICY, radius=DEFAULT_RADIUS,
+                 playout_radius=PLAYOUT_RADIUS, batch=False, seed=None):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown policy '{policy}'. Choose from: {', '.join(POLICIES)}")
+        self.size = size
+        self.target = target
+        self.policy = policy
+        self.radius = radius
+        self.full = full_mask(size)
+        self.line_masks, self.cell_masks = get_line_masks(size, target)
+        if radius is None:
+            self.neighborhoods = (self.full,) * (size * size)
+        else:
+            self.neighborhoods = get_neighborhood_masks(size, radius)
+        self.playout_neighborhoods = get_neighborhood_masks(size, playout_radius)
+        self.orderer = MoveOrderer(size, target, self.cell_masks)
+        self.threat_solver = ThreatSolver(size, target)
+        self.rng = random.Random(seed)
+        self.batch = None
+        if batch:
+            if numpy_available():
+                self.batch = BatchPlayouts(size, target, self.line_masks, seed)
+            else:
+                print("⚠️ NumPy not installed; using one playout per leaf.")
+
+        self.root = None
+        self.root_mine = 0
+        self.root_theirs = 0
+        self.node_count = 0
+        # Playouts run (a batch counts every game in it)
+        self.nodes = 0
+        self.iterations = 0
+        self.reused_visits = 0
+        # Same fields as search.Searcher, so callers can treat both alike:
+        # root win rate (0..1) of the chosen move, and whether it was forced
+        self.last_value = None
+        self.last_depth = None
+        self.last_forced = False
+        # search_stats collector; only its node (playout) count applies here
+        self.stats = None
+
+    ##########################################################################
+    # Tree
+    ##########################################################################
+
+    def set_root(self, mine, theirs):
+        """
+        Make (mine, theirs), 'mine' to move, the root: reuse the subtree if
+        it is two plies below the old root (our move and their reply), or
+        the old root itself, otherwise start a new tree.
+        """
+        node = None
+        if self.root is not None:
+            if (mine, theirs) == (self.root_mine, self.root_theirs):
+                node = self.root
+            elif (mine & self.root_mine == self.root_mine
+                    and theirs & self.root_theirs == self.root_theirs):
+                ours = mine & ~self.root_mine
+                reply = theirs & ~self.root_theirs
+                if ours and not ours & (ours - 1) and reply and not reply & (reply - 1):
+                    node = self._child(self._child(self.root, ours.bit_length() - 1),
+                                       reply.bit_length() - 1)
+        if node is None:
+            node = Node(None, None)
+        node.parent = None
+        self.node_count = _subtree_size(node)
+        self.reused_visits = node.visits
+        self.root = node
+        self.root_mine = mine
+        self.root_theirs = theirs
+
+    @staticmethod
+    def _child(node, move):
+        if node is None:
+            return None
+        for child in node.children:
+            if child.move == move:
+                return child
+        return None
+
+    def _expand_moves(self, node, own, opp, near):
+        """
+        Generate the candidate moves of a node, with priors for PUCT.
+        """
+        empty = self.full & ~(own | opp)
+        candidates = near & empty or empty
+        threat_score = self.orderer.threat_score
+        scored = sorted((threat_score(idx, own, opp), idx) for idx in iter_bits(candidates))
+        if self.policy == "puct":
+            weights = [math.sqrt(1 + score) for score, _ in scored]
+            total = sum(weights)
+            for (_, idx), weight in zip(scored, weights):
+                node.children.append(self._new_child(node, idx, own, opp, weight / total))
+            node.untried = []
+        else:
+            node.untried = [idx for _, idx in scored]
+
+    def _new_child(self, node, idx, own, opp, prior=1.0):
+        own |= 1 << idx
+        terminal = None
+        if is_win(own, idx, self.cell_masks):
+            terminal = WIN
+        elif own | opp == self.full:
+            terminal = DRAW
+        self.node_count += 1
+        return Node(idx, node, prior, terminal)
+
+    def _select(self, node):
+        log_n = math.log(node.visits) if node.visits else 0.0
+        sqrt_n = math.sqrt(node.visits)
+        best = None
+        best_score = -math.inf
+        puct = self.policy == "puct"
+        for child in node.children:
+            if child.terminal == WIN:
+                return child
+            if puct:
+                q = child.value / child.visits if child.visits else FIRST_PLAY_VALUE
+                score = q + PUCT_EXPLORATION * child.prior * sqrt_n / (1 + child.visits)
+            else:
+                score = (child.value / child.visits
+                         + UCT_EXPLORATION * math.sqrt(log_n / child.visits))
+            if score > best_score:
+                best, best_score = child, score
+        return best
+
+    def iterate(self):
+        """
+        One selection / expansion / playout / backup pass from the root.
+        """
+        node = self.root
+        own, opp = self.root_mine, self.root_theirs
+        near = near_mask(self.size, own | opp, self.radius)
+        neighborhoods = self.neighborhoods
+
+        # Selection: down through fully expanded nodes
+        while node.terminal is None and node.untried is not None and not node.untried:
+            node = self._select(node)
+            own, opp = opp, own | (1 << node.move)
+            near |= neighborhoods[node.move]
+
+        # Expansion: UCT adds one new child; PUCT creates all children of a
+        # node on its second visit and steps into the most promising one
+        if (node.terminal is None and self.node_count < MAX_NODES
+                and (node.visits or node is self.root)):
+            if node.untried is None:
+                self._expand_moves(node, own, opp, near)
+            if node.untried:
+                idx = node.untried.pop()
+                child = self._new_child(node, idx, own, opp)
+                node.children.append(child)
+                node = child
+                own, opp = opp, own | (1 << idx)
+                near |= neighborhoods[idx]
+            elif node.children:
+                node = self._select(node)
+                own, opp = opp, own | (1 << node.move)
+                near |= neighborhoods[node.move]
+
+        # Playout: result for the player who moved into 'node'
+        if node.terminal is not None:
+            result = node.terminal
+            self.nodes += 1
+        elif self.batch is not None:
+            result = 1.0 - self.batch.playouts(own, opp, PLAYOUT_BATCH)
+            self.nodes += PLAYOUT_BATCH
+        else:
+            last_own = node.parent.move if node.parent is not None else None
+            result = 1.0 - self.playout(own, opp, last_own, node.move)
+            self.nodes += 1
+
+        # Backup, flipping the point of view at every level
+        while node is not None:
+            node.visits += 1
+            node.value += result
+            result = 1.0 - result
+            node = node.parent
+        self.iterations += 1
+
+    ##########################################################################
+    # Playouts
+    ##########################################################################
+
+    def playout(self, own, opp, last_own=None, last_opp=None):
+        """
+        Play a biased random game from (own, opp), 'own' to move, where
+        'last_own' / 'last_opp' are the two sides' last moves (if known).
+        Returns WIN / DRAW / LOSS for 'own'.
+        """
+        full = self.full
+        cell_masks = self.cell_masks
+        neighborhoods = self.playout_neighborhoods
+        need = self.target - 1
+        rng = self.rng
+
+        empty = full & ~(own | opp)
+        stones = own | opp
+        pool_mask = 0
+        for idx in iter_bits(stones):
+            pool_mask |= neighborhoods[idx]
+        pool_mask &= empty
+        pool = list(iter_bits(pool_mask))
+        sign = True                  # True while the original 'own' is to move
+        while empty:
+            # Finish a line through our last move, or block theirs
+            move = None
+            if last_own is not None:
+                for mask in cell_masks[last_own]:
+                    if not opp & mask and (own & mask).bit_count() == need and mask & empty:
+                        return WIN if sign else LOSS
+            if last_opp is not None:
+                for mask in cell_masks[last_opp]:
+                    if not own & mask and (opp & mask).bit_count() == need and mask & empty:
+                        move = (mask & empty).bit_length() - 1
+                        break
+            if move is None:
+                while pool:
+                    i = rng.randrange(len(pool))
+                    move = pool[i]
+                    pool[i] = pool[-1]
+                    pool.pop()
+                    if empty >> move & 1:
+                        break
+                    move = None
+                if move is None:
+                    move = rng.choice(list(iter_bits(empty)))
+            bit = 1 << move
+            own |= bit
+            empty ^= bit
+            if is_win(own, move, cell_masks):
+                return WIN if sign else LOSS
+            fresh = neighborhoods[move] & empty & ~pool_mask
+            if fresh:
+                pool_mask |= fresh
+                pool.extend(iter_bits(fresh))
+            own, opp = opp, own
+            last_own, last_opp = last_opp, move
+            sign = not sign
+        return DRAW
+
+    ##########################################################################
+    # Running
+    ##########################################################################
+
+    def run(self, deadline=None, iterations=DEFAULT_ITERATIONS):
+        """
+        Iterate until 'deadline' (a time.monotonic() timestamp), or for
+        'iterations' passes without one.
+        """
+        count = 0
+        while True:
+            if deadline is None:
+                if count >= iterations:
+                    break
+            elif not count % TIME_CHECK_INTERVAL and time.monotonic() >= deadline:
+                break
+            self.iterate()
+            count += 1
+            if self.root.terminal is not None:
+                break
+        return count
+
+    def best_child(self):
+        """
+        The most visited root child (a known win first), or None.
+        """
+        best = None
+        for child in self.root.children:
+            if child.terminal == WIN:
+                return child
+            if best is None or (child.visits, child.value) > (best.visits, best.value):
+                best = child
+        return best
+
+
+def _subtree_size(node):
+    count = 0
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        count += 1
+        stack.extend(node.children)
+    return count
+
+
+##############################################################################
+# NumPy batched playouts (optional)
+##############################################################################
+
+class BatchPlayouts:
+    """
+    Many random games from one position in a handful of array operations:
+    every game draws a random order for the empty cells (cells next to a
+    stone first, then the rest), the side to move takes the 1st, 3rd, ...
+    cells of that order, and the winner is whoever completes a window at
+    the earliest point in it.
+    """
+
+    def __init__(self, size, target, line_masks, seed=None):
+        self.size = size
+        self.cells = size * size
+        self.windows = np.array([list(iter_bits(mask)) for mask in line_masks],
+                                dtype=np.int64).reshape(-1, target)
+        self.neighborhoods = get_neighborhood_masks(size, 1)
+        self.rng = np.random.default_rng(seed)
+
+    def playouts(self, own, opp, count):
+        """
+        Average result (WIN = 1, DRAW = 0.5, LOSS = 0) of 'count' playouts
+        for 'own', which is to move.
+        """
+        size = self.size
+        cells = self.cells
+        empty_cells = np.flatnonzero(bits_to_array(own | opp, size) == 0)
+        if not len(empty_cells):
+            return DRAW
+        near = 0
+        for idx in iter_bits(own | opp):
+            near |= self.neighborhoods[idx]
+        is_far = (bits_to_array(near, size)[empty_cells] == 0).astype(np.float64)
+
+        # Fill time of every empty cell in every game; stones already on
+        # the board are at time -1
+        keys = self.rng.random((count, len(empty_cells))) + is_far
+        order = np.argsort(keys, axis=1)
+        times = np.full((count, cells), -1, dtype=np.int64)
+        rows = np.arange(count)[:, None]
+        times[rows, empty_cells[order]] = np.arange(len(empty_cells))
+
+        # Owner: +1 'own' (even fill times and its stones), -1 'opp'
+        owner = np.where(times % 2 == 0, 1, -1)
+        owner[:, np.flatnonzero(bits_to_array(opp, size))] = -1
+        owner[:, np.flatnonzero(bits_to_array(own, size))] = 1
+
+        window_owner = owner[:, self.windows]                  # (count, windows, target)
+        window_time = times[:, self.windows].max(axis=2)
+        never = cells + 1
+        own_done = np.where((window_owner == 1).all(axis=2), window_time, never).min(axis=1)
+        opp_done = np.where((window_owner == -1).all(axis=2), window_time, never).min(axis=1)
+        results = np.where(own_done < opp_done, WIN, np.where(opp_done < own_done, LOSS, DRAW))
+        return float(results.mean())
+
+
+##############################################################################
+# Entry point
+##############################################################################
+
+def choose_best_move(board, target, my_symbol, opp_symbol, tree=None, deadline=None,
+                     iterations=DEFAULT_ITERATIONS, threats=True):
+    """
+    MCTS counterpart of search.choose_best_move: immediate wins first, then
+    (if 'threats') the threat-space solver's forced win or must-block move,
+    then tree search until 'deadline' (or for 'iterations' passes). Pass an
+    MCTS as 'tree' to reuse it across moves. Returns (row, col) or None.
+    """
+    size = board.size
+    if tree is None:
+        tree = MCTS(size, target)
+    mine = board.bits_for(my_symbol)
+    theirs = board.bits_for(opp_symbol)
+    empty = tree.full & ~(mine | theirs)
+    if not empty:
+        return None
+
+    tree.last_value = None
+    tree.last_depth = None
+    tree.last_forced = True
+    for idx in iter_bits(empty):
+        if is_win(mine | (1 << idx), idx, tree.cell_masks):
+            return divmod(idx, size)
+    if threats:
+        threat_deadline = None
+        if deadline is not None:
+            now = time.monotonic()
+            threat_deadline = now + max(0.0, deadline - now) * THREAT_TIME_SHARE
+        found = tree.threat_solver.find_threat_move(mine, theirs, threat_deadline)
+        if found is not None:
+            return divmod(found[1], size)
+    tree.last_forced = False
+
+    tree.set_root(mine, theirs)
+    tree.run(deadline, iterations)
+    best = tree.best_child()
+    if best is None:
+        return divmod(next(iter_bits(empty)), size)
+    tree.last_value = best.value / best.visits if best.visits else None
+    return divmod(best.move, size)
+
+
+if __name__ == "__main__":
+    """
+    Example usage:
+      python mcts.py [size] [target] [seconds] [--puct] [--batch]
+    Plays one game of MCTS against the alpha-beta engine and prints it.
+    """
+    import sys
+
+    import search
+    from bitboard import BitBoard
+
+    positional = [a for a in sys.argv[1:] if not a.startswith("--")]
+    size = int(positional[0]) if len(positional) > 0 else 7
+    target = int(positional[1]) if len(positional) > 1 else 4
+    seconds = float(positional[2]) if len(positional) > 2 else 1.0
+    tree = MCTS(size, target, policy="puct" if "--puct" in sys.argv else "uct",
+                batch="--batch" in sys.argv)
+    searcher = search.Searcher(size, target)
+    board = BitBoard(size)
+    turn = "X"
+    while True:
+        deadline = time.monotonic() + seconds
+        if turn == "X":
+            before = tree.iterations
+            move = choose_best_move(board, target, "X", "O", tree, deadline)
+            info = (f"mcts, {tree.iterations - before} iterations, "
+                    f"{tree.reused_visits} visits reused")
+        else:
+            move = search.choose_best_move(board, target, "O", "X", searcher, deadline)
+            info = f"alpha-beta, depth {searcher.last_depth}"
+        if move is None:
+            print("Draw.")
+            break
+        board.place(move[0], move[1], turn)
+        print(f"{turn} plays {move[0]},{move[1]} ({info})")
+        bits = board.bits_for(turn)
+        if is_win(bits, move[0] * size + move[1], tree.cell_masks):
+            print(board)
+            print(f"{turn} wins.")
+            break
+        turn = "O" if turn == "X" else "X"
@@ -0,0 +1,505 @@
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from bitboard import full_mask, get_line_masks, is_win, iter_bits
+from ordering import near_mask
+
+##############################################################################
+# Local stand-in game server
+#
+# An in-process HTTP server speaking the same API as the real one, for
+# offline load tests of api_client.py / ai.py / bot_daemon.py. Every request
+# type the code uses is implemented with the real JSON shapes:
+#   GET  ?type=myGames                  {"myGames": [{"12": "1:2:O"}], ...}
+#   GET  ?type=gameDetails&gameId=      {"game": "<JSON string>", ...}
+#   GET  ?type=boardMap&gameId=         {"output": "{\"r,c\": \"X\"}", ...}
+#   GET  ?type=boardString&gameId=      {"output": "--X\n-O-\n...", ...}
+#   GET  ?type=moves&gameId=&count=     {"moves": [newest first], ...}
+#   POST type=move&gameId=&teamId=&move=r,c
+# Team 1 plays "O" and moves first, team 2 plays "X". Latency, an error
+# rate (HTTP 503) and move clocks are configurable; teams listed as
+# 'auto_teams' are played by a simple built-in opponent.
+#
+# Point the clients at it with API_BASE_URL=http://127.0.0.1:<port>/api
+# (or http_client.configure(base_url=...) in the same process).
+##############################################################################
+
+TEAM1_SYMBOL = "O"
+TEAM2_SYMBOL = "X"
+
+
+class MockGame:
+    """
+    State of one simulated game.
+    """
+
+    def __init__(self, game_id, team1, team2, size, target, seconds_per_move):
+        self.game_id = game_id
+        self.team1 = str(team1)
+        self.team2 = str(team2)
+        self.size = size
+        self.target = target
+        self.seconds_per_move = seconds_per_move
+        self.bits = {TEAM1_SYMBOL: 0, TEAM2_SYMBOL: 0}
+        self.moves = []              # dicts in move order
+        self.turn = self.team1
+        self.turn_started = time.monotonic()
+        self.status = "O"
+        self.winner = None
+        self.late_moves = 0
+
+    def symbol_for(self, team_id):
+        return TEAM1_SYMBOL if team_id == self.team1 else TEAM2_SYMBOL
+
+    def other(self, team_id):
+        return self.team2 if team_id == self.team1 else self.team1
+
+    def details(self):
+        return {
+            "gameid": str(self.game_id),
+            "gametype": "TTT",
+            "moves": len(self.moves),
+            "boardsize": str(self.size),
+            "target": str(self.target),
+            "team1id": self.team1,
+            "team1Name": f"Team{self.team1}",
+            "team2id": self.team2,
+            "team2Name": f"Team{self.team2}",
+            "secondspermove": str(self.seconds_per_move),
+            "status": self.status,
+            "winnerteamid": self.winner,
+            "turnteamid": self.turn,
+        }
+
+    def board_map(self):
+        board = {}
+        for move in self.moves:
+            board[move["move"]] = move["symbol"]
+        return board
+
+    def board_string(self):
+        rows = [["-"] * self.size for _ in range(self.size)]
+        for move in self.moves:
+            rows[int(move["moveX"])][int(move["moveY"])] = move["symbol"]
+        return "".join("".join(row) + "\n" for row in rows)
+
+
+class MockServer:
+    """
+    The stand-in server. start() returns the base URL to point clients at.
+    """
+
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0, auto_teams=(),
+                 opponent_think=0.0, forfeit_on_timeout=False, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.auto_teams = {str(t) for t in auto_teams}
+        self.opponent_think = opponent_think
+        self.forfeit_on_timeout = forfeit_on_timeout
+        self.rng = random.Random(seed)
+        self.games = {}
+        self.lock = threading.Lock()
+        self.next_game_id = 1
+        self.next_move_id = 1
+        self.httpd = None
+        self.thread = None
+        self.timers = []
+        # Metrics
+        self.request_counts = {}
+        self.injected_errors = 0
+        self.turn_latencies = []     # seconds from turn start to move, non-auto teams
+        self.started_at = None
+
+    ######################################################################
+    # Lifecycle
+    ######################################################################
+
+    def start(self, host="127.0.0.1", port=0):
+        server = self
+
+        class Handler(MockRequestHandler):
+            mock = server
+
+        self.httpd = MockHTTPServer((host, port), Handler)
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        self.started_at = time.monotonic()
+        return self.base_url
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/api"
+
+    def stop(self):
+        for timer in self.timers:
+            timer.cancel()
+        if self.httpd is not None:
+            self.httpd.shutdown()
+            self.httpd.server_close()
+        self.httpd = None
+
+    ######################################################################
+    # Games
+    ######################################################################
+
+    def create_game(self, team1, team2, size=3, target=3, seconds_per_move=600):
+        with self.lock:
+            game = MockGame(self.next_game_id, team1, team2, size, target, seconds_per_move)
+            self.games[game.game_id] = game
+            self.next_game_id += 1
+        self._schedule_opponent(game)
+        return game.game_id
+
+    def _check_clock(self, game, now):
+        if not game.seconds_per_move or now - game.turn_started <= game.seconds_per_move:
+            return
+        if self.forfeit_on_timeout and game.status == "O":
+            game.status = "C"
+            game.winner = game.other(game.turn)
+
+    def play(self, game, team_id, row, col):
+        """
+        Apply a move (caller holds the lock). Returns (ok, message).
+        """
+        now = time.monotonic()
+        self._check_clock(game, now)
+        if game.status != "O":
+            return False, "Game is over"
+        if team_id not in (game.team1, game.team2):
+            return False, "Team is not in this game"
+        if team_id != game.turn:
+            return False, "Not your turn"
+        if not (0 <= row < game.size and 0 <= col < game.size):
+            return False, "Move out of bounds"
+        idx = row * game.size + col
+        if (game.bits[TEAM1_SYMBOL] | game.bits[TEAM2_SYMBOL]) >> idx & 1:
+            return False, "Cell is occupied"
+
+        if game.seconds_per_move and now - game.turn_started > game.seconds_per_move:
+            game.late_moves += 1
+        if team_id not in self.auto_teams:
+            self.turn_latencies.append(now - game.turn_started)
+
+        symbol = game.symbol_for(team_id)
+        game.bits[symbol] |= 1 << idx
+        move_id = self.next_move_id
+        self.next_move_id += 1
+        game.moves.append({
+            "moveId": str(move_id),
+            "gameId": str(game.game_id),
+            "teamId": team_id,
+            "move": f"{row},{col}",
+            "symbol": symbol,
+            "moveX": str(row),
+            "moveY": str(col),
+        })
+
+        _, cell_masks = get_line_masks(game.size, game.target)
+        if is_win(game.bits[symbol], idx, cell_masks):
+            game.status = "C"
+            game.winner = team_id
+        elif (game.bits[TEAM1_SYMBOL] | game.bits[TEAM2_SYMBOL]) == full_mask(game.size):
+            game.status = "C"
+        else:
+            game.turn = game.other(team_id)
+            game.turn_started = now
+        return True, move_id
+
+    ######################################################################
+    # Built-in opponent for 'auto_teams'
+    ######################################################################
+
+    def _schedule_opponent(self, game):
+        if game.status != "O" or game.turn not in self.auto_teams:
+            return
+        delay = self.opponent_think * (0.5 + self.rng.random())
+        timer = threading.Timer(delay, self._opponent_move, args=(game,))
+        timer.daemon = True
+        self.timers.append(timer)
+        timer.start()
+
+    def _opponent_move(self, game):
+        """
+        Win if possible, block if needed, otherwise a random cell near the
+        stones already played.
+        """
+        with self.lock:
+            if game.status != "O" or game.turn not in self.auto_teams:
+                return
+            team = game.turn
+            own = game.bits[game.symbol_for(team)]
+            opp = game.bits[game.symbol_for(game.other(team))]
+            empty = full_mask(game.size) & ~(own | opp)
+            _, cell_masks = get_line_masks(game.size, game.target)
+            choice = None
+            for bits in (own, opp):
+                for idx in iter_bits(empty):
+                    if is_win(bits | (1 << idx), idx, cell_masks):
+                        choice = idx
+                        break
+                if choice is not None:
+                    break
+            if choice is None:
+                cells = list(iter_bits(empty & near_mask(game.size, own | opp, 1))) \
+                    or list(iter_bits(empty))
+                choice = self.rng.choice(cells)
+            self.play(game, team, *divmod(choice, game.size))
+        self._schedule_opponent(game)
+
+    ######################################################################
+    # Request handling
+    ######################################################################
+
+    def handle(self, method, params):
+        """
+        (status, body dict) for one API request.
+        """
+        kind = params.get("type", "")
+        with self.lock:
+            self.request_counts[kind] = self.request_counts.get(kind, 0) + 1
+            inject_error = self.error_rate and self.rng.random() < self.error_rate
+            if inject_error:
+                self.injected_errors += 1
+        delay = self.latency + (self.jitter * self.rng.random() if self.jitter else 0.0)
+        if delay > 0:
+            time.sleep(delay)
+        if inject_error:
+            return 503, {"code": "FAIL", "message": "Injected error"}
+
+        if kind == "myGames":
+            return 200, self._my_games()
+
+        try:
+            game = self.games[int(params.get("gameId", ""))]
+        except (KeyError, ValueError):
+            return 200, {"code": "FAIL", "message": "No such game"}
+
+        if method == "POST":
+            if kind != "move":
+                return 200, {"code": "FAIL", "message": f"Unknown type {kind}"}
+            try:
+                row, col = map(int, params.get("move", "").split(","))
+            except ValueError:
+                return 200, {"code": "FAIL", "message": "Bad move"}
+            with self.lock:
+                ok, result = self.play(game, str(params.get("teamId")), row, col)
+            if not ok:
+                return 200, {"code": "FAIL", "message": result}
+            self._schedule_opponent(game)
+            return 200, {"moveId": result, "code": "OK"}
+
+        with self.lock:
+            self._check_clock(game, time.monotonic())
+            if kind == "gameDetails":
+                return 200, {"game": json.dumps(game.details()), "code": "OK"}
+            if kind == "boardMap":
+                board = game.board_map()
+                return 200, {"output": json.dumps(board) if board else None,
+                             "target": game.target, "code": "OK"}
+            if kind == "boardString":
+                return 200, {"output": game.board_string(), "target": game.target,
+                             "code": "OK"}
+            if kind == "moves":
+                count = int(params.get("count", 100))
+                moves = game.moves[::-1][:count]
+                if not moves:
+                    return 200, {"code": "FAIL", "message": "No moves"}
+                return 200, {"moves": moves, "code": "OK"}
+        return 200, {"code": "FAIL", "message": f"Unknown type {kind}"}
+
+    def _my_games(self):
+        with self.lock:
+            games = [{str(g.game_id): f"{g.team1}:{g.team2}:{g.status}"}
+                     for g in self.games.values()]
+        return {"myGames": games, "code": "OK"}
+
+    ######################################################################
+    # Metrics
+    ######################################################################
+
+    def stats(self):
+        elapsed = time.monotonic() - self.started_at if self.started_at else 0.0
+        total = sum(self.request_counts.values())
+        latencies = sorted(self.turn_latencies)
+
+        def pct(p):
+            if not latencies:
+                return None
+            return latencies[min(len(latencies) - 1, int(p * len(latencies)))]
+
+        return {
+            "seconds": elapsed,
+            "requests": total,
+            "requests_per_sec": total / elapsed if elapsed else 0.0,
+            "by_type": dict(self.request_counts),
+            "injected_errors": self.injected_errors,
+            "games": len(self.games),
+            "completed": sum(1 for g in self.games.values() if g.status == "C"),
+            "moves": sum(len(g.moves) for g in self.games.values()),
+            "late_moves": sum(g.late_moves for g in self.games.values()),
+            "turn_latency_mean": sum(latencies) / len(latencies) if latencies else None,
+            "turn_latency_p50": pct(0.5),
+            "turn_latency_p95": pct(0.95),
+            "turn_latency_max": latencies[-1] if latencies else None,
+        }
+
+
+class MockHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Clients dropping keep-alive connections at shutdown is expected
+        pass
+
+
+class MockRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    mock = None
+
+    def _reply(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        query = parse_qs(urlparse(self.path).query)
+        params = {k: v[0] for k, v in query.items()}
+        self._reply(*self.mock.handle("GET", params))
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        form = parse_qs(self.rfile.read(length).decode())
+        params = {k: v[0] for k, v in form.items()}
+        self._reply(*self.mock.handle("POST", params))
+
+    def log_message(self, format, *args):
+        pass
+
+
+##############################################################################
+# Load test: python mock_server.py [games] [seconds] [options]
+##############################################################################
+
+def load_test(games=200, seconds=30.0, size=7, target=4, seconds_per_move=0,
+              mode="daemon", threads=8, latency=0.0, jitter=0.0, error_rate=0.0,
+              opponent_think=0.2, my_team=2, opponent_team=1, rate=0):
+    """
+    Start a mock server with 'games' games against the built-in opponent,
+    play them for 'seconds' with bot_daemon ("daemon") or with repeated
+    ai.ai_make_move calls from a thread pool ("sync"), and return the
+    server's stats. With seconds_per_move=0 there is no move clock and the
+    bot plays fixed-depth searches, so the numbers show the client side
+    rather than the think time. 'rate' caps the bot's requests/sec
+    (0 = no cap).
+    """
+    import asyncio
+    import contextlib
+    import os
+    from concurrent.futures import ThreadPoolExecutor
+
+    import ai
+    import http_client
+    import turn_wait
+
+    server = MockServer(latency=latency, jitter=jitter, error_rate=error_rate,
+                        auto_teams=(opponent_team,), opponent_think=opponent_think, seed=1)
+    base_url = server.start()
+    http_client.configure(base_url=base_url, pool_size=max(threads, 10))
+    game_ids = [server.create_game(opponent_team, my_team, size, target, seconds_per_move)
+                for _ in range(games)]
+
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        if mode == "daemon":
+            import bot_daemon
+            daemon = bot_daemon.BotDaemon(my_team, poll_seconds=0.25, refresh_seconds=5,
+                                          base_url=base_url, max_rate=rate)
+            asyncio.run(daemon.run(duration=seconds))
+        else:
+            if rate:
+                http_client.set_rate_limiter(turn_wait.TokenBucket(rate))
+            stop_at = time.monotonic() + seconds
+
+            def worker(offset):
+                while time.monotonic() < stop_at:
+                    for game_id in game_ids[offset::threads]:
+                        if time.monotonic() >= stop_at:
+                            break
+                        if server.games[game_id].status == "O":
+                            ai.ai_make_move(game_id, my_team)
+
+            with ThreadPoolExecutor(threads) as pool:
+                list(pool.map(worker, range(threads)))
+
+    http_client.set_rate_limiter(None)
+    stats = server.stats()
+    if mode == "daemon":
+        stats["polling"] = daemon.poll_metrics.to_dict()
+        stats["scheduling"] = daemon.scheduler_metrics.to_dict()
+    server.stop()
+    http_client.close()
+    return stats
+
+
+if __name__ == "__main__":
+    """
+    Example usage:
+      python mock_server.py serve [port]
+      python mock_server.py [games] [seconds] [--sync] [--latency S]
+                            [--errors P] [--size N] [--target K] [--clock S]
+                            [--rate R]
+    """
+    import sys
+
+    if len(sys.argv) > 1 and sys.argv[1] == "serve":
+        port = int(sys.argv[2]) if len(sys.argv) > 2 else 8000
+        server = MockServer(auto_teams=("1",), opponent_think=1.0)
+        url = server.start(port=port)
+        for _ in range(3):
+            server.create_game("1", "2", 3, 3, 60)
+        print(f"Mock server on {url} (games 1-3, you are team 2 / X). Ctrl-C to stop.")
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            server.stop()
+        sys.exit(0)
+
+    def option(name, default, cast):
+        if name in sys.argv:
+            return cast(sys.argv[sys.argv.index(name) + 1])
+        return default
+
+    positional = [a for a in sys.argv[1:3] if not a.startswith("--")]
+    games = int(positional[0]) if len(positional) > 0 else 200
+    seconds = float(positional[1]) if len(positional) > 1 else 30.0
+    stats = load_test(games, seconds,
+                      size=option("--size", 7, int),
+                      target=option("--target", 4, int),
+                      seconds_per_move=option("--clock", 0, float),
+                      mode="sync" if "--sync" in sys.argv else "daemon",
+                      latency=option("--latency", 0.0, float),
+                      error_rate=option("--errors", 0.0, float),
+                      rate=option("--rate", 0, float))
+
+    print(f"{stats['games']} games, {stats['seconds']:.1f}s: {stats['moves']} moves, "
+          f"{stats['completed']} completed, {stats['late_moves']} late")
+    print(f"Requests: {stats['requests']} ({stats['requests_per_sec']:.1f}/s), "
+          f"injected errors: {stats['injected_errors']}")
+    print(f"By type: {stats['by_type']}")
+    if "polling" in stats:
+        print(f"Polling: {stats['polling']}")
+    if "scheduling" in stats:
+        print(f"Scheduling: {stats['scheduling']}")
+    if stats["turn_latency_mean"] is not None:
+        print(f"Turn latency: mean {stats['turn_latency_mean']:.3f}s, "
+              f"p50 {stats['turn_latency_p50']:.3f}s, p95 {stats['turn_latency_p95']:.3f}s, "
+              f"max {stats['turn_latency_max']:.3f}s")
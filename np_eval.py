@@ -0,0 +1,206 @@
+try:
+    import numpy as np
+    from numpy.lib.stride_tricks import sliding_window_view
+except ImportError:  # NumPy is optional; everything else runs without it
+    np = None
+
+from bitboard import get_line_masks
+from patterns import MINE, window_values
+
+##############################################################################
+# NumPy batch evaluator (optional)
+#
+# Scores a whole batch of positions in one vectorised call, using the same
+# window values as patterns.PatternEvaluator so the two agree exactly. A
+# position is an int8 N x N array (+1 mine, -1 theirs, 0 empty); the stone
+# count of every length-'target' window comes from sliding-window views:
+#   rows/columns     - sliding_window_view along one axis, summed
+#   both diagonals   - target x target sliding blocks, summed along the
+#                      block's diagonal / flipped diagonal
+##############################################################################
+
+
+def numpy_available():
+    return np is not None
+
+
+def bits_to_array(bits, size):
+    """
+    0/1 uint8 vector of length size*size for a bitmask (bit i -> cell i).
+    """
+    cells = size * size
+    raw = np.frombuffer(bits.to_bytes((cells + 7) // 8, "little"), dtype=np.uint8)
+    return np.unpackbits(raw, bitorder="little")[:cells]
+
+
+def board_array(mine, theirs, size):
+    """
+    int8 N x N array: +1 for my stones, -1 for theirs, 0 for empty.
+    """
+    flat = bits_to_array(mine, size).astype(np.int8) - bits_to_array(theirs, size).astype(np.int8)
+    return flat.reshape(size, size)
+
+
+class BatchEvaluator:
+    """
+    Vectorised pattern evaluation of many positions at once.
+    """
+
+    def __init__(self, size, target):
+        if np is None:
+            raise ImportError("NumPy is required for the batch evaluator")
+        self.size = size
+        self.target = target
+        line_masks, _ = get_line_masks(size, target)
+        values = window_values(target, len(line_masks))
+
+        # table[m, t]: value of a window with m of my stones and t of theirs
+        # (one spare row/column so a dead sentinel window can be bumped)
+        table = np.zeros((target + 2, target + 2), dtype=np.int64)
+        table[1:target + 1, 0] = values[1:]
+        table[0, 1:target + 1] = [-v for v in values[1:]]
+        self.table = table
+
+        # Cells of every window, in the same order window_counts() uses
+        ids = np.arange(size * size).reshape(1, size, size)
+        self.window_cells = self._windows(ids).reshape(-1, target) if target <= size \
+            else np.zeros((0, target), dtype=np.int64)
+        num_windows = len(self.window_cells)
+
+        # Windows through each cell, padded with a sentinel window index
+        # (num_windows) that is always dead, so bumping it changes nothing
+        per_cell = [[] for _ in range(size * size)]
+        for w, cells in enumerate(self.window_cells):
+            for idx in cells:
+                per_cell[idx].append(w)
+        width = max((len(ws) for ws in per_cell), default=0)
+        self.cell_windows = np.full((size * size, max(width, 1)), num_windows, dtype=np.int64)
+        for idx, ws in enumerate(per_cell):
+            self.cell_windows[idx, :len(ws)] = ws
+
+    def _windows(self, stones):
+        """
+        (B, num_windows, target) view of every window's cells, built with
+        sliding-window views: rows, columns, diagonals, anti-diagonals.
+        """
+        target = self.target
+        batch = stones.shape[0]
+        rows = sliding_window_view(stones, target, axis=2)
+        cols = sliding_window_view(stones, target, axis=1)
+        blocks = sliding_window_view(stones, (target, target), axis=(1, 2))
+        diag = np.diagonal(blocks, axis1=-2, axis2=-1)
+        anti = np.diagonal(blocks[..., ::-1], axis1=-2, axis2=-1)
+        return np.concatenate([rows.reshape(batch, -1, target), cols.reshape(batch, -1, target),
+                               diag.reshape(batch, -1, target), anti.reshape(batch, -1, target)],
+                              axis=1)
+
+    def window_counts(self, stones):
+        """
+        Per-window stone counts for a (B, N, N) 0/1 array. Returns a
+        (B, num_windows) array covering rows, columns and both diagonals.
+        """
+        if self.target > self.size:
+            return np.zeros((stones.shape[0], 0), dtype=np.int64)
+        return self._windows(stones).sum(axis=-1)
+
+    def evaluate(self, boards):
+        """
+        Scores (from my side's view) for a (B, N, N) int8 array of boards.
+        """
+        mine = self.window_counts((boards == 1).astype(np.int8))
+        theirs = self.window_counts((boards == -1).astype(np.int8))
+        return self.table[mine, theirs].sum(axis=1)
+
+    def evaluate_moves(self, mine, theirs, moves, side=MINE):
+        """
+        Score the position after each candidate move (cell indices) for
+        'side', all in one call. Returns an int64 array aligned with 'moves'.
+
+        The parent's window counts are computed once; each child's score is
+        the parent score plus the change in just the windows through its
+        move, gathered for the whole batch at once.
+        """
+        size = self.size
+        base = board_array(mine, theirs, size).reshape(1, size, size)
+        m = self.window_counts((base == 1).astype(np.int8))[0]
+        t = self.window_counts((base == -1).astype(np.int8))[0]
+        table = self.table
+        base_score = table[m, t].sum()
+
+        # Sentinel (dead) window at the end
+        m = np.append(m, 1)
+        t = np.append(t, 1)
+        windows = self.cell_windows[np.asarray(moves, dtype=np.int64)]
+        wm = m[windows]
+        wt = t[windows]
+        if side == MINE:
+            delta = table[wm + 1, wt] - table[wm, wt]
+        else:
+            delta = table[wm, wt + 1] - table[wm, wt]
+        return base_score + delta.sum(axis=1)
+
+
+##############################################################################
+# Benchmark: python np_eval.py [size] [target] [stones]
+##############################################################################
+
+if __name__ == "__main__":
+    import random
+    import sys
+    import time
+
+    import search
+    from bitboard import BitBoard, full_mask, iter_bits
+    from patterns import PatternEvaluator
+
+    if np is None:
+        print("❌ NumPy is not installed.")
+        sys.exit(1)
+
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 15
+    target = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    stones = int(sys.argv[3]) if len(sys.argv) > 3 else 20
+    repeats = 200
+
+    rng = random.Random(1)
+    cells = rng.sample(range(size * size), stones)
+    mine = theirs = 0
+    for i, idx in enumerate(cells):
+        if i % 2 == 0:
+            mine |= 1 << idx
+        else:
+            theirs |= 1 << idx
+    moves = list(iter_bits(full_mask(size) & ~(mine | theirs)))
+
+    # Pure Python: incremental place/read/remove per child
+    evaluator = PatternEvaluator(size, target)
+    evaluator.reset(mine, theirs)
+    start = time.perf_counter()
+    for _ in range(repeats):
+        python_scores = []
+        for idx in moves:
+            evaluator.place(idx, MINE)
+            python_scores.append(evaluator.score)
+            evaluator.remove(idx, MINE)
+    python_time = (time.perf_counter() - start) / repeats
+
+    batch = BatchEvaluator(size, target)
+    start = time.perf_counter()
+    for _ in range(repeats):
+        numpy_scores = batch.evaluate_moves(mine, theirs, moves)
+    numpy_time = (time.perf_counter() - start) / repeats
+
+    assert list(numpy_scores) == python_scores, "batch scores disagree with PatternEvaluator"
+    print(f"{size}x{size}, target {target}, {len(moves)} children per batch")
+    print(f"  pure Python : {python_time * 1e3:8.3f} ms/batch")
+    print(f"  NumPy batch : {numpy_time * 1e3:8.3f} ms/batch ({python_time / numpy_time:.2f}x)")
+
+    # The same comparison inside choose_best_move (fixed depth, no threats)
+    board = BitBoard(size, mine, theirs)
+    for label, batch_eval in (("pure Python", False), ("NumPy batch", True)):
+        searcher = search.Searcher(size, target, batch_eval=batch_eval)
+        start = time.perf_counter()
+        move = search.choose_best_move(board, target, "X", "O", searcher, depth=2, threats=False)
+        elapsed = time.perf_counter() - start
+        print(f"  choose_best_move depth 2, {label:<11}: {elapsed:7.3f} s, "
+              f"{searcher.nodes} nodes, move {move}")
@@ -0,0 +1,291 @@
+import mmap
+import os
+import random
+import struct
+
+from symmetry import canonical, get_symmetries
+from transposition import zobrist_hash
+
+try:
+    import fcntl
+except ImportError:  # no advisory locks on this platform; writes just race
+    fcntl = None
+
+##############################################################################
+# Persistent opening book / position cache
+#
+# A fixed-size open-addressing hash file, memory-mapped, so any number of
+# bot processes can share it and only the pages they touch are read in.
+# Positions are keyed by the Zobrist hash of their canonical image under the
+# board's 8 symmetries (symmetry.py), from the side to move's point of view
+# (so X and O positions share entries), mixed with the board size and
+# target; moves are stored as cells of the canonical image. Every slot is
+# 16 bytes:
+#   check  u64   key XOR data
+#   data   u64   score (32 bits, offset) | move (16) | depth (8) | spare (8)
+# A reader recomputes key = check XOR data, so a slot torn by a concurrent
+# writer simply doesn't match. Writers take an flock on the file.
+##############################################################################
+
+MAGIC = b"TTTBOOK1"
+HEADER = struct.Struct("<8sQ")          # magic, number of slots
+SLOT = struct.Struct("<QQ")
+SLOT_BYTES = SLOT.size
+DEFAULT_SLOTS = 1 << 20                 # 16 MB file
+PROBE_LIMIT = 8                         # slots tried per key
+SCORE_OFFSET = 1 << 31
+KEY_MASK = (1 << 64) - 1
+
+DEFAULT_BOOK_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "opening_book.bin")
+
+# (size, target) -> 63-bit key mixed into every position key
+_config_keys = {}
+
+
+def _config_key(size, target):
+    key = _config_keys.get((size, target))
+    if key is None:
+        key = random.Random(0xB00C ^ (size << 8) ^ target).getrandbits(63)
+        _config_keys[(size, target)] = key
+    return key
+
+
+def book_key(size, target, mine, theirs):
+    """
+    Book key of a position with 'mine' to move (already canonical, see
+    canonical_key). Never 0 (empty slot).
+    """
+    return (zobrist_hash(size, mine, theirs) ^ _config_key(size, target)) or 1
+
+
+def canonical_key(size, target, mine, theirs):
+    """
+    (book key, symmetry) of a position: the key of its canonical image and
+    the symmetry that maps the position onto it.
+    """
+    c_mine, c_theirs, sym = canonical(size, mine, theirs)
+    return book_key(size, target, c_mine, c_theirs), sym
+
+
+def _pack(depth, score, move):
+    return ((score + SCORE_OFFSET) & 0xFFFFFFFF) << 32 | (move & 0xFFFF) << 16 | (depth & 0xFF) << 8
+
+
+def _unpack(data):
+    return (data >> 8) & 0xFF, ((data >> 32) & 0xFFFFFFFF) - SCORE_OFFSET, (data >> 16) & 0xFFFF
+
+
+class OpeningBook:
+    """
+    A book file opened for reading (and writing unless 'readonly').
+    """
+
+    def __init__(self, path=DEFAULT_BOOK_FILE, readonly=False, create=False,
+                 slots=DEFAULT_SLOTS):
+        if create and not os.path.exists(path):
+            create_book(path, slots)
+        self.path = path
+        self.readonly = readonly
+        self.file = open(path, "rb" if readonly else "r+b")
+        access = mmap.ACCESS_READ if readonly else mmap.ACCESS_WRITE
+        self.map = mmap.mmap(self.file.fileno(), 0, access=access)
+        magic, self.slots = HEADER.unpack_from(self.map, 0)
+        if magic != MAGIC or len(self.map) < HEADER.size + self.slots * SLOT_BYTES:
+            self.close()
+            raise ValueError(f"{path} is not an opening book file")
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+
+    def close(self):
+        if self.map is not None:
+            self.map.close()
+            self.map = None
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def _offsets(self, key):
+        start = key % self.slots
+        for i in range(min(PROBE_LIMIT, self.slots)):
+            yield HEADER.size + ((start + i) % self.slots) * SLOT_BYTES
+
+    def probe(self, size, target, mine, theirs):
+        """
+        (depth, score, move) stored for the position or any of its
+        symmetric images (move mapped back onto the position), or None.
+        """
+        key, sym = canonical_key(size, target, mine, theirs)
+        for offset in self._offsets(key):
+            check, data = SLOT.unpack_from(self.map, offset)
+            if not check and not data:
+                break
+            if check ^ data == key:
+                self.hits += 1
+                depth, score, move = _unpack(data)
+                _, inverses, _ = get_symmetries(size)
+                return depth, score, inverses[sym][move]
+        self.misses += 1
+        return None
+
+    def store(self, size, target, mine, theirs, depth, score, move):
+        """
+        Record a search result. An existing entry for the position is only
+        replaced by a deeper one; with no free slot in the probe window the
+        shallowest entry there is evicted.
+        """
+        if self.readonly:
+            return False
+        key, sym = canonical_key(size, target, mine, theirs)
+        perms, _, _ = get_symmetries(size)
+        data = _pack(depth, score, perms[sym][move])
+        if fcntl is not None:
+            fcntl.flock(self.file.fileno(), fcntl.LOCK_EX)
+        try:
+            victim = None
+            victim_depth = None
+            for offset in self._offsets(key):
+                check, old = SLOT.unpack_from(self.map, offset)
+                if not check and not old:
+                    victim = offset
+                    break
+                old_depth = _unpack(old)[0]
+                if check ^ old == key:
+                    if old_depth > depth:
+                        return False
+                    victim = offset
+                    break
+                if victim_depth is None or old_depth < victim_depth:
+                    victim, victim_depth = offset, old_depth
+            SLOT.pack_into(self.map, victim, (key ^ data) & KEY_MASK, data)
+            self.stores += 1
+            return True
+        finally:
+            if fcntl is not None:
+                fcntl.flock(self.file.fileno(), fcntl.LOCK_UN)
+
+    def entries(self):
+        """
+        Yield (depth, score, move) for every filled slot.
+        """
+        for i in range(self.slots):
+            check, data = SLOT.unpack_from(self.map, HEADER.size + i * SLOT_BYTES)
+            if check or data:
+                yield _unpack(data)
+
+
+def create_book(path, slots=DEFAULT_SLOTS):
+    """
+    Create an empty book file with 'slots' entries.
+    """
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, slots))
+        f.truncate(HEADER.size + slots * SLOT_BYTES)
+
+
+# path -> OpeningBook, one per process
+_open_books = {}
+
+
+def get_book(path=DEFAULT_BOOK_FILE, readonly=False):
+    """
+    The process's shared OpeningBook for 'path', or None if there is no
+    such book file.
+    """
+    book = _open_books.get(path)
+    if book is None:
+        if not os.path.exists(path):
+            return None
+        try:
+            book = OpeningBook(path, readonly=readonly)
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Could not open opening book {path}: {e}")
+            return None
+        _open_books[path] = book
+    return book
+
+
+##############################################################################
+# Offline builder: python opening_book.py build <size> <target> [options]
+##############################################################################
+
+def build(book, size, target, depth, plies, width, verbose=True):
+    """
+    Search every position reachable in 'plies' moves from the empty board,
+    following the best move and the next 'width' - 1 candidates at each
+    ply, and store each result at 'depth'. Returns positions searched.
+    """
+    import time
+
+    import search
+    from bitboard import BitBoard
+
+    searcher = search.Searcher(size, target)
+    searcher.book = book
+    searcher.book_write_depth = depth
+    frontier = [(0, 0)]           # (mine, theirs) with 'mine' to move
+    seen = set()
+    searched = 0
+    for ply in range(plies + 1):
+        started = time.perf_counter()
+        next_frontier = []
+        for mine, theirs in frontier:
+            key, _ = canonical_key(size, target, mine, theirs)
+            if key in seen:
+                continue
+            seen.add(key)
+            board = BitBoard(size, mine, theirs)
+            best = search.choose_best_move(board, target, "X", "O", searcher, depth=depth)
+            searched += 1
+            if best is None or ply == plies or searcher.last_forced:
+                continue
+            best_idx = best[0] * size + best[1]
+            moves, _ = search.root_moves(searcher, mine, theirs)
+            followed = [best_idx] + [idx for idx in moves if idx != best_idx][:width - 1]
+            for idx in followed:
+                next_frontier.append((theirs, mine | (1 << idx)))
+        if verbose:
+            print(f"ply {ply}: {len(frontier)} positions, {time.perf_counter() - started:.1f}s")
+        frontier = next_frontier
+    return searched
+
+
+if __name__ == "__main__":
+    """
+    Example usage:
+      python opening_book.py build <size> <target> [--depth D] [--plies P]
+                                   [--width W] [--file PATH] [--slots N]
+      python opening_book.py stats [--file PATH]
+    """
+    import sys
+
+    def option(name, default, cast=str):
+        if name in sys.argv:
+            return cast(sys.argv[sys.argv.index(name) + 1])
+        return default
+
+    path = option("--file", DEFAULT_BOOK_FILE)
+    if len(sys.argv) >= 4 and sys.argv[1] == "build":
+        size, target = int(sys.argv[2]), int(sys.argv[3])
+        book = OpeningBook(path, create=True, slots=option("--slots", DEFAULT_SLOTS, int))
+        count = build(book, size, target,
+                      depth=option("--depth", 4, int),
+                      plies=option("--plies", 2, int),
+                      width=option("--width", 3, int))
+        print(f"✅ Searched {count} positions; {book.stores} entries written to {path}")
+    elif len(sys.argv) >= 2 and sys.argv[1] == "stats":
+        book = get_book(path, readonly=True)
+        if book is None:
+            print(f"❌ No opening book at {path}")
+            sys.exit(1)
+        depths = {}
+        for depth, _, _ in book.entries():
+            depths[depth] = depths.get(depth, 0) + 1
+        total = sum(depths.values())
+        print(f"{path}: {total} / {book.slots} slots used ({100.0 * total / book.slots:.2f}%)")
+        for depth in sorted(depths):
+            print(f"  depth {depth:>3}: {depths[depth]}")
+    else:
+        print("Usage: python opening_book.py build <size> <target> [--depth D] [--plies P] "
+              "[--width W] [--file PATH] [--slots N]")
+        print("       python opening_book.py stats [--file PATH]")
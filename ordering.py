@@ -0,0 +1,173 @@
+from bitboard import iter_bits
+
+##############################################################################
+# Candidate generation & move ordering
+#
+# Candidates are the empty cells within 'radius' (Chebyshev distance) of any
+# stone. The search keeps that "near" mask up to date as it goes: making a
+# move ORs in the move's neighbourhood, and unmaking just drops back to the
+# parent's mask.
+##############################################################################
+
+DEFAULT_RADIUS = 2
+
+# Priorities used when sorting candidates (higher is searched first)
+TT_MOVE_PRIORITY = 1 << 30
+WIN_PRIORITY = 1 << 24     # completes a line for the side to move
+BLOCK_PRIORITY = 1 << 22   # stops the opponent completing a line
+KILLER_PRIORITY = 1 << 20
+# Each extra stone in a still-open window multiplies its value by this
+THREAT_BASE = 4
+KILLERS_PER_PLY = 2
+
+# (size, radius) -> per-cell neighbourhood masks
+_neighborhood_cache = {}
+
+
+def get_neighborhood_masks(size, radius):
+    """
+    Per cell index, the mask of cells within 'radius' of it (excluding the
+    cell itself). Cached per (size, radius).
+    """
+    key = (size, radius)
+    cached = _neighborhood_cache.get(key)
+    if cached is not None:
+        return cached
+
+    masks = []
+    for r in range(size):
+        for c in range(size):
+            mask = 0
+            for rr in range(max(0, r - radius), min(size, r + radius + 1)):
+                for cc in range(max(0, c - radius), min(size, c + radius + 1)):
+                    if rr != r or cc != c:
+                        mask |= 1 << (rr * size + cc)
+            masks.append(mask)
+
+    result = tuple(masks)
+    _neighborhood_cache[key] = result
+    return result
+
+
+def near_mask(size, stones, radius):
+    """
+    Mask of cells within 'radius' of any stone, built from scratch. On an
+    empty board it is the centre cell, so the first move still has a
+    candidate.
+    """
+    if radius is None:
+        return (1 << (size * size)) - 1
+    if not stones:
+        return 1 << ((size // 2) * size + size // 2)
+    neighborhoods = get_neighborhood_masks(size, radius)
+    near = 0
+    for idx in iter_bits(stones):
+        near |= neighborhoods[idx]
+    return near
+
+
+class MoveOrderer:
+    """
+    Orders candidate moves for one search: transposition-table move first,
+    then immediate wins and blocks, killer moves for the ply, and the rest by
+    a cheap threat score plus the history heuristic.
+    """
+
+    def __init__(self, size, target, cell_masks):
+        self.size = size
+        self.target = target
+        self.cell_masks = cell_masks
+        self.history = [0] * (size * size)
+        self.killers = []
+        # Value of an open window holding k stones of one side
+        self.window_values = [THREAT_BASE ** k for k in range(target + 1)]
+        self.window_values[0] = 1
+
+    def new_search(self):
+        """
+        Forget killers and age the history table between searches.
+        """
+        self.killers = []
+        history = self.history
+        for idx in range(len(history)):
+            history[idx] >>= 1
+
+    def threat_score(self, idx, own, opp):
+        """
+        How much playing 'idx' does for the side owning 'own': value of the
+        windows through it it extends, plus the opponent windows it spoils.
+        """
+        need = self.target - 1
+        window_values = self.window_values
+        score = 0
+        for mask in self.cell_masks[idx]:
+            mine = own & mask
+            theirs = opp & mask
+            if not theirs:
+                count = mine.bit_count()
+                if count == need:
+                    score += WIN_PRIORITY
+                else:
+                    score += window_values[count]
+            elif not mine:
+                count = theirs.bit_count()
+                if count == need:
+                    score += BLOCK_PRIORITY
+                else:
+                    score += window_values[count]
+        return score
+
+    def order(self, candidates, own, opp, ply, tt_move, threats=True):
+        """
+        Candidate cell indices (a bitmask) sorted best-first for the side
+        owning 'own'. With threats=False only the TT move, killers and
+        history are used, which is much cheaper right above the leaves.
+        """
+        history = self.history
+        killers = self.killers[ply] if ply < len(self.killers) else ()
+        threat_score = self.threat_score
+        scored = []
+        for idx in iter_bits(candidates):
+            if idx == tt_move:
+                score = TT_MOVE_PRIORITY
+            else:
+                score = history[idx]
+                if threats:
+                    score += threat_score(idx, own, opp)
+                if idx in killers:
+                    score += KILLER_PRIORITY
+            scored.append((-score, idx))
+        scored.sort()
+        return [idx for _, idx in scored]
+
+    def order_scored(self, moves, scores, ply, tt_move):
+        """
+        Like order(), but with precomputed static scores for 'moves' (for
+        example from the NumPy batch evaluator) in place of threat scores.
+        """
+        history = self.history
+        killers = self.killers[ply] if ply < len(self.killers) else ()
+        scored = []
+        for idx, score in zip(moves, scores):
+            if idx == tt_move:
+                score = TT_MOVE_PRIORITY
+            else:
+                score += history[idx]
+                if idx in killers:
+                    score += KILLER_PRIORITY
+            scored.append((-score, idx))
+        scored.sort()
+        return [idx for _, idx in scored]
+
+    def record_cutoff(self, idx, depth, ply):
+        """
+        A move caused a beta cutoff: remember it as a killer for this ply
+        and bump its history score.
+        """
+        self.history[idx] += depth * depth
+        while len(self.killers) <= ply:
+            self.killers.append([])
+        killers = self.killers[ply]
+        if idx not in killers:
+            killers.insert(0, idx)
+            del killers[KILLERS_PER_PLY:]
@@ -0,0 +1,329 @@
+import math
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import search
+from transposition import TranspositionTable
+
+##############################################################################
+# Parallel root search
+#
+# Every root move is its own task on a ProcessPoolExecutor, submitted in
+# move-ordering order. Idle workers pull the next move as soon as they are
+# free, so one expensive subtree never holds up the rest. Workers share the
+# best root score found so far through a small shared array and search each
+# move with alpha = best - 1: anything that can't at least tie the best is
+# cut off early, while ties and improvements still come back exact. The
+# chosen move is the first one in the original order with the top score,
+# which is exactly what the serial search picks at the same depth.
+#
+# The pool, the shared array and the search counter are process-wide, so
+# parallel searches from several threads (engine_server.py serves games
+# on threads) run one at a time.
+##############################################################################
+
+# Per-worker transposition table size (every worker process has its own)
+WORKER_TT_ENTRIES = 1 << 18
+# "No score yet" marker in the shared array
+NO_SCORE = -(1 << 62)
+
+_pool = None
+_pool_workers = 0
+# shared[0] = id of the current search, shared[1] = best root score so far
+_shared = None
+# Held for a whole parallel search, and for creating or shutting down the pool
+_lock = threading.RLock()
+
+# Worker-process state
+_worker_shared = None
+_worker_searchers = {}
+_worker_search_id = None
+
+
+def _init_worker(shared):
+    global _worker_shared
+    _worker_shared = shared
+
+
+def get_pool(workers=None):
+    """
+    Process pool with 'workers' processes (default: one per CPU), created
+    on first use and kept for later searches.
+    """
+    global _pool, _pool_workers, _shared
+    workers = workers or os.cpu_count() or 1
+    with _lock:
+        if _pool is not None and _pool_workers == workers:
+            return _pool
+        shutdown_pool()
+        _shared = multiprocessing.Array("q", [0, NO_SCORE])
+        _pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                    initargs=(_shared,))
+        _pool_workers = workers
+        return _pool
+
+
+def shutdown_pool():
+    global _pool, _pool_workers
+    with _lock:
+        if _pool is not None:
+            _pool.shutdown(wait=True, cancel_futures=True)
+        _pool = None
+        _pool_workers = 0
+
+
+def _worker_searcher(size, target, radius, evaluator, batch_eval, algorithm):
+    key = (size, target, radius, evaluator, batch_eval, algorithm)
+    searcher = _worker_searchers.get(key)
+    if searcher is None:
+        searcher = search.Searcher(size, target,
+                                   TranspositionTable(max_entries=WORKER_TT_ENTRIES),
+                                   radius=radius, evaluator=evaluator, batch_eval=batch_eval,
+                                   algorithm=algorithm)
+        _worker_searchers[key] = searcher
+    return searcher
+
+
+def _search_move_task(search_id, size, target, radius, evaluator, batch_eval, algorithm,
+                      mine, theirs, idx, depth, deadline):
+    """
+    Worker side: search one root move. Returns (idx, value, nodes); value
+    is None if the deadline passed first.
+    """
+    global _worker_search_id
+    searcher = _worker_searcher(size, target, radius, evaluator, batch_eval, algorithm)
+    if _worker_search_id != search_id:
+        searcher.new_search()
+        _worker_search_id = search_id
+
+    with _worker_shared.get_lock():
+        current = _worker_shared[1] if _worker_shared[0] == search_id else NO_SCORE
+    alpha = current - 1 if current != NO_SCORE else -math.inf
+
+    nodes_before = searcher.nodes
+    searcher.deadline = deadline
+    try:
+        value = search.search_root_move(searcher, mine, theirs, idx, depth, alpha)
+    except search.SearchTimeout:
+        return idx, None, searcher.nodes - nodes_before
+    finally:
+        searcher.deadline = None
+
+    with _worker_shared.get_lock():
+        if _worker_shared[0] == search_id and value > _worker_shared[1]:
+            _worker_shared[1] = value
+    return idx, value, searcher.nodes - nodes_before
+
+
+_search_counter = 0
+
+
+def parallel_search_root(pool, searcher, mine, theirs, moves, depth, deadline=None):
+    """
+    Search all root moves at 'depth' across the pool.
+    Returns (best_value, best_idx, nodes), or None if the deadline passed
+    before every move finished.
+    """
+    global _search_counter
+    _search_counter += 1
+    search_id = (os.getpid() << 20) | (_search_counter & 0xFFFFF)
+    with _shared.get_lock():
+        _shared[0] = search_id
+        _shared[1] = NO_SCORE
+
+    futures = [pool.submit(_search_move_task, search_id, searcher.size, searcher.target,
+                           searcher.radius, searcher.evaluator_name,
+                           searcher.batch_evaluator is not None, searcher.algorithm,
+                           mine, theirs, idx, depth, deadline)
+               for idx in moves]
+
+    results = {}
+    nodes = 0
+    pending = set(futures)
+    while pending:
+        timeout = None
+        if deadline is not None:
+            timeout = max(0.0, deadline - time.monotonic())
+        done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+        if not done:
+            break
+        for future in done:
+            idx, value, task_nodes = future.result()
+            nodes += task_nodes
+            if value is None:
+                continue
+            results[idx] = value
+
+    if pending or len(results) < len(moves):
+        for future in pending:
+            future.cancel()
+        return None
+
+    best_value = max(results.values())
+    best_idx = next(idx for idx in moves if results[idx] == best_value)
+    return best_value, best_idx, nodes
+
+
+def choose_best_move_parallel(board, target, my_symbol, opp_symbol, searcher=None,
+                              deadline=None, depth=search.DEFAULT_DEPTH, threats=True,
+                              workers=None):
+    """
+    Same contract (and, at a fixed depth, the same move) as
+    search.choose_best_move, with the root moves spread over 'workers'
+    processes. 'searcher' only provides the settings, the opening book, the
+    forced-move check and root ordering; the workers keep their own
+    transposition tables. Sets searcher.last_value / last_depth /
+    last_forced and records searcher.stats like the serial search, except
+    for the per-node counters (leaves, cutoffs), which stay in the workers.
+    Searches from several threads run one at a time.
+    """
+    with _lock:
+        return _choose_best_move_parallel(board, target, my_symbol, opp_symbol, searcher,
+                                          deadline, depth, threats, workers)
+
+
+def _choose_best_move_parallel(board, target, my_symbol, opp_symbol, searcher, deadline,
+                               depth, threats, workers):
+    size = board.size
+    if searcher is None:
+        searcher = search.Searcher(size, target)
+    mine = board.bits_for(my_symbol)
+    theirs = board.bits_for(opp_symbol)
+    empty = searcher.full & ~(mine | theirs)
+    if not empty:
+        return None
+
+    searcher.last_value = None
+    searcher.last_depth = None
+    searcher.last_forced = False
+    stats = searcher.stats
+
+    book = searcher.book
+    if book is not None:
+        entry = book.probe(size, target, mine, theirs)
+        if entry is not None:
+            book_depth, book_value, book_idx = entry
+            needed = depth if deadline is None else searcher.book_min_depth
+            if book_depth >= needed and empty >> book_idx & 1:
+                searcher.last_value = book_value
+                searcher.last_depth = book_depth
+                if stats is not None:
+                    stats.book = book_depth
+                return divmod(book_idx, size)
+
+    forced = search.forced_move(searcher, mine, theirs, deadline, threats)
+    searcher.last_forced = forced is not None
+    if stats is not None:
+        stats.threat_nodes = searcher.threat_solver.nodes if threats else 0
+    if forced is not None:
+        if stats is not None:
+            stats.forced = divmod(forced, size)
+        return divmod(forced, size)
+
+    searcher.new_search()
+    moves, _ = search.root_moves(searcher, mine, theirs)
+    pool = get_pool(workers)
+
+    if deadline is None:
+        started = time.perf_counter()
+        value, best_idx, nodes = parallel_search_root(pool, searcher, mine, theirs, moves,
+                                                      depth)
+        searcher.nodes += nodes
+        searcher.last_value = value
+        searcher.last_depth = depth
+        if stats is not None:
+            stats.record_iteration(depth, time.perf_counter() - started, nodes, value,
+                                   divmod(best_idx, size))
+        if book is not None and depth >= searcher.book_write_depth:
+            book.store(size, target, mine, theirs, depth, value, best_idx)
+        return divmod(best_idx, size)
+
+    best_idx = moves[0]
+    empty_count = empty.bit_count() - 1
+    for d in range(empty_count + 1):
+        started = time.perf_counter()
+        result = parallel_search_root(pool, searcher, mine, theirs, moves, d, deadline)
+        if result is None:
+            break
+        value, best_idx, nodes = result
+        searcher.nodes += nodes
+        searcher.last_value = value
+        searcher.last_depth = d
+        if stats is not None:
+            stats.record_iteration(d, time.perf_counter() - started, nodes, value,
+                                   divmod(best_idx, size))
+        moves.remove(best_idx)
+        moves.insert(0, best_idx)
+        if abs(value) >= search.WIN_SCORE:
+            break
+
+    if (book is not None and searcher.last_depth is not None
+            and searcher.last_depth >= searcher.book_write_depth):
+        book.store(size, target, mine, theirs, searcher.last_depth, searcher.last_value,
+                   best_idx)
+    return divmod(best_idx, size)
+
+
+##############################################################################
+# Scaling benchmark: python parallel.py [size] [target] [depth] [workers,...]
+##############################################################################
+
+def benchmark(board, target, depth, worker_counts, my_symbol="X", opp_symbol="O"):
+    """
+    Time a fixed-depth root search serially and with each worker count.
+    Returns a list of dicts with move, seconds, nodes and nodes/sec.
+    """
+    rows = []
+
+    searcher = search.Searcher(board.size, target)
+    start = time.perf_counter()
+    move = search.choose_best_move(board, target, my_symbol, opp_symbol, searcher,
+                                   depth=depth, threats=False)
+    elapsed = time.perf_counter() - start
+    rows.append({"workers": 0, "move": move, "seconds": elapsed,
+                 "nodes": searcher.nodes, "nps": searcher.nodes / elapsed})
+
+    for workers in worker_counts:
+        get_pool(workers)
+        searcher = search.Searcher(board.size, target)
+        start = time.perf_counter()
+        move = choose_best_move_parallel(board, target, my_symbol, opp_symbol, searcher,
+                                         depth=depth, threats=False, workers=workers)
+        elapsed = time.perf_counter() - start
+        rows.append({"workers": workers, "move": move, "seconds": elapsed,
+                     "nodes": searcher.nodes, "nps": searcher.nodes / elapsed})
+    shutdown_pool()
+    return rows
+
+
+if __name__ == "__main__":
+    import sys
+    from bitboard import BitBoard
+
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 12
+    target = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    depth = int(sys.argv[3]) if len(sys.argv) > 3 else 3
+    if len(sys.argv) > 4:
+        worker_counts = [int(w) for w in sys.argv[4].split(",")]
+    else:
+        worker_counts = [1, 2, 4, 8, 16]
+
+    # A small opening cluster in the middle of the board
+    board = BitBoard(size)
+    mid = size // 2
+    for (r, c, sym) in ((mid, mid, "X"), (mid, mid + 1, "O"), (mid + 1, mid, "X"),
+                        (mid - 1, mid - 1, "O")):
+        board.place(r, c, sym)
+
+    print(f"{'Workers':<8} | {'Move':<8} | {'Seconds':>8} | {'Nodes':>9} | {'Nodes/s':>9} | {'Speedup':>7}")
+    print("-" * 62)
+    rows = benchmark(board, target, depth, worker_counts)
+    serial_nps = rows[0]["nps"]
+    for row in rows:
+        label = "serial" if row["workers"] == 0 else row["workers"]
+        move = f"{row['move'][0]},{row['move'][1]}"
+        print(f"{label:<8} | {move:<8} | {row['seconds']:>8.3f} | {row['nodes']:>9} | "
+              f"{row['nps']:>9.0f} | {row['nps'] / serial_nps:>6.2f}x")
@@ -0,0 +1,205 @@
+import time
+
+import ai
+from bitboard import BitBoard, iter_bits
+from ordering import near_mask
+from search import WIN_SCORE
+from transposition import NO_MOVE, zobrist_hash
+
+##############################################################################
+# Pondering: search on the opponent's time
+#
+# After we pick a move, the position with our stone on it is remembered for
+# the game. While the opponent thinks, ponder_slice() takes the opponent's
+# most likely replies (the transposition-table reply from our own search
+# first, then the move orderer's picks) and runs short iterative-deepening
+# searches on the position after each one, keeping the deepest finished
+# result per reply. The searches use the game's own Searcher, so their
+# transposition entries carry over as well.
+#
+# When the real reply arrives, search_move() (or the first search_slice()
+# of the turn) plays the pondered answer straight away if it is at least as
+# deep as our last real search got; otherwise it searches as usual, on top
+# of the warm table.
+#
+# All state here is per process: bot_daemon keeps each game on the same
+# worker process so that pondering and the real search meet.
+##############################################################################
+
+# Opponent replies to ponder on
+PONDER_REPLIES = 3
+# Depth recorded for replies whose answer needs no more search (forced
+# move, proven win/loss)
+SETTLED_DEPTH = 1 << 30
+
+# game_id -> (size, target, mine, theirs) after our last move
+_positions = {}
+# game_id -> {reply cell index: (depth, answer cell index)}
+_replies = {}
+# game_id -> depth our last real search completed
+_played_depth = {}
+ponder_hits = 0
+ponder_misses = 0
+
+
+def _board(size, mine, theirs):
+    board = BitBoard(size)
+    for symbol, bits in ((ai.MY_SYMBOL, mine), (ai.OPPONENT_SYMBOL, theirs)):
+        for idx in iter_bits(bits):
+            board.place(*divmod(idx, size), symbol)
+    return board
+
+
+def predict_replies(searcher, mine, theirs, count=PONDER_REPLIES):
+    """
+    The opponent's 'count' most likely replies in the position (mine,
+    theirs) with the opponent to move: the best reply stored by our search,
+    then the move orderer's ranking from the opponent's side.
+    """
+    size = searcher.size
+    empty = searcher.full & ~(mine | theirs)
+    if not empty:
+        return []
+    key = zobrist_hash(size, mine, theirs) ^ searcher.side_key
+    entry = searcher.tt.probe(key)
+    tt_move = entry[3] if entry is not None else NO_MOVE
+    near = near_mask(size, mine | theirs, searcher.radius)
+    moves = searcher.orderer.order(near & empty or empty, theirs, mine, 0, tt_move)
+    return moves[:count]
+
+
+def forget(game_id):
+    """
+    Drop everything kept for a finished game, searcher included.
+    """
+    ai.forget_game(game_id)
+    _positions.pop(game_id, None)
+    _replies.pop(game_id, None)
+    _played_depth.pop(game_id, None)
+
+
+def _remember(game_id, size, target, mine, theirs):
+    _positions[game_id] = (size, target, mine, theirs)
+    _replies[game_id] = {}
+
+
+def _pondered_answer(game_id, mine, theirs):
+    """
+    The pondered answer (row, col) if (mine, theirs) is our remembered
+    position plus one predicted opponent stone, analysed at least as deep
+    as our last real search. None otherwise.
+    """
+    position = _positions.get(game_id)
+    if position is None:
+        return None
+    size, _, old_mine, old_theirs = position
+    added = theirs & ~old_theirs
+    if mine != old_mine or theirs & old_theirs != old_theirs or added & (added - 1) or not added:
+        return None
+    reply = added.bit_length() - 1
+    depth, answer = _replies.get(game_id, {}).get(reply, (-1, None))
+    if answer is None or depth < (_played_depth.get(game_id) or 0):
+        return None
+    return divmod(answer, size)
+
+
+def search_slice(game_id, board, target, deadline, first=True):
+    """
+    Search for our move in 'game_id' until 'deadline' (worker side), as one
+    time slice of the turn's search (see scheduler.py). A later slice
+    restarts iterative deepening on the table the earlier ones filled, so it
+    is back at their depth after a few cheap iterations. The first slice
+    answers from the ponder results when they cover the opponent's reply.
+    Returns (row, col, nodes, depth, settled, pondered) or None, where
+    'settled' means more time would not change the move.
+    """
+    global ponder_hits, ponder_misses
+    board_size = board.size
+    mine = board.bits_for(ai.MY_SYMBOL)
+    theirs = board.bits_for(ai.OPPONENT_SYMBOL)
+    searcher = ai.get_searcher(game_id, board_size, target)
+
+    if first:
+        best = _pondered_answer(game_id, mine, theirs)
+        if best is not None:
+            ponder_hits += 1
+            return best[0], best[1], 0, None, True, True
+        if game_id in _positions:
+            ponder_misses += 1
+
+    nodes_before = searcher.nodes
+    best = ai.choose_best_move(board, target, ai.MY_SYMBOL, ai.OPPONENT_SYMBOL,
+                               searcher, deadline=deadline)
+    if best is None:
+        forget(game_id)
+        return None
+    depth = searcher.last_depth
+    empty_count = (searcher.full & ~(mine | theirs)).bit_count()
+    settled = (deadline is None or searcher.last_forced
+               or (searcher.last_value is not None and abs(searcher.last_value) >= WIN_SCORE)
+               or (depth is not None and depth + 1 >= empty_count))
+    return best[0], best[1], searcher.nodes - nodes_before, depth, settled, False
+
+
+def commit_move(game_id, board, target, row, col, depth):
+    """
+    Record the move we play in 'game_id' (searched to 'depth', None if it
+    needed no search), so that pondering starts from the position after it.
+    """
+    if depth is not None:
+        _played_depth[game_id] = depth
+    board_size = board.size
+    mine = board.bits_for(ai.MY_SYMBOL)
+    theirs = board.bits_for(ai.OPPONENT_SYMBOL)
+    _remember(game_id, board_size, target, mine | (1 << (row * board_size + col)), theirs)
+
+
+def search_move(game_id, board, target, deadline):
+    """
+    Pick our move for 'game_id' (worker side) in one go, answering from the
+    ponder results when they cover the opponent's actual reply.
+    Returns (row, col, nodes, pondered) or None.
+    """
+    result = search_slice(game_id, board, target, deadline)
+    if result is None:
+        return None
+    row, col, nodes, depth, _, pondered = result
+    commit_move(game_id, board, target, row, col, depth)
+    return row, col, nodes, pondered
+
+
+def ponder_slice(game_id, seconds):
+    """
+    Ponder for up to 'seconds' on the least-analysed predicted reply in
+    'game_id'. Returns the {reply: (depth, answer)} table so far, or None if
+    there is nothing (left) to ponder.
+    """
+    position = _positions.get(game_id)
+    if position is None:
+        return None
+    size, target, mine, theirs = position
+    searcher = ai.get_searcher(game_id, size, target)
+    replies = _replies.setdefault(game_id, {})
+    if not replies:
+        for reply in predict_replies(searcher, mine, theirs):
+            replies[reply] = (-1, None)
+
+    empty_count = (searcher.full & ~(mine | theirs)).bit_count()
+    open_replies = [r for r, (depth, _) in replies.items() if depth < empty_count]
+    if not open_replies:
+        return None
+    reply = min(open_replies, key=lambda r: replies[r][0])
+
+    board = _board(size, mine, theirs | (1 << reply))
+    answer = ai.choose_best_move(board, target, ai.MY_SYMBOL, ai.OPPONENT_SYMBOL,
+                                 searcher, deadline=time.monotonic() + seconds)
+    if answer is None:
+        replies[reply] = (SETTLED_DEPTH, None)
+        return replies
+    answer_idx = answer[0] * size + answer[1]
+    if searcher.last_forced or (searcher.last_value is not None
+                                and abs(searcher.last_value) >= WIN_SCORE):
+        replies[reply] = (SETTLED_DEPTH, answer_idx)
+    elif searcher.last_depth is not None and searcher.last_depth > replies[reply][0]:
+        replies[reply] = (searcher.last_depth, answer_idx)
+    return replies
@@ -0,0 +1,248 @@
+import asyncio
+import heapq
+import itertools
+import math
+import time
+
+import ai
+import ponder
+
+##############################################################################
+# Deadline scheduling of searches
+#
+# When several games on one lane are on turn together, searching them one
+# after another to the end of each move clock makes the later ones late.
+# A LaneScheduler instead keeps the lane's pending moves in a queue ordered
+# by deadline (the game's secondspermove counted from when we saw the turn,
+# minus the posting overhead, see ai.compute_deadline) and hands out the
+# lane in time slices:
+#   - a move that has no result yet goes first (earliest deadline first),
+#     with a short slice when others are waiting, so every game has a move
+#     to fall back on early
+#   - after that the earliest deadline gets the next slice
+#   - a slice is an iterative-deepening search that stops at the slice end
+#     (preempted); the game's next slice resumes it on its warm
+#     transposition table (ponder.search_slice), and the deepest result so
+#     far is kept
+#   - a move is posted as soon as more search would not change it, or when
+#     its deadline leaves no room for another slice
+# Games without a move clock search to a fixed depth in one slice, after
+# every game that has a clock.
+# The guarantee only holds if nothing else keeps the lane for longer than
+# a slice: pondering goes through LaneScheduler.ponder(), which only runs
+# on an idle lane and caps each ponder slice at PONDER_SLICE_SECONDS.
+# SchedulerMetrics records how much of the move clock was left when each
+# move was posted (the slack) and how many moves missed their clock.
+##############################################################################
+
+# Longest slice, and the first slice of a move while other moves wait
+SLICE_SECONDS = 0.5
+FIRST_SLICE_SECONDS = 0.1
+# Moves with less than this left before their deadline are posted
+MIN_SLICE_SECONDS = 0.05
+# Longest ponder slice: a search that comes in waits at most this long
+PONDER_SLICE_SECONDS = SLICE_SECONDS / 2
+
+
+class SearchJob:
+    """
+    Our move to find in one game: the board, the move clock, and the best
+    result the search has reached so far.
+    """
+
+    def __init__(self, game_id, board, target, turn_start, seconds_per_move):
+        self.game_id = game_id
+        self.board = board
+        self.target = target
+        self.turn_start = turn_start
+        # When the server's move clock runs out, and when the search has to
+        # stop to leave time for posting (both None without a clock)
+        self.expires = turn_start + seconds_per_move if seconds_per_move > 0 else None
+        self.deadline = ai.compute_deadline(turn_start, seconds_per_move)
+        # (row, col, nodes, depth, settled, pondered) of the deepest slice
+        self.best = None
+        self.nodes = 0
+        self.slices = 0
+        self.done = asyncio.get_running_loop().create_future()
+
+    def priority(self):
+        if self.deadline is None:
+            return (1, 0, math.inf)
+        return (0, self.slices > 0, self.deadline)
+
+
+class SchedulerMetrics:
+    """
+    Slice counts and deadline slack, across lanes.
+    """
+
+    def __init__(self):
+        self.jobs = 0
+        self.slices = 0
+        self.posted = 0
+        self.missed = 0
+        # Per posted move with a clock: seconds left on it once the server
+        # had accepted the move (negative: missed)
+        self.slack = []
+
+    def record_post(self, job, posted_at):
+        self.posted += 1
+        if job.expires is None:
+            return
+        slack = job.expires - posted_at
+        self.slack.append(slack)
+        if slack < 0:
+            self.missed += 1
+
+    def to_dict(self):
+        slack = sorted(self.slack)
+        return {
+            "jobs": self.jobs,
+            "slices": self.slices,
+            "slices_per_job": round(self.slices / self.jobs, 2) if self.jobs else None,
+            "posted": self.posted,
+            "missed_deadlines": self.missed,
+            "slack_mean": round(sum(slack) / len(slack), 4) if slack else None,
+            "slack_p5": round(slack[int(0.05 * len(slack))], 4) if slack else None,
+            "slack_min": round(slack[0], 4) if slack else None,
+        }
+
+
+class LaneScheduler:
+    """
+    Runs the searches of one lane (a single-process executor) earliest
+    deadline first, in time slices. The lane 'lock' is held while any
+    search is queued. Anything else that uses the lane must do so through
+    ponder() (or hold 'lock' for no longer than 'ponder_seconds'), or
+    searches wait for it past their slices.
+    """
+
+    def __init__(self, executor, lock, metrics=None, slice_seconds=SLICE_SECONDS,
+                 first_slice_seconds=FIRST_SLICE_SECONDS, ponder_seconds=PONDER_SLICE_SECONDS):
+        self.executor = executor
+        self.lock = lock
+        self.metrics = metrics if metrics is not None else SchedulerMetrics()
+        self.slice_seconds = slice_seconds
+        self.first_slice_seconds = first_slice_seconds
+        self.ponder_seconds = ponder_seconds
+        self.queue = []
+        self.counter = itertools.count()
+        self.runner = None
+
+    def __len__(self):
+        return len(self.queue)
+
+    async def search(self, job):
+        """
+        Queue 'job' and wait for its move: (row, col, nodes, depth,
+        pondered), or None if the board is full.
+        """
+        self.metrics.jobs += 1
+        self._push(job)
+        if self.runner is None or self.runner.done():
+            self.runner = asyncio.create_task(self._run())
+        return await job.done
+
+    def busy(self):
+        return self.lock.locked() or bool(self.queue)
+
+    async def ponder(self, game_id, seconds):
+        """
+        One ponder slice for 'game_id' of up to 'seconds', capped at
+        'ponder_seconds', if the lane is idle. Returns the ponder table, or
+        None if the lane was busy or there was nothing to ponder.
+        """
+        if self.busy():
+            return None
+        async with self.lock:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, ponder.ponder_slice, game_id,
+                                              min(seconds, self.ponder_seconds))
+
+    def close(self):
+        if self.runner is not None:
+            self.runner.cancel()
+        for _, _, job in self.queue:
+            job.done.cancel()
+        self.queue = []
+
+    def _push(self, job):
+        heapq.heappush(self.queue, (job.priority(), next(self.counter), job))
+
+    def slice_end(self, job, now):
+        """
+        When the next slice of 'job' has to stop (None: no clock). While
+        other moves still wait for a first result, a first slice gets no
+        more than its share of the time to the deadline.
+        """
+        if job.deadline is None:
+            return None
+        seconds = self.slice_seconds
+        if job.slices == 0:
+            waiting = sum(1 for _, _, other in self.queue if other.slices == 0)
+            if waiting:
+                seconds = min(self.first_slice_seconds,
+                              (job.deadline - now) / (waiting + 1))
+        return min(job.deadline, now + seconds)
+
+    def _finish_due(self, end):
+        """
+        Post every queued move that has a result and whose deadline comes
+        before the running slice ends: it would not get another one in time.
+        """
+        due = [entry for entry in self.queue
+               if entry[2].best is not None and entry[2].deadline is not None
+               and entry[2].deadline - MIN_SLICE_SECONDS <= end]
+        if not due:
+            return
+        for entry in due:
+            self.queue.remove(entry)
+            self._finish(entry[2])
+        heapq.heapify(self.queue)
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        async with self.lock:
+            while self.queue:
+                _, _, job = heapq.heappop(self.queue)
+                if job.done.done():
+                    continue
+                end = self.slice_end(job, time.monotonic())
+                if end is not None:
+                    self._finish_due(end)
+                try:
+                    result = await loop.run_in_executor(self.executor, ponder.search_slice,
+                                                        job.game_id, job.board, job.target,
+                                                        end, job.slices == 0)
+                except Exception as e:
+                    if not job.done.done():
+                        job.done.set_exception(e)
+                    continue
+                job.slices += 1
+                self.metrics.slices += 1
+                if job.done.done():
+                    continue
+                if result is None:
+                    job.done.set_result(None)
+                    continue
+                job.nodes += result[2]
+                # A settled move (forced, proven, pondered) beats any depth
+                if result[4] or job.best is None or _depth(result) >= _depth(job.best):
+                    job.best = result
+                left = None if job.deadline is None else job.deadline - time.monotonic()
+                if result[4] or left is None or left < MIN_SLICE_SECONDS:
+                    self._finish(job)
+                else:
+                    self._push(job)
+
+    def _finish(self, job):
+        row, col, _, depth, _, pondered = job.best
+        # Queued on the lane ahead of any later ponder slice of the game
+        self.executor.submit(ponder.commit_move, job.game_id, job.board, job.target,
+                             row, col, depth)
+        job.done.set_result((row, col, job.nodes, depth, pondered))
+
+
+def _depth(result):
+    depth = result[3]
+    return -1 if depth is None else depth
@@ -0,0 +1,613 @@
+import math
+import time
+
+from bitboard import full_mask, get_line_masks, has_any_win, is_win, iter_bits
+from np_eval import BatchEvaluator, numpy_available
+from ordering import DEFAULT_RADIUS, MoveOrderer, get_neighborhood_masks, near_mask
+from patterns import DEFAULT_EVALUATOR, MINE, THEIRS, make_evaluator
+from symmetry import stabilizer, unique_moves
+from threats import ThreatSolver
+from transposition import (EXACT, LOWER, NO_MOVE, UPPER, TranspositionTable,
+                           get_zobrist_keys, zobrist_hash)
+
+##############################################################################
+# Bitboard search engine
+#
+# Same algorithm as the list-of-lists minimax in ai.py, but each side is a
+# single int bitmask ('mine' / 'theirs'), so placing a stone is an OR and the
+# win check is a handful of AND/compare operations against precomputed masks.
+# Leaves are scored by an incrementally updated evaluator (patterns.py).
+#
+# Two interchangeable algorithms:
+#   "pvs"     - negamax principal variation search: the first (best-ordered)
+#               move of a node gets the full window, the rest a null window
+#               that only proves them no better, re-searched if one is.
+#               Iterative deepening adds aspiration windows around the
+#               previous iteration's score.
+#   "minimax" - the original fail-soft alpha-beta with is_maximizing flags,
+#               kept for regression comparisons.
+# Both return the same root score and move at a fixed depth. Transposition
+# table scores are always stored from the root side's point of view, so the
+# two can share a table.
+##############################################################################
+
+WIN_SCORE = 999999
+# Fixed search depth used when no deadline is given
+DEFAULT_DEPTH = 3
+# Threat-score ordering is only worth its cost this far above the leaves
+ORDERING_MIN_DEPTH = 2
+# Share of the remaining time the threat-space solver may use before search
+THREAT_TIME_SHARE = 0.25
+# How many nodes between deadline checks
+TIME_CHECK_INTERVAL = 1024
+# Opening book: with a deadline, play a book move searched at least this
+# deep; write results back once a search completes this depth
+BOOK_MIN_DEPTH = 4
+BOOK_WRITE_DEPTH = 4
+# Search algorithm (see above)
+ALGORITHMS = ("pvs", "minimax")
+DEFAULT_ALGORITHM = "pvs"
+# Half-width of the aspiration window around the previous iteration's score
+ASPIRATION_WINDOW = 32
+# Search only one of each set of root moves that a symmetry of the position
+# makes equivalent (same score, so the same move is chosen)
+SYMMETRY_PRUNING = True
+
+
+class SearchTimeout(Exception):
+    """
+    Raised from inside the search once the deadline has passed.
+    """
+
+
+def get_available_moves(board):
+    """
+    Empty cells of a BitBoard as (row, col) tuples in row-major order.
+    """
+    size = board.size
+    empty = full_mask(size) & ~(board.x_bits | board.o_bits)
+    return [divmod(idx, size) for idx in iter_bits(empty)]
+
+
+def evaluate_terminal(mine, theirs, line_masks, full):
+    """
+    +1 if 'mine' has a winning line, -1 if 'theirs' does, 0 if the board is
+    full, None otherwise.
+    """
+    if has_any_win(mine, line_masks):
+        return +1
+    if has_any_win(theirs, line_masks):
+        return -1
+    if (mine | theirs) == full:
+        return 0
+    return None
+
+
+class Searcher:
+    """
+    Alpha-beta search state for one (board size, target): precomputed masks,
+    Zobrist keys, the transposition table and the move orderer. Keep one per
+    game so the table carries over from move to move.
+    'radius' limits candidates to empty cells that close to a stone
+    (None searches every empty cell). 'evaluator' names the leaf evaluator
+    from patterns.EVALUATORS. With 'batch_eval' (needs NumPy) candidate
+    moves are ordered by scoring all children in one vectorised call
+    (np_eval.py) instead of by per-move threat scores. 'algorithm' is one
+    of ALGORITHMS.
+    """
+
+    def __init__(self, size, target, tt=None, radius=DEFAULT_RADIUS,
+                 evaluator=DEFAULT_EVALUATOR, batch_eval=False, algorithm=DEFAULT_ALGORITHM):
+        if algorithm not in ALGORITHMS:
+            raise ValueError(f"Unknown algorithm '{algorithm}'. Choose from: {', '.join(ALGORITHMS)}")
+        self.algorithm = algorithm
+        self.size = size
+        self.target = target
+        _, self.cell_masks = get_line_masks(size, target)
+        self.full = full_mask(size)
+        self.mine_keys, self.theirs_keys, self.side_key = get_zobrist_keys(size)
+        self.tt = tt if tt is not None else TranspositionTable()
+        self.radius = radius
+        if radius is None:
+            self.neighborhoods = (self.full,) * (size * size)
+        else:
+            self.neighborhoods = get_neighborhood_masks(size, radius)
+        self.orderer = MoveOrderer(size, target, self.cell_masks)
+        self.evaluator_name = evaluator
+        self.evaluator = make_evaluator(evaluator, size, target)
+        self.threat_solver = ThreatSolver(size, target)
+        self.batch_evaluator = None
+        if batch_eval:
+            if numpy_available():
+                self.batch_evaluator = BatchEvaluator(size, target)
+            else:
+                print("⚠️ NumPy not installed; using the pure-Python move ordering.")
+        self.nodes = 0
+        # Root score and depth of the last completed search iteration
+        # (both None after a forced move, which sets last_forced instead)
+        self.last_value = None
+        self.last_depth = None
+        self.last_forced = False
+        # Optional search_stats.SearchStats collector (None = off)
+        self.stats = None
+        # Optional opening_book.OpeningBook shared between processes
+        self.book = None
+        self.book_min_depth = BOOK_MIN_DEPTH
+        self.book_write_depth = BOOK_WRITE_DEPTH
+        self.symmetry = SYMMETRY_PRUNING
+        # time.monotonic() value at which the search gives up, or None
+        self.deadline = None
+
+    def new_search(self):
+        self.tt.new_search()
+        self.orderer.new_search()
+
+    def batch_order(self, candidates, mine, theirs, side, ply, tt_move):
+        """
+        Order candidates by the batch-evaluated score of each child position
+        for the side to move.
+        """
+        moves = list(iter_bits(candidates))
+        scores = self.batch_evaluator.evaluate_moves(mine, theirs, moves, side).tolist()
+        if side == THEIRS:
+            scores = [-score for score in scores]
+        return self.orderer.order_scored(moves, scores, ply, tt_move)
+
+    def minimax(self, mine, theirs, depth, alpha, beta, is_maximizing,
+                last_idx, empty_count, key, near, ply):
+        """
+        Minimax with alpha-beta pruning on bitmasks. Terminal detection only
+        checks the lines through 'last_idx' (the move just played) and detects
+        draws from the running 'empty_count'. 'key' is the Zobrist hash of the
+        position and 'near' the candidate neighbourhood; making a move XORs
+        its cell key in and ORs its neighbourhood in, and unmaking is free
+        because the parent still holds the old values. 'ply' is the distance
+        from the root, for killer moves.
+        """
+        self.nodes += 1
+        if (self.deadline is not None and not self.nodes % TIME_CHECK_INTERVAL
+                and time.monotonic() >= self.deadline):
+            raise SearchTimeout()
+
+        cell_masks = self.cell_masks
+        if is_maximizing:
+            if is_win(theirs, last_idx, cell_masks):
+                if self.stats is not None:
+                    self.stats.terminals += 1
+                return -WIN_SCORE
+        elif is_win(mine, last_idx, cell_masks):
+            if self.stats is not None:
+                self.stats.terminals += 1
+            return WIN_SCORE
+        if empty_count == 0:
+            if self.stats is not None:
+                self.stats.draws += 1
+            return 0
+        if depth == 0:
+            if self.stats is not None:
+                self.stats.leaves += 1
+            return self.evaluator.score
+
+        tt = self.tt
+        alpha_orig, beta_orig = alpha, beta
+        tt_move = NO_MOVE
+        entry = tt.probe(key)
+        if entry is not None:
+            tt_depth, tt_score, tt_flag, tt_move = entry
+            if tt_depth >= depth:
+                if tt_flag == EXACT:
+                    if self.stats is not None:
+                        self.stats.tt_cutoffs += 1
+                    return tt_score
+                if tt_flag == LOWER:
+                    alpha = max(alpha, tt_score)
+                else:
+                    beta = min(beta, tt_score)
+                if beta <= alpha:
+                    if self.stats is not None:
+                        self.stats.tt_cutoffs += 1
+                    return tt_score
+
+        empty = self.full & ~(mine | theirs)
+        candidates = near & empty or empty
+        neighborhoods = self.neighborhoods
+        evaluator = self.evaluator
+        child_key = key ^ self.side_key
+
+        best_idx = NO_MOVE
+        batched = self.batch_evaluator is not None and depth >= ORDERING_MIN_DEPTH
+        if is_maximizing:
+            if batched:
+                moves = self.batch_order(candidates, mine, theirs, MINE, ply, tt_move)
+            else:
+                moves = self.orderer.order(candidates, mine, theirs, ply, tt_move,
+                                           depth >= ORDERING_MIN_DEPTH)
+            best_eval = -math.inf
+            mine_keys = self.mine_keys
+            for idx in moves:
+                evaluator.place(idx, MINE)
+                val = self.minimax(mine | (1 << idx), theirs, depth - 1, alpha, beta, False,
+                                   idx, empty_count - 1, child_key ^ mine_keys[idx],
+                                   near | neighborhoods[idx], ply + 1)
+                evaluator.remove(idx, MINE)
+
+                if val > best_eval:
+                    best_eval = val
+                    best_idx = idx
+                alpha = max(alpha, val)
+                if beta <= alpha:
+                    self.orderer.record_cutoff(idx, depth, ply)
+                    if self.stats is not None:
+                        self.stats.record_cutoff(moves.index(idx))
+                    break
+        else:
+            if batched:
+                moves = self.batch_order(candidates, mine, theirs, THEIRS, ply, tt_move)
+            else:
+                moves = self.orderer.order(candidates, theirs, mine, ply, tt_move,
+                                           depth >= ORDERING_MIN_DEPTH)
+            best_eval = math.inf
+            theirs_keys = self.theirs_keys
+            for idx in moves:
+                evaluator.place(idx, THEIRS)
+                val = self.minimax(mine, theirs | (1 << idx), depth - 1, alpha, beta, True,
+                                   idx, empty_count - 1, child_key ^ theirs_keys[idx],
+                                   near | neighborhoods[idx], ply + 1)
+                evaluator.remove(idx, THEIRS)
+
+                if val < best_eval:
+                    best_eval = val
+                    best_idx = idx
+                beta = min(beta, val)
+                if beta <= alpha:
+                    self.orderer.record_cutoff(idx, depth, ply)
+                    if self.stats is not None:
+                        self.stats.record_cutoff(moves.index(idx))
+                    break
+
+        if best_eval <= alpha_orig:
+            flag = UPPER
+        elif best_eval >= beta_orig:
+            flag = LOWER
+        else:
+            flag = EXACT
+        tt.store(key, depth, best_eval, flag, best_idx)
+        return best_eval
+
+    def pvs(self, mine, theirs, depth, alpha, beta, is_maximizing,
+            last_idx, empty_count, key, near, ply):
+        """
+        Negamax principal variation search; same arguments as minimax(), but
+        the score, 'alpha' and 'beta' are from the point of view of the side
+        to move ('mine' if is_maximizing). Fail-soft.
+        """
+        self.nodes += 1
+        if (self.deadline is not None and not self.nodes % TIME_CHECK_INTERVAL
+                and time.monotonic() >= self.deadline):
+            raise SearchTimeout()
+
+        # The side that just moved may have won
+        if is_win(theirs if is_maximizing else mine, last_idx, self.cell_masks):
+            if self.stats is not None:
+                self.stats.terminals += 1
+            return -WIN_SCORE
+        if empty_count == 0:
+            if self.stats is not None:
+                self.stats.draws += 1
+            return 0
+        if depth == 0:
+            if self.stats is not None:
+                self.stats.leaves += 1
+            return self.evaluator.score if is_maximizing else -self.evaluator.score
+
+        # The table holds root-side scores: flip them (and their bounds)
+        # for nodes where the opponent is to move
+        tt = self.tt
+        sign = 1 if is_maximizing else -1
+        lower, upper = (LOWER, UPPER) if is_maximizing else (UPPER, LOWER)
+        alpha_orig, beta_orig = alpha, beta
+        tt_move = NO_MOVE
+        entry = tt.probe(key)
+        if entry is not None:
+            tt_depth, tt_score, tt_flag, tt_move = entry
+            if tt_depth >= depth:
+                tt_score *= sign
+                if tt_flag == EXACT:
+                    if self.stats is not None:
+                        self.stats.tt_cutoffs += 1
+                    return tt_score
+                if tt_flag == lower:
+                    alpha = max(alpha, tt_score)
+                else:
+                    beta = min(beta, tt_score)
+                if beta <= alpha:
+                    if self.stats is not None:
+                        self.stats.tt_cutoffs += 1
+                    return tt_score
+
+        empty = self.full & ~(mine | theirs)
+        candidates = near & empty or empty
+        side = MINE if is_maximizing else THEIRS
+        if self.batch_evaluator is not None and depth >= ORDERING_MIN_DEPTH:
+            moves = self.batch_order(candidates, mine, theirs, side, ply, tt_move)
+        elif is_maximizing:
+            moves = self.orderer.order(candidates, mine, theirs, ply, tt_move,
+                                       depth >= ORDERING_MIN_DEPTH)
+        else:
+            moves = self.orderer.order(candidates, theirs, mine, ply, tt_move,
+                                       depth >= ORDERING_MIN_DEPTH)
+
+        neighborhoods = self.neighborhoods
+        evaluator = self.evaluator
+        child_key = key ^ self.side_key
+        move_keys = self.mine_keys if is_maximizing else self.theirs_keys
+        best_eval = -math.inf
+        best_idx = NO_MOVE
+        for i, idx in enumerate(moves):
+            bit = 1 << idx
+            if is_maximizing:
+                child_mine, child_theirs = mine | bit, theirs
+            else:
+                child_mine, child_theirs = mine, theirs | bit
+            child_near = near | neighborhoods[idx]
+            evaluator.place(idx, side)
+            if i == 0:
+                val = -self.pvs(child_mine, child_theirs, depth - 1, -beta, -alpha,
+                                not is_maximizing, idx, empty_count - 1,
+                                child_key ^ move_keys[idx], child_near, ply + 1)
+            else:
+                val = -self.pvs(child_mine, child_theirs, depth - 1, -alpha - 1, -alpha,
+                                not is_maximizing, idx, empty_count - 1,
+                                child_key ^ move_keys[idx], child_near, ply + 1)
+                if alpha < val < beta:
+                    val = -self.pvs(child_mine, child_theirs, depth - 1, -beta, -alpha,
+                                    not is_maximizing, idx, empty_count - 1,
+                                    child_key ^ move_keys[idx], child_near, ply + 1)
+            evaluator.remove(idx, side)
+
+            if val > best_eval:
+                best_eval = val
+                best_idx = idx
+            alpha = max(alpha, val)
+            if beta <= alpha:
+                self.orderer.record_cutoff(idx, depth, ply)
+                if self.stats is not None:
+                    self.stats.record_cutoff(i)
+                break
+
+        if best_eval <= alpha_orig:
+            flag = upper
+        elif best_eval >= beta_orig:
+            flag = lower
+        else:
+            flag = EXACT
+        tt.store(key, depth, best_eval * sign, flag, best_idx)
+        return best_eval
+
+
+def search_root(searcher, mine, theirs, moves, depth, empty_count, child_key, near,
+                alpha=-math.inf, beta=math.inf):
+    """
+    One pass over the (already ordered) root moves at a fixed depth inside
+    (alpha, beta). Returns (best_value, best_idx); a value outside the
+    window is only a bound.
+    """
+    best_value = -math.inf
+    best_idx = moves[0]
+    mine_keys = searcher.mine_keys
+    neighborhoods = searcher.neighborhoods
+    evaluator = searcher.evaluator
+    use_pvs = searcher.algorithm == "pvs"
+
+    for i, idx in enumerate(moves):
+        evaluator.place(idx, MINE)
+        args = (mine | (1 << idx), theirs, depth)
+        rest = (False, idx, empty_count, child_key ^ mine_keys[idx], near | neighborhoods[idx], 1)
+        if not use_pvs:
+            move_val = searcher.minimax(*args, alpha, beta, *rest)
+        elif i == 0:
+            move_val = -searcher.pvs(*args, -beta, -alpha, *rest)
+        else:
+            # Only prove the move no better than the best so far
+            move_val = -searcher.pvs(*args, -alpha - 1, -alpha, *rest)
+            if alpha < move_val < beta:
+                move_val = -searcher.pvs(*args, -beta, -alpha, *rest)
+        evaluator.remove(idx, MINE)
+
+        if move_val > best_value:
+            best_value = move_val
+            best_idx = idx
+
+        alpha = max(alpha, best_value)
+        if beta <= alpha:
+            break
+
+    return best_value, best_idx
+
+
+def aspiration_search(searcher, mine, theirs, moves, depth, empty_count, child_key, near):
+    """
+    search_root() for one iterative-deepening iteration. With PVS, first
+    try a narrow window around the previous iteration's score; if the
+    result falls outside it, open that side of the window and search
+    again. Returns the same (best_value, best_idx) as a full-window search.
+    """
+    previous = searcher.last_value
+    if (searcher.algorithm != "pvs" or previous is None or not ASPIRATION_WINDOW
+            or abs(previous) >= WIN_SCORE):
+        return search_root(searcher, mine, theirs, moves, depth, empty_count, child_key, near)
+
+    alpha, beta = previous - ASPIRATION_WINDOW, previous + ASPIRATION_WINDOW
+    while True:
+        value, best_idx = search_root(searcher, mine, theirs, moves, depth, empty_count,
+                                      child_key, near, alpha, beta)
+        if value <= alpha:
+            alpha = -math.inf
+        elif value >= beta:
+            beta = math.inf
+        else:
+            return value, best_idx
+
+
+def forced_move(searcher, mine, theirs, deadline=None, threats=True):
+    """
+    Moves that need no search: an immediate win, then (if 'threats') the
+    threat-space solver's forced win or must-block move. Returns a cell
+    index or None.
+    """
+    cell_masks = searcher.cell_masks
+    empty = searcher.full & ~(mine | theirs)
+    for idx in iter_bits(empty):
+        if is_win(mine | (1 << idx), idx, cell_masks):
+            return idx
+
+    if threats:
+        threat_deadline = None
+        if deadline is not None:
+            now = time.monotonic()
+            threat_deadline = now + max(0.0, deadline - now) * THREAT_TIME_SHARE
+        found = searcher.threat_solver.find_threat_move(mine, theirs, threat_deadline)
+        if found is not None:
+            return found[1]
+    return None
+
+
+def root_moves(searcher, mine, theirs):
+    """
+    Ordered root candidates and the root neighbourhood mask. With
+    searcher.symmetry on, moves equivalent to an earlier one under a
+    symmetry of the position are dropped.
+    """
+    empty = searcher.full & ~(mine | theirs)
+    near = near_mask(searcher.size, mine | theirs, searcher.radius)
+    if searcher.batch_evaluator is not None:
+        moves = searcher.batch_order(near & empty or empty, mine, theirs, MINE, 0, NO_MOVE)
+    else:
+        moves = searcher.orderer.order(near & empty or empty, mine, theirs, 0, NO_MOVE)
+    if searcher.symmetry and len(moves) > 1:
+        moves = unique_moves(searcher.size, moves, stabilizer(searcher.size, mine, theirs))
+    return moves, near
+
+
+def search_root_move(searcher, mine, theirs, idx, depth, alpha=-math.inf, beta=math.inf):
+    """
+    Value of a single root move searched to 'depth' inside (alpha, beta),
+    set up from scratch (used by the parallel root search, one task per
+    move).
+    """
+    empty_count = (searcher.full & ~(mine | theirs)).bit_count() - 1
+    near = near_mask(searcher.size, mine | theirs, searcher.radius)
+    key = zobrist_hash(searcher.size, mine, theirs) ^ searcher.side_key ^ searcher.mine_keys[idx]
+    evaluator = searcher.evaluator
+    evaluator.reset(mine, theirs)
+    evaluator.place(idx, MINE)
+    near |= searcher.neighborhoods[idx]
+    if searcher.algorithm == "pvs":
+        return -searcher.pvs(mine | (1 << idx), theirs, depth, -beta, -alpha, False,
+                             idx, empty_count, key, near, 1)
+    return searcher.minimax(mine | (1 << idx), theirs, depth, alpha, beta, False,
+                            idx, empty_count, key, near, 1)
+
+
+def choose_best_move(board, target, my_symbol, opp_symbol, searcher=None,
+                     deadline=None, depth=DEFAULT_DEPTH, threats=True):
+    """
+    Bitboard counterpart of ai.choose_best_move: immediate wins first, then
+    (if 'threats') the threat-space solver for a forced win or a must-block
+    move, then alpha-beta search. Returns (row, col) or None.
+
+    Without a deadline this is a single fixed-depth search. With a deadline
+    (a time.monotonic() timestamp) it is an anytime iterative-deepening
+    search: depth 0, 1, 2, ... until time runs out, returning the best move
+    of the last depth that completed. Pass a Searcher to reuse its
+    transposition table across calls; if it has an opening book, positions
+    found there are answered without searching and finished searches that
+    are deep enough are written back.
+    """
+    size = board.size
+    if searcher is None:
+        searcher = Searcher(size, target)
+    mine = board.bits_for(my_symbol)
+    theirs = board.bits_for(opp_symbol)
+    empty = searcher.full & ~(mine | theirs)
+    if not empty:
+        return None
+
+    searcher.last_value = None
+    searcher.last_depth = None
+    searcher.last_forced = False
+    stats = searcher.stats
+
+    # 0) A position already searched deeply enough, by us or another process
+    book = searcher.book
+    if book is not None:
+        entry = book.probe(size, target, mine, theirs)
+        if entry is not None:
+            book_depth, book_value, book_idx = entry
+            needed = depth if deadline is None else searcher.book_min_depth
+            if book_depth >= needed and empty >> book_idx & 1:
+                searcher.last_value = book_value
+                searcher.last_depth = book_depth
+                if stats is not None:
+                    stats.book = book_depth
+                return divmod(book_idx, size)
+
+    # 1) Immediate wins and forced sequences
+    forced = forced_move(searcher, mine, theirs, deadline, threats)
+    searcher.last_forced = forced is not None
+    if stats is not None:
+        stats.threat_nodes = searcher.threat_solver.nodes if threats else 0
+    if forced is not None:
+        if stats is not None:
+            stats.forced = divmod(forced, size)
+        return divmod(forced, size)
+
+    # 2) Otherwise, do a search over the neighbourhood candidates
+    empty_count = empty.bit_count() - 1
+    searcher.new_search()
+    searcher.evaluator.reset(mine, theirs)
+    child_key = zobrist_hash(size, mine, theirs) ^ searcher.side_key
+    moves, near = root_moves(searcher, mine, theirs)
+
+    if deadline is None:
+        started, nodes_before = time.perf_counter(), searcher.nodes
+        searcher.last_value, best_idx = search_root(searcher, mine, theirs, moves, depth,
+                                                    empty_count, child_key, near)
+        searcher.last_depth = depth
+        if book is not None and depth >= searcher.book_write_depth:
+            book.store(size, target, mine, theirs, depth, searcher.last_value, best_idx)
+        if stats is not None:
+            stats.record_iteration(depth, time.perf_counter() - started,
+                                   searcher.nodes - nodes_before, searcher.last_value,
+                                   divmod(best_idx, size))
+        return divmod(best_idx, size)
+
+    best_idx = moves[0]
+    searcher.deadline = deadline
+    try:
+        # Depth d looks d + 1 plies ahead; stop once that covers the board
+        for d in range(empty_count + 1):
+            started, nodes_before = time.perf_counter(), searcher.nodes
+            value, best_idx = aspiration_search(searcher, mine, theirs, moves, d,
+                                                empty_count, child_key, near)
+            searcher.last_value = value
+            searcher.last_depth = d
+            if stats is not None:
+                stats.record_iteration(d, time.perf_counter() - started,
+                                       searcher.nodes - nodes_before, value,
+                                       divmod(best_idx, size))
+            # Search the previous best first on the next iteration
+            moves.remove(best_idx)
+            moves.insert(0, best_idx)
+            if abs(value) >= WIN_SCORE:
+                break
+    except SearchTimeout:
+        pass
+    finally:
+        searcher.deadline = None
+
+    if (book is not None and searcher.last_depth is not None
+            and searcher.last_depth >= searcher.book_write_depth):
+        book.store(size, target, mine, theirs, searcher.last_depth, searcher.last_value,
+                   best_idx)
+    return divmod(best_idx, size)
@@ -0,0 +1,100 @@
+import json
+import time
+
+##############################################################################
+# Search instrumentation
+#
+# An opt-in SearchStats object hangs off Searcher.stats (None by default).
+# The search only touches it at events that are already off the hot path -
+# leaf evaluations, terminal positions, transposition-table cutoffs, beta
+# cutoffs and finished iterations - behind an "is not None" check, so a
+# disabled collector costs one attribute load at those points. Node counts
+# come from Searcher.nodes, which is counted anyway.
+##############################################################################
+
+# Beta cutoffs at move index >= this share the last histogram bucket
+CUTOFF_BUCKETS = 16
+
+
+class SearchStats:
+    """
+    Counters for one move's search.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.nodes_start = 0
+        self.leaves = 0
+        self.terminals = 0
+        self.draws = 0
+        self.tt_cutoffs = 0
+        self.cutoffs = 0
+        # cutoff_at[i]: beta cutoffs caused by the i-th move searched
+        self.cutoff_at = [0] * CUTOFF_BUCKETS
+        self.iterations = []
+        self.forced = None
+        self.threat_nodes = 0
+        # Depth of the opening-book entry the move came from, if it did
+        self.book = None
+
+    def record_cutoff(self, move_index):
+        self.cutoffs += 1
+        self.cutoff_at[min(move_index, CUTOFF_BUCKETS - 1)] += 1
+
+    def record_iteration(self, depth, seconds, nodes, value, best_idx):
+        self.iterations.append({"depth": depth, "seconds": round(seconds, 6),
+                                "nodes": nodes, "value": value, "move": best_idx})
+
+    def to_dict(self, nodes=None):
+        """
+        JSON-ready summary. 'nodes' is the searcher's node count at the end.
+        """
+        first = self.cutoff_at[0]
+        return {
+            "seconds": round(time.perf_counter() - self.started, 6),
+            "nodes": None if nodes is None else nodes - self.nodes_start,
+            "leaves": self.leaves,
+            "terminals": self.terminals,
+            "draws": self.draws,
+            "tt_cutoffs": self.tt_cutoffs,
+            "cutoffs": self.cutoffs,
+            "first_move_cutoff_rate": round(first / self.cutoffs, 4) if self.cutoffs else None,
+            "cutoff_at": self.cutoff_at,
+            "iterations": self.iterations,
+            "forced": self.forced,
+            "threat_nodes": self.threat_nodes,
+            "book": self.book,
+        }
+
+
+def start_stats(searcher):
+    """
+    Attach a fresh collector to 'searcher' and return it.
+    """
+    stats = SearchStats()
+    stats.nodes_start = searcher.nodes
+    searcher.stats = stats
+    return stats
+
+
+def finish_stats(searcher):
+    """
+    Detach the collector from 'searcher' and return its summary dict
+    (None if collection wasn't on).
+    """
+    stats = searcher.stats
+    searcher.stats = None
+    if stats is None:
+        return None
+    return stats.to_dict(searcher.nodes)
+
+
+def write_stats_line(path, record):
+    """
+    Append 'record' as one JSON line to 'path'.
+    """
+    try:
+        with open(path, "a") as f:
+            f.write(json.dumps(record) + "\n")
+    except OSError as e:
+        print(f"⚠️ Could not write search stats to {path}: {e}")
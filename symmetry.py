@@ -0,0 +1,141 @@
+##############################################################################
+# Board symmetries
+#
+# A square board has 8 symmetries (4 rotations, each optionally mirrored).
+# Each one is a permutation of cell indices; bitboards are transformed a
+# byte at a time through precomputed tables, so a transform costs about
+# N*N/8 table lookups instead of one step per cell.
+#
+# canonical() picks one representative of the 8 images of a position, for
+# tables keyed by position (tablebase.py, opening_book.py). stabilizer() and
+# unique_moves() let the search skip root moves that a symmetry of the
+# position maps onto a move it already searched.
+##############################################################################
+
+IDENTITY = 0
+
+# size -> (perms, inverse perms, byte tables)
+_symmetry_cache = {}
+
+
+def _cell_map(size, sym, r, c):
+    """
+    Where cell (r, c) goes under symmetry 'sym' (0-7).
+    """
+    n = size - 1
+    for _ in range(sym & 3):
+        r, c = c, n - r          # rotate 90 degrees clockwise
+    if sym & 4:
+        c = n - c                # mirror left-right
+    return r, c
+
+
+def get_symmetries(size):
+    """
+    (perms, inverses, tables) for a size x size board. perms[s][idx] is the
+    image of cell idx under symmetry s, inverses[s] undoes it, and
+    tables[s][chunk][byte] is the transformed mask of the 8 cells
+    chunk*8 .. chunk*8+7 whose bits are 'byte'.
+    """
+    cached = _symmetry_cache.get(size)
+    if cached is not None:
+        return cached
+
+    cells = size * size
+    perms = []
+    for sym in range(8):
+        perm = [0] * cells
+        for idx in range(cells):
+            r, c = _cell_map(size, sym, *divmod(idx, size))
+            perm[idx] = r * size + c
+        perms.append(tuple(perm))
+    inverses = []
+    for perm in perms:
+        inverse = [0] * cells
+        for idx, image in enumerate(perm):
+            inverse[image] = idx
+        inverses.append(tuple(inverse))
+
+    chunks = (cells + 7) // 8
+    tables = []
+    for perm in perms:
+        sym_tables = []
+        for chunk in range(chunks):
+            table = [0] * 256
+            for byte in range(1, 256):
+                low = byte & -byte
+                bit = low.bit_length() - 1
+                idx = chunk * 8 + bit
+                image = 1 << perm[idx] if idx < cells else 0
+                table[byte] = table[byte ^ low] | image
+            sym_tables.append(tuple(table))
+        tables.append(tuple(sym_tables))
+
+    result = (tuple(perms), tuple(inverses), tuple(tables))
+    _symmetry_cache[size] = result
+    return result
+
+
+def transform(bits, sym_tables):
+    """
+    Image of bitmask 'bits' under one symmetry (its 'tables' entry).
+    """
+    out = 0
+    chunk = 0
+    while bits:
+        byte = bits & 0xFF
+        if byte:
+            out |= sym_tables[chunk][byte]
+        bits >>= 8
+        chunk += 1
+    return out
+
+
+def canonical(size, mine, theirs):
+    """
+    The symmetric image of (mine, theirs) with the smallest
+    (mine << cells) | theirs, as (mine, theirs, sym) where 'sym' is the
+    symmetry that maps the given position onto it.
+    """
+    _, _, tables = get_symmetries(size)
+    cells = size * size
+    best = None
+    for sym in range(8):
+        sym_tables = tables[sym]
+        t_mine = transform(mine, sym_tables)
+        t_theirs = transform(theirs, sym_tables)
+        key = (t_mine << cells) | t_theirs
+        if best is None or key < best[0]:
+            best = (key, t_mine, t_theirs, sym)
+    return best[1], best[2], best[3]
+
+
+def stabilizer(size, mine, theirs):
+    """
+    The symmetries (as indices) that map the position onto itself,
+    identity included.
+    """
+    _, _, tables = get_symmetries(size)
+    return [sym for sym in range(8)
+            if sym == IDENTITY
+            or (transform(mine, tables[sym]) == mine and transform(theirs, tables[sym]) == theirs)]
+
+
+def unique_moves(size, moves, syms):
+    """
+    'moves' (cell indices) with every move that one of 'syms' maps onto an
+    earlier move left out, so each class of equivalent moves keeps only its
+    first member. Order is preserved.
+    """
+    if len(syms) <= 1:
+        return list(moves)
+    perms, _, _ = get_symmetries(size)
+    seen = set()
+    unique = []
+    for idx in moves:
+        if idx in seen:
+            continue
+        unique.append(idx)
+        for sym in syms:
+            seen.add(perms[sym][idx])
+    return unique
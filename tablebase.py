@@ -0,0 +1,198 @@
+import os
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+
+from bitboard import full_mask, get_line_masks, is_win, iter_bits
+from symmetry import canonical, get_symmetries
+
+##############################################################################
+# Perfect-play tablebases for small boards
+#
+# solve() walks every position reachable from the empty board (players
+# alternating, stopping at a win or a full board) with plain minimax, one
+# visit per position up to the board's 8 symmetries. Positions are stored
+# from the side to move's point of view, so one table covers both symbols.
+#
+# A table file holds three parallel arrays sorted by key:
+#   keys    u64   (mine << cells) | theirs of the canonical position
+#   scores  i8    100 - plies for a win in that many plies, the negative for
+#                 a loss, 0 for a draw
+#   moves   u8    best move, as a cell of the canonical position
+# so a lookup is a binary search. Keys need 2 * cells <= 64 bits, i.e.
+# boards up to 5x5; in practice only 3x3 and 4x4 are small enough to solve
+# this way in Python (4x4 takes a minute and about 1.1M positions).
+##############################################################################
+
+MAGIC = b"TTTTBL01"
+HEADER = struct.Struct("<8sBBxxI")      # magic, size, target, count
+WIN = 100
+TABLEBASE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tablebases")
+
+# (size, target) -> Tablebase, or None if there is no table for it
+_tablebases = {}
+
+
+def tablebase_path(size, target, directory=TABLEBASE_DIR):
+    return os.path.join(directory, f"tb_{size}x{size}_{target}.bin")
+
+
+def _key(size, mine, theirs):
+    return (mine << (size * size)) | theirs
+
+
+##############################################################################
+# Solver
+##############################################################################
+
+def solve(size, target):
+    """
+    {canonical key: (score, canonical move)} for every position reachable
+    from the empty board that is not already decided.
+    """
+    if 2 * size * size > 64:
+        raise ValueError("tablebase keys only fit boards up to 5x5")
+    _, cell_masks = get_line_masks(size, target)
+    perms, _, _ = get_symmetries(size)
+    full = full_mask(size)
+    table = {}
+    limit = sys.getrecursionlimit()
+    sys.setrecursionlimit(max(limit, size * size * 4 + 100))
+
+    def value(mine, theirs):
+        c_mine, c_theirs, sym = canonical(size, mine, theirs)
+        key = _key(size, c_mine, c_theirs)
+        entry = table.get(key)
+        if entry is not None:
+            return entry[0]
+
+        best_score = -WIN - 1
+        best_idx = -1
+        for idx in iter_bits(full & ~(mine | theirs)):
+            new_mine = mine | (1 << idx)
+            if is_win(new_mine, idx, cell_masks):
+                score = WIN - 1
+            elif new_mine | theirs == full:
+                score = 0
+            else:
+                # Their result one ply further from the end
+                reply = value(theirs, new_mine)
+                score = -reply + 1 if reply > 0 else -reply - 1 if reply < 0 else 0
+            if score > best_score:
+                best_score, best_idx = score, idx
+        table[key] = (best_score, perms[sym][best_idx])
+        return best_score
+
+    try:
+        value(0, 0)
+    finally:
+        sys.setrecursionlimit(limit)
+    return table
+
+
+def write_tablebase(path, size, target, table):
+    keys = array("Q", sorted(table))
+    scores = array("b", (table[k][0] for k in keys))
+    moves = array("B", (table[k][1] for k in keys))
+    if sys.byteorder == "big":
+        keys.byteswap()
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, size, target, len(keys)))
+        f.write(keys.tobytes())
+        f.write(scores.tobytes())
+        f.write(moves.tobytes())
+
+
+##############################################################################
+# Lookup
+##############################################################################
+
+class Tablebase:
+    """
+    A solved (size, target), loaded from its table file.
+    """
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            magic, self.size, self.target, count = HEADER.unpack(f.read(HEADER.size))
+            if magic != MAGIC:
+                raise ValueError(f"{path} is not a tablebase file")
+            self.keys = array("Q")
+            self.keys.frombytes(f.read(8 * count))
+            self.scores = array("b")
+            self.scores.frombytes(f.read(count))
+            self.moves = array("B")
+            self.moves.frombytes(f.read(count))
+        if sys.byteorder == "big":
+            self.keys.byteswap()
+        if len(self.moves) != count:
+            raise ValueError(f"{path} is truncated")
+
+    def __len__(self):
+        return len(self.keys)
+
+    def probe(self, mine, theirs):
+        """
+        (best move cell, score) for the position with 'mine' to move, or
+        None if it isn't in the table.
+        """
+        size = self.size
+        c_mine, c_theirs, sym = canonical(size, mine, theirs)
+        key = _key(size, c_mine, c_theirs)
+        i = bisect_left(self.keys, key)
+        if i == len(self.keys) or self.keys[i] != key:
+            return None
+        _, inverses, _ = get_symmetries(size)
+        return inverses[sym][self.moves[i]], self.scores[i]
+
+
+def get_tablebase(size, target):
+    """
+    The loaded Tablebase for (size, target), or None if none was built.
+    """
+    config = (size, target)
+    if config not in _tablebases:
+        path = tablebase_path(size, target)
+        table = None
+        if os.path.exists(path):
+            try:
+                table = Tablebase(path)
+            except (OSError, ValueError) as e:
+                print(f"⚠️ Could not load tablebase {path}: {e}")
+        _tablebases[config] = table
+    return _tablebases[config]
+
+
+def lookup(size, target, mine, theirs):
+    """
+    Perfect-play (move cell, score) for 'mine' to move, or None if
+    (size, target) isn't solved or the position isn't in the table.
+    """
+    table = get_tablebase(size, target)
+    if table is None:
+        return None
+    return table.probe(mine, theirs)
+
+
+##############################################################################
+# Builder: python tablebase.py build <size> <target>
+##############################################################################
+
+if __name__ == "__main__":
+    import time
+
+    if len(sys.argv) < 4 or sys.argv[1] != "build":
+        print("Usage: python tablebase.py build <size> <target>")
+        sys.exit(0)
+
+    size, target = int(sys.argv[2]), int(sys.argv[3])
+    started = time.perf_counter()
+    table = solve(size, target)
+    path = tablebase_path(size, target)
+    write_tablebase(path, size, target, table)
+    score = table[0][0]
+    outcome = "draw" if score == 0 else ("first player wins" if score > 0 else "second player wins")
+    print(f"✅ {size}x{size}, target {target}: {len(table)} positions, {outcome} "
+          f"({time.perf_counter() - started:.1f}s) -> {path}")
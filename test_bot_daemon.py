@@ -0,0 +1,67 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import ai
+import bot_daemon
+import ponder
+import scheduler
+from bitboard import BitBoard
+
+
+def _board(stones):
+    board = BitBoard(11)
+    for row, col, symbol in stones:
+        board.place(row, col, symbol)
+    return board
+
+
+def _settled_slices(monkeypatch, starts):
+    """
+    Record when each search slice starts, and settle every search after
+    its first slice so the test doesn't run to the move clock.
+    """
+    search_slice = ponder.search_slice
+
+    def recording_slice(*args):
+        starts.append(time.monotonic())
+        result = search_slice(*args)
+        return None if result is None else result[:4] + (True,) + result[5:]
+
+    monkeypatch.setattr(ponder, "search_slice", recording_slice)
+
+
+def test_search_waits_at_most_one_slice_for_ponder(monkeypatch):
+    starts = []
+    _settled_slices(monkeypatch, starts)
+    pondering, searching = 1, 3     # both on lane 0 of 1
+
+    async def scenario():
+        daemon = bot_daemon.BotDaemon(2, max_searches=1, pondering=True, max_rate=0)
+        daemon.lanes = [ThreadPoolExecutor(max_workers=1)]
+        daemon.lane_locks = [asyncio.Lock()]
+        daemon.schedulers = [scheduler.LaneScheduler(daemon.lanes[0], daemon.lane_locks[0])]
+        daemon.running = True
+        try:
+            ponder.commit_move(pondering, _board([(5, 5, ai.OPPONENT_SYMBOL)]), 5, 5, 6, 2)
+            task = asyncio.create_task(daemon.ponder_for(pondering, 10.0))
+            await asyncio.sleep(0.2)
+            assert daemon.lane_locks[0].locked()
+
+            board = _board([(5, 5, ai.OPPONENT_SYMBOL), (4, 4, ai.MY_SYMBOL),
+                            (6, 6, ai.OPPONENT_SYMBOL)])
+            queued = time.monotonic()
+            job = scheduler.SearchJob(searching, board, 5, queued, 3.0)
+            result = await daemon.schedulers[0].search(job)
+            assert result is not None
+            assert starts[0] - queued < scheduler.SLICE_SECONDS
+
+            daemon.running = False
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+        finally:
+            daemon.lanes[0].shutdown(wait=True)
+            ponder.forget(pondering)
+            ponder.forget(searching)
+
+    asyncio.run(scenario())
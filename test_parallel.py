@@ -0,0 +1,69 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import parallel
+import search
+from bitboard import BitBoard
+from search_stats import finish_stats, start_stats
+
+
+def _board():
+    board = BitBoard(7)
+    for row, col, symbol in ((3, 3, "O"), (3, 4, "X"), (2, 2, "O")):
+        board.place(row, col, symbol)
+    return board
+
+
+def _stats(workers, **kwargs):
+    searcher = search.Searcher(7, 4)
+    start_stats(searcher)
+    if workers:
+        move = parallel.choose_best_move_parallel(_board(), 4, "X", "O", searcher,
+                                                  workers=workers, **kwargs)
+    else:
+        move = search.choose_best_move(_board(), 4, "X", "O", searcher, **kwargs)
+    return move, searcher, finish_stats(searcher)
+
+
+def test_parallel_search_records_stats_like_the_serial_search():
+    try:
+        serial_move, serial, serial_stats = _stats(0, depth=2, threats=False)
+        move, searcher, stats = _stats(2, depth=2, threats=False)
+        assert move == serial_move
+        assert (searcher.last_value, searcher.last_depth) == (serial.last_value, serial.last_depth)
+        assert [it["depth"] for it in stats["iterations"]] == [2]
+        assert stats["iterations"][0]["move"] == serial_stats["iterations"][0]["move"]
+        assert stats["nodes"] > 0
+
+        _, searcher, stats = _stats(2, deadline=time.monotonic() + 0.5, threats=False)
+        depths = [it["depth"] for it in stats["iterations"]]
+        assert depths == list(range(len(depths))) and depths
+        assert depths[-1] == searcher.last_depth
+    finally:
+        parallel.shutdown_pool()
+
+
+def test_parallel_search_records_forced_moves():
+    board = BitBoard(7)
+    for col in range(3):
+        board.place(0, col, "X")
+    board.place(6, 6, "O")
+    searcher = search.Searcher(7, 4)
+    start_stats(searcher)
+    move = parallel.choose_best_move_parallel(board, 4, "X", "O", searcher, workers=2)
+    stats = finish_stats(searcher)
+    assert move == (0, 3)
+    assert searcher.last_forced
+    assert stats["forced"] == (0, 3)
+
+
+def test_parallel_searches_from_several_threads_run_one_at_a_time():
+    serial_move = _stats(0, depth=2, threats=False)[0]
+    try:
+        with ThreadPoolExecutor(max_workers=4) as threads:
+            futures = [threads.submit(_stats, workers, depth=2, threats=False)
+                       for workers in (1, 2, 1, 2)]
+            moves = [future.result()[0] for future in futures]
+        assert moves == [serial_move] * 4
+    finally:
+        parallel.shutdown_pool()
@@ -0,0 +1,59 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import ai
+import ponder
+import scheduler
+from bitboard import BitBoard
+
+
+def _board(stones):
+    board = BitBoard(11)
+    for row, col, symbol in stones:
+        board.place(row, col, symbol)
+    return board
+
+
+def test_ponder_slice_is_capped_and_yields_to_search(monkeypatch):
+    starts = []
+    search_slice = ponder.search_slice
+
+    def recording_slice(*args):
+        starts.append(time.monotonic())
+        result = search_slice(*args)
+        # Settle after one slice so the test doesn't run to the move clock
+        return None if result is None else result[:4] + (True,) + result[5:]
+
+    monkeypatch.setattr(ponder, "search_slice", recording_slice)
+    pondering, searching = 1, 2
+
+    async def scenario():
+        executor = ThreadPoolExecutor(max_workers=1)
+        lane = scheduler.LaneScheduler(executor, asyncio.Lock())
+        try:
+            ponder.commit_move(pondering, _board([(5, 5, ai.OPPONENT_SYMBOL)]), 5, 5, 6, 2)
+            started = time.monotonic()
+            ponder_task = asyncio.create_task(lane.ponder(pondering, 10.0))
+            await asyncio.sleep(0.05)
+            assert lane.busy()
+
+            board = _board([(5, 5, ai.OPPONENT_SYMBOL), (4, 4, ai.MY_SYMBOL),
+                            (6, 6, ai.OPPONENT_SYMBOL)])
+            queued = time.monotonic()
+            job = scheduler.SearchJob(searching, board, 5, queued, 3.0)
+            search_task = asyncio.create_task(lane.search(job))
+
+            assert await ponder_task is not None
+            assert time.monotonic() - started < scheduler.SLICE_SECONDS
+            # The lane is taken now: no ponder slice until the search is done
+            assert await lane.ponder(pondering, 10.0) is None
+
+            assert await search_task is not None
+            assert starts[0] - queued < scheduler.SLICE_SECONDS
+        finally:
+            executor.shutdown(wait=True)
+            ponder.forget(pondering)
+            ponder.forget(searching)
+
+    asyncio.run(scenario())
@@ -0,0 +1,34 @@
+import search
+from bitboard import BitBoard
+
+# 9x9, target 5: the opponent has a forced win (a fork at cell 10) and we
+# have none
+SIZE, TARGET = 9, 5
+MINE = 0x20000000801000000090
+THEIRS = 0x2000110040100000
+
+
+def test_forced_move_never_plays_an_unproven_block():
+    searcher = search.Searcher(SIZE, TARGET)
+    searcher.threat_solver.max_nodes = 2
+    assert search.forced_move(searcher, MINE, THEIRS) is None
+
+
+def test_forced_move_plays_a_proven_block():
+    searcher = search.Searcher(SIZE, TARGET)
+    block = search.forced_move(searcher, MINE, THEIRS)
+    assert block is not None
+
+    solver = searcher.threat_solver
+    assert solver.find_forced_win(THEIRS, MINE | (1 << block)) is None
+    assert not solver.exhausted
+
+
+def test_unproven_block_falls_back_to_a_search():
+    board = BitBoard(SIZE, MINE, THEIRS)
+    searcher = search.Searcher(SIZE, TARGET)
+    searcher.threat_solver.max_nodes = 2
+    move = search.choose_best_move(board, TARGET, "X", "O", searcher, depth=1)
+    assert move is not None
+    assert not searcher.last_forced
+    assert searcher.last_depth == 1
@@ -0,0 +1,225 @@
+import time
+
+from bitboard import full_mask, get_line_masks, iter_bits
+
+##############################################################################
+# Threat-space search (VCF: victory by continuous "fours")
+#
+# A threat is a move that leaves the attacker one stone short of 'target' in
+# a window the defender hasn't touched, so the defender has exactly one
+# reply: block the remaining cell. The solver only ever considers threat
+# moves for the attacker and that single forced block for the defender, so it
+# can look many plies deep for the cost of a very narrow tree:
+#   - two or more winning cells after an attacker move => forced win
+#   - a defender reply that itself makes a threat must be answered by the
+#     attacker's next move (it has to block and threaten at the same time)
+#   - if the defender can already complete a line, the sequence fails
+##############################################################################
+
+# Default budgets for one call
+DEFAULT_MAX_NODES = 20000
+DEFAULT_MAX_DEPTH = 30   # attacker moves in one sequence
+
+
+class ThreatBudgetExceeded(Exception):
+    """
+    Raised internally when a solver call runs out of nodes or time.
+    """
+
+
+def winning_cells(own, opp, line_masks, target):
+    """
+    Mask of empty cells that would complete a line for 'own'.
+    """
+    need = target - 1
+    cells = 0
+    for mask in line_masks:
+        if not opp & mask and (own & mask).bit_count() == need:
+            cells |= mask & ~own
+    return cells
+
+
+def _new_winning_cells(own, opp, idx, cell_masks, target):
+    """
+    Winning cells for 'own' created by its stone on 'idx' (only the windows
+    through that cell can have changed).
+    """
+    need = target - 1
+    cells = 0
+    for mask in cell_masks[idx]:
+        if not opp & mask and (own & mask).bit_count() == need:
+            cells |= mask & ~own
+    return cells
+
+
+class ThreatSolver:
+    """
+    Budgeted VCF solver for one (board size, target).
+    """
+
+    def __init__(self, size, target, max_nodes=DEFAULT_MAX_NODES,
+                 max_depth=DEFAULT_MAX_DEPTH):
+        self.size = size
+        self.target = target
+        self.line_masks, self.cell_masks = get_line_masks(size, target)
+        self.full = full_mask(size)
+        self.max_nodes = max_nodes
+        self.max_depth = max_depth
+        self.nodes = 0
+        self.deadline = None
+        # Whether the last find_forced_win() ran out of nodes or time, so
+        # its None means "not found" rather than "there is none"
+        self.exhausted = False
+        # (att, dfn) -> deepest depth at which the position was refuted
+        self._failed = {}
+
+    def _threat_moves(self, att, dfn):
+        """
+        Empty cells that turn some window into a target-1 threat, most
+        windows first (a cell that makes two threats at once is a fork).
+        """
+        need = self.target - 2
+        hits = {}
+        for mask in self.line_masks:
+            if not dfn & mask and (att & mask).bit_count() == need:
+                for idx in iter_bits(mask & ~att):
+                    hits[idx] = hits.get(idx, 0) + 1
+        return sorted(hits, key=lambda idx: (-hits[idx], idx))
+
+    def _tick(self):
+        self.nodes += 1
+        if self.nodes > self.max_nodes:
+            raise ThreatBudgetExceeded()
+        if (self.deadline is not None and not self.nodes % 256
+                and time.monotonic() >= self.deadline):
+            raise ThreatBudgetExceeded()
+
+    def _vcf(self, att, dfn, def_wins, depth):
+        """
+        Attacker to move, with no winning cell of its own. 'def_wins' are the
+        defender's current winning cells. Returns the move sequence
+        (attacker, defender, attacker, ...) of a forced win, or None.
+        """
+        self._tick()
+        if depth == 0:
+            return None
+        key = (att, dfn)
+        if self._failed.get(key, 0) >= depth:
+            return None
+
+        cell_masks = self.cell_masks
+        target = self.target
+
+        if def_wins:
+            # The defender threatens to win: our move has to block it
+            if def_wins & (def_wins - 1):
+                self._failed[key] = depth
+                return None
+            candidates = [def_wins.bit_length() - 1]
+        else:
+            candidates = self._threat_moves(att, dfn)
+
+        for move in candidates:
+            new_att = att | (1 << move)
+            att_wins = _new_winning_cells(new_att, dfn, move, cell_masks, target)
+            if not att_wins:
+                continue
+            remaining_def_wins = def_wins & ~(1 << move)
+            if remaining_def_wins:
+                # Defender would just win
+                continue
+            if att_wins & (att_wins - 1):
+                # Two winning cells: only one can be blocked
+                return [move]
+
+            block = att_wins.bit_length() - 1
+            new_dfn = dfn | (1 << block)
+            new_def_wins = _new_winning_cells(new_dfn, new_att, block, cell_masks, target)
+            if (new_att | new_dfn) == self.full:
+                continue
+            rest = self._vcf(new_att, new_dfn, new_def_wins, depth - 1)
+            if rest is not None:
+                return [move, block] + rest
+
+        self._failed[key] = depth
+        return None
+
+    def find_forced_win(self, att, dfn, deadline=None):
+        """
+        VCF sequence for 'att' (to move), as a list of cell indices starting
+        with the attacker's first move, or None if there is none within the
+        budget (self.exhausted tells whether the budget ran out). An
+        immediate win is a one-move sequence.
+        """
+        self.nodes = 0
+        self.deadline = deadline
+        self.exhausted = False
+        self._failed = {}
+        empty = self.full & ~(att | dfn)
+
+        immediate = winning_cells(att, dfn, self.line_masks, self.target) & empty
+        if immediate:
+            return [(immediate & -immediate).bit_length() - 1]
+
+        def_wins = winning_cells(dfn, att, self.line_masks, self.target) & empty
+        try:
+            return self._vcf(att, dfn, def_wins, self.max_depth)
+        except ThreatBudgetExceeded:
+            self.exhausted = True
+            return None
+        finally:
+            self.deadline = None
+
+    def find_defense(self, mine, theirs, deadline=None):
+        """
+        If the opponent ('theirs') has a forced win once it is their move,
+        return a cell for us that is proven to leave them without one.
+        Returns None when there is nothing to defend against, or when no
+        cell of their sequence is proven to refute it within the budget
+        (the caller should then search as usual).
+        """
+        empty = self.full & ~(mine | theirs)
+        their_wins = winning_cells(theirs, mine, self.line_masks, self.target) & empty
+        if their_wins:
+            # Block an immediate win (if there are two, we're lost anyway)
+            return (their_wins & -their_wins).bit_length() - 1
+
+        sequence = self.find_forced_win(theirs, mine, deadline)
+        if sequence is None:
+            return None
+
+        tried = set()
+        for idx in sequence:
+            if idx in tried:
+                continue
+            tried.add(idx)
+            if (self.find_forced_win(theirs, mine | (1 << idx), deadline) is None
+                    and not self.exhausted):
+                return idx
+            if deadline is not None and time.monotonic() >= deadline:
+                break
+        return None
+
+    def find_threat_move(self, mine, theirs, deadline=None):
+        """
+        Run the threat-space search for both sides, with us to move.
+        Returns ("win", idx) for the first move of our forced win,
+        ("block", idx) for a move that stops the opponent's forced win,
+        or None if neither side has one within the budget.
+        """
+        sequence = self.find_forced_win(mine, theirs, deadline)
+        if sequence:
+            return "win", sequence[0]
+        defense = self.find_defense(mine, theirs, deadline)
+        if defense is not None:
+            return "block", defense
+        return None
+
+
+def find_threat_move(mine, theirs, size, target, max_nodes=DEFAULT_MAX_NODES,
+                     deadline=None):
+    """
+    One-off ThreatSolver(size, target).find_threat_move(mine, theirs).
+    """
+    solver = ThreatSolver(size, target, max_nodes=max_nodes)
+    return solver.find_threat_move(mine, theirs, deadline)
@@ -0,0 +1,173 @@
+import random
+from array import array
+
+from bitboard import iter_bits
+
+##############################################################################
+# Zobrist hashing
+##############################################################################
+
+# Side index for the key tables: 0 = the searching side, 1 = the opponent
+MINE = 0
+THEIRS = 1
+
+# size -> (mine_keys, theirs_keys, side_key)
+_zobrist_cache = {}
+
+
+def get_zobrist_keys(size):
+    """
+    Random 63-bit keys for every (side, cell) of a size x size board, plus a
+    key XORed in when the opponent is to move. Seeded by board size so the
+    same position always hashes the same way.
+    """
+    cached = _zobrist_cache.get(size)
+    if cached is not None:
+        return cached
+
+    rng = random.Random(0x5EED ^ size)
+    cells = size * size
+    mine_keys = tuple(rng.getrandbits(63) for _ in range(cells))
+    theirs_keys = tuple(rng.getrandbits(63) for _ in range(cells))
+    side_key = rng.getrandbits(63)
+    result = (mine_keys, theirs_keys, side_key)
+    _zobrist_cache[size] = result
+    return result
+
+
+def zobrist_hash(size, mine, theirs):
+    """
+    Full hash of a position from scratch (my side to move). The search keeps
+    it up to date incrementally with one XOR per move made/unmade.
+    """
+    mine_keys, theirs_keys, _ = get_zobrist_keys(size)
+    key = 0
+    for idx in iter_bits(mine):
+        key ^= mine_keys[idx]
+    for idx in iter_bits(theirs):
+        key ^= theirs_keys[idx]
+    return key
+
+
+##############################################################################
+# Transposition table
+##############################################################################
+
+# Bound types
+EXACT = 0
+LOWER = 1
+UPPER = 2
+
+NO_MOVE = -1
+
+# key (q) + score (i) + move (i) + depth (b) + flag (b) + generation (B)
+ENTRY_BYTES = 8 + 4 + 4 + 1 + 1 + 1
+
+DEFAULT_MAX_ENTRIES = 1 << 20
+
+
+class TranspositionTable:
+    """
+    Fixed-size transposition table backed by preallocated arrays, so memory
+    use is set once at construction and stays flat for the whole game.
+
+    Every bucket has two slots:
+      slot 0 - depth-preferred: only replaced by an equal/deeper result, or
+               by anything once the stored entry is from an older search
+      slot 1 - always-replace: takes whatever slot 0 turned down
+
+    Size it with 'max_entries' or 'max_bytes' (whichever is smaller wins).
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, max_bytes=None):
+        if max_bytes is not None:
+            max_entries = min(max_entries, max_bytes // ENTRY_BYTES)
+        self.num_buckets = max(1, max_entries // 2)
+        slots = self.num_buckets * 2
+
+        self.keys = array("q", [0]) * slots
+        self.scores = array("i", [0]) * slots
+        self.moves = array("i", [NO_MOVE]) * slots
+        self.depths = array("b", [-1]) * slots   # -1 marks an empty slot
+        self.flags = array("b", [EXACT]) * slots
+        self.generations = array("B", [0]) * slots
+        self.generation = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.collisions = 0
+        self.stores = 0
+        self.overwrites = 0
+
+    @property
+    def capacity(self):
+        return self.num_buckets * 2
+
+    @property
+    def size_bytes(self):
+        return self.capacity * ENTRY_BYTES
+
+    def new_search(self):
+        """
+        Start a new search: older entries become fair game for replacement
+        in the depth-preferred slots.
+        """
+        self.generation = (self.generation + 1) & 0xFF
+
+    def clear(self):
+        for slot in range(self.capacity):
+            self.depths[slot] = -1
+        self.generation = 0
+
+    def probe(self, key):
+        """
+        Return (depth, score, flag, move) for 'key', or None on a miss.
+        """
+        slot = (key % self.num_buckets) * 2
+        for s in (slot, slot + 1):
+            if self.depths[s] >= 0 and self.keys[s] == key:
+                self.hits += 1
+                return self.depths[s], self.scores[s], self.flags[s], self.moves[s]
+
+        self.misses += 1
+        if self.depths[slot] >= 0 or self.depths[slot + 1] >= 0:
+            # Bucket holds a different position that hashes to the same place
+            self.collisions += 1
+        return None
+
+    def store(self, key, depth, score, flag, move=NO_MOVE):
+        slot = (key % self.num_buckets) * 2
+        self.stores += 1
+
+        old_depth = self.depths[slot]
+        if (old_depth < 0 or self.keys[slot] == key or depth >= old_depth
+                or self.generations[slot] != self.generation):
+            target = slot
+        else:
+            target = slot + 1
+
+        if self.depths[target] >= 0 and self.keys[target] != key:
+            self.overwrites += 1
+        if self.keys[target] == key and move == NO_MOVE:
+            # Keep the best move we already know about
+            move = self.moves[target]
+
+        self.keys[target] = key
+        self.scores[target] = score
+        self.moves[target] = move
+        self.depths[target] = min(depth, 127)
+        self.flags[target] = flag
+        self.generations[target] = self.generation
+
+    def stats(self):
+        probes = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "collisions": self.collisions,
+            "stores": self.stores,
+            "overwrites": self.overwrites,
+            "hit_rate": self.hits / probes if probes else 0.0,
+            "capacity": self.capacity,
+            "bytes": self.size_bytes,
+        }
@@ -0,0 +1,204 @@
+import asyncio
+import json
+import random
+import threading
+import time
+
+##############################################################################
+# Waiting for our turn
+#
+# PollPolicy decides how long to wait before the next turn check of a game:
+#   - right after our move, poll fast: bots often reply within a second or two
+#   - poll fast again around the opponent's expected think time (a running
+#     average of how long they took before), and never sleep past it
+#   - otherwise back off exponentially up to 'max_interval'
+#   - every interval gets random jitter, so many games don't poll in step
+# TokenBucket caps the request rate across everything sharing it, and
+# PollMetrics counts polls and how quickly each turn was noticed.
+##############################################################################
+
+MIN_POLL_SECONDS = 0.25
+MAX_POLL_SECONDS = 10.0
+BACKOFF = 1.5
+JITTER = 0.2
+# Seconds after our move during which we always poll at the minimum interval
+FAST_WINDOW_SECONDS = 2.0
+# Global request cap (requests/sec and burst), see http_client.set_rate_limiter
+MAX_REQUESTS_PER_SECOND = 10.0
+REQUEST_BURST = 20
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: 'rate' tokens per second, up to 'burst'.
+    """
+
+    def __init__(self, rate=MAX_REQUESTS_PER_SECOND, burst=REQUEST_BURST):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+        self.waited = 0.0
+
+    def reserve(self):
+        """
+        Take one token, returning how many seconds the caller must wait
+        before using it (0 if one was available).
+        """
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            if self.tokens >= 0:
+                return 0.0
+            delay = -self.tokens / self.rate
+            self.waited += delay
+            return delay
+
+    def acquire(self):
+        delay = self.reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+    async def acquire_async(self):
+        delay = self.reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+class PollPolicy:
+    """
+    Adaptive poll intervals for one game.
+    """
+
+    def __init__(self, min_interval=MIN_POLL_SECONDS, max_interval=MAX_POLL_SECONDS,
+                 backoff=BACKOFF, jitter=JITTER, fast_window=FAST_WINDOW_SECONDS, rng=None):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.jitter = jitter
+        self.fast_window = fast_window
+        self.rng = rng or random.Random()
+        # Running average of the opponent's think time (None until seen)
+        self.expected_think = None
+        self.slow_polls = 0
+
+    def new_wait(self):
+        """
+        Start waiting for the opponent (call right after our move).
+        """
+        self.slow_polls = 0
+
+    def record_opponent_time(self, seconds):
+        if self.expected_think is None:
+            self.expected_think = seconds
+        else:
+            self.expected_think = 0.7 * self.expected_think + 0.3 * seconds
+
+    def next_interval(self, waited):
+        """
+        Seconds until the next poll, 'waited' seconds into the wait.
+        """
+        expected = self.expected_think
+        near_expected = (expected is not None
+                         and abs(waited - expected) <= max(1.0, 0.25 * expected))
+        if waited < self.fast_window or near_expected:
+            interval = self.min_interval
+        else:
+            interval = min(self.max_interval,
+                           self.min_interval * self.backoff ** (self.slow_polls + 1))
+            self.slow_polls += 1
+            if expected is not None and waited < expected:
+                # Wake up in time for the opponent's usual reply
+                interval = min(interval, max(self.min_interval, expected - waited))
+        if self.jitter:
+            interval *= 1 + self.jitter * (2 * self.rng.random() - 1)
+        return interval
+
+
+class PollMetrics:
+    """
+    Poll counts and turn-detection latency, across games.
+    """
+
+    def __init__(self):
+        self.polls = 0
+        self.waits = 0
+        self.turns = 0
+        # Per detected turn: seconds between the last poll that saw the
+        # opponent to move and the one that saw our turn - an upper bound
+        # on how late we noticed the move
+        self.detect_gaps = []
+
+    def record_turn(self, gap):
+        self.turns += 1
+        self.detect_gaps.append(gap)
+
+    def to_dict(self):
+        gaps = sorted(self.detect_gaps)
+        return {
+            "polls": self.polls,
+            "waits": self.waits,
+            "turns": self.turns,
+            "polls_per_turn": round(self.polls / self.turns, 2) if self.turns else None,
+            "detect_gap_mean": round(sum(gaps) / len(gaps), 4) if gaps else None,
+            "detect_gap_p95": round(gaps[min(len(gaps) - 1, int(0.95 * len(gaps)))], 4)
+            if gaps else None,
+            "detect_gap_max": round(gaps[-1], 4) if gaps else None,
+        }
+
+
+def parse_details(details):
+    if not details or details.get("code") != "OK":
+        return None
+    try:
+        return json.loads(details.get("game", "{}"))
+    except json.JSONDecodeError:
+        print("❌ Could not parse 'game' JSON from details.")
+        return None
+
+
+def wait_for_turn(game_id, my_team_id, policy=None, metrics=None, timeout=None,
+                  played_at_count=None):
+    """
+    Poll gameDetails until it is our turn. A read that still shows the move
+    count 'played_at_count' (at which we last moved) predates our move and
+    counts as the opponent's turn. Returns (game dict, poll time),
+    where poll time is the time.monotonic() at which the request that saw
+    our turn was sent, or (None, None) if the game is over or 'timeout'
+    seconds pass first. Requests go through api_client, so they count against
+    any http_client rate limiter.
+    """
+    from api_client import get_game_details
+    from game_state import parse_move_count
+
+    policy = policy or PollPolicy()
+    metrics = metrics if metrics is not None else PollMetrics()
+    started = time.monotonic()
+    last_poll = None
+    saw_opponent = False
+    policy.new_wait()
+    metrics.waits += 1
+    while True:
+        poll_time = time.monotonic()
+        details = get_game_details(game_id)
+        metrics.polls += 1
+        game = parse_details(details)
+        if game is not None:
+            if game.get("status") == "C":
+                return None, None
+            if (str(game.get("turnteamid")) == str(my_team_id)
+                    and (played_at_count is None or parse_move_count(game) != played_at_count)):
+                if saw_opponent:
+                    metrics.record_turn(poll_time - last_poll)
+                    policy.record_opponent_time(poll_time - started)
+                return game, poll_time
+            saw_opponent = True
+        last_poll = poll_time
+
+        waited = time.monotonic() - started
+        if timeout is not None and waited >= timeout:
+            return None, None
+        time.sleep(policy.next_interval(waited))